@@ -0,0 +1,246 @@
+"""
+性能测试：加载、保存、运行、复制粘贴和渲染
+
+用法:
+    python -m benchmarks.bench --sizes 100 1000 10000 -o results.json
+    python -m benchmarks.bench --compare base.json results.json
+
+测试之前的版本时，在该版本的目录中运行，benchmarks从当前版本导入，editorWnd使用该版本的代码:
+    git worktree add ../base <commit>
+    cd ../base && PYTHONPATH=<当前版本的目录> python -m benchmarks.bench -o base.json
+之前的版本中没有的功能(例如命令行运行)会被跳过
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+# 不需要显示窗口，必须在创建QApplication之前设置
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtCore import QCoreApplication, QEvent, QRectF
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtWidgets import QApplication
+
+import editorWnd
+from benchmarks.generators import GENERATORS, generate
+from editorWnd import config
+from editorWnd.editor import Editor
+
+# 磁盘缓存会让重复的运行直接读取之前的结果，测试时始终关闭(之前的版本中没有磁盘缓存)
+if hasattr(config, 'RuntimeConfig'):
+    config.RuntimeConfig.DISK_CACHE_SIZE = 0
+
+OPERATIONS = ['load', 'save', 'run', 'run_headless', 'copy', 'paste', 'render_scene', 'render_view']
+RENDER_SIZE = (1920, 1080)
+
+
+class Benchmark:
+    def __init__(self, kind: str, n: int, workdir: str):
+        self.data, self.node_count = generate(kind, n)
+        self.filepath = os.path.join(workdir, f'{kind}_{n}.vgf')
+        with open(self.filepath, 'w') as f:
+            f.write(json.dumps(self.data))
+        self._save_path = os.path.join(workdir, f'{kind}_{n}_saved.vgf')
+        self._editor: Union[Editor, None] = None
+        self._clipboard: str = ''
+
+    def loaded_editor(self) -> Editor:
+        if self._editor is None:
+            self._editor = self.__new_editor()
+            self._editor.view.load_graph(self.filepath)
+        return self._editor
+
+    @staticmethod
+    def __new_editor() -> Editor:
+        editor = Editor()
+        editor.resize(1280, 800)
+        editor.show()
+        return editor
+
+    @staticmethod
+    def __dispose(editor: Editor):
+        # 先隐藏再删除，不处理其他事件，避免删除前还要把大图重绘一遍
+        editor.hide()
+        editor.deleteLater()
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+    @staticmethod
+    def unavailable(op: str) -> str:
+        """
+        :param op: 操作名称
+        :return: 被测试的版本中不能进行该操作的原因，可以进行时为空字符串
+        """
+        if op == 'run_headless':
+            try:
+                import editorWnd.runtime.graph
+            except ImportError as e:
+                return f'没有命令行运行时({e})'
+        return ''
+
+    # 每个操作返回(准备函数, 计时函数, 清理函数)
+    def prepare(self, op: str) -> Tuple[Callable[[], Any], Callable[[Any], Any], Callable[[Any], None]]:
+        if op == 'load':
+            return self.__new_editor, lambda editor: editor.view.load_graph(self.filepath), self.__dispose
+        if op == 'save':
+            return self.loaded_editor, lambda editor: editor.view.save_graph(self._save_path), lambda editor: None
+        if op == 'run':
+            return self.loaded_editor, lambda editor: editor.view.run_graph(), lambda editor: None
+        if op == 'run_headless':
+            from editorWnd.runtime.graph import RuntimeGraph
+            return lambda: RuntimeGraph.load(self.filepath), lambda graph: graph.run(), lambda graph: None
+        if op == 'copy':
+            return self.loaded_editor, self.__copy, lambda editor: None
+        if op == 'paste':
+            if not self._clipboard:
+                self.__copy(self.loaded_editor())
+            return self.__new_editor, self.__paste, self.__dispose
+        if op == 'render_scene':
+            return self.loaded_editor, self.__render_scene, lambda editor: None
+        if op == 'render_view':
+            return self.loaded_editor, self.__render_view, lambda editor: None
+        raise ValueError(f'未知的操作 {op}')
+
+    def __copy(self, editor: Editor):
+        # 与编辑器的复制操作相同：转换为字典再写成json字符串
+        self._clipboard = json.dumps(editor.view.stringfy_items(editor.view.items()))
+
+    def __paste(self, editor: Editor):
+        editor.view.itemfy_json_string(json.loads(self._clipboard))
+
+    @staticmethod
+    def __render_scene(editor: Editor):
+        # 把整个场景缩放渲染到一张图片中
+        image = QImage(RENDER_SIZE[0], RENDER_SIZE[1], QImage.Format.Format_ARGB32_Premultiplied)
+        painter = QPainter(image)
+        editor.scene.render(painter, QRectF(image.rect()), editor.scene.itemsBoundingRect())
+        painter.end()
+
+    @staticmethod
+    def __render_view(editor: Editor):
+        # 按当前的缩放比例渲染视图中可见的部分
+        image = QImage(editor.view.viewport().size(), QImage.Format.Format_ARGB32_Premultiplied)
+        painter = QPainter(image)
+        editor.view.render(painter)
+        painter.end()
+
+    def close(self):
+        if self._editor is not None:
+            self.__dispose(self._editor)
+            self._editor = None
+
+
+def measure(bench: Benchmark, op: str, repeat: int) -> List[float]:
+    setup, target, teardown = bench.prepare(op)
+    times = []
+    for _ in range(repeat):
+        obj = setup()
+        gc.collect()
+        # 运行和保存时会打印信息，不计入结果
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            target(obj)
+            times.append(time.perf_counter() - start)
+        teardown(obj)
+    return times
+
+
+def git_commit() -> str:
+    # 被测试的是editorWnd所在的版本，不一定是benchmarks所在的版本
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(editorWnd.__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+
+def run(kinds: List[str], sizes: List[int], ops: List[str], repeat: int) -> Dict[str, Any]:
+    QApplication.instance() or QApplication([])
+    results = []
+    skipped = {}
+    for op in ops:
+        reason = Benchmark.unavailable(op)
+        if reason:
+            skipped[op] = reason
+            print(f'跳过 {op}: {reason}', file=sys.stderr)
+    ops = [op for op in ops if op not in skipped]
+    with tempfile.TemporaryDirectory() as workdir:
+        for kind in kinds:
+            for n in sizes:
+                bench = Benchmark(kind, n, workdir)
+                for op in ops:
+                    times = measure(bench, op, repeat)
+                    result = {'graph': kind, 'n': bench.node_count, 'op': op, 'times': times,
+                              'min': min(times), 'median': statistics.median(times)}
+                    results.append(result)
+                    print(f'{kind:<14}{bench.node_count:>8}  {op:<14}{result["median"] * 1000:>12.2f} ms',
+                          file=sys.stderr)
+                bench.close()
+    return {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'skipped': skipped,
+        'results': results,
+    }
+
+
+def compare(base_path: str, new_path: str):
+    """
+    比较两次测试的结果，按中位数计算倍数，小于1表示变快
+    :return:
+    """
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    base_results = {(r['graph'], r['n'], r['op']): r for r in base['results']}
+    print(f'{base.get("commit", "")} -> {new.get("commit", "")}')
+    for result in new['results']:
+        key = (result['graph'], result['n'], result['op'])
+        old = base_results.get(key, None)
+        if old is None:
+            # 基准版本中跳过的操作只列出原因
+            reason = base.get('skipped', {}).get(key[2], '')
+            if reason:
+                print(f'{key[0]:<14}{key[1]:>8}  {key[2]:<14}  基准中跳过: {reason}')
+            continue
+        ratio = result['median'] / old['median'] if old['median'] > 0 else float('inf')
+        print(f'{key[0]:<14}{key[1]:>8}  {key[2]:<14}{old["median"] * 1000:>12.2f} ms'
+              f'{result["median"] * 1000:>12.2f} ms{ratio:>8.2f}x')
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description='节点图编辑器和运行时的性能测试')
+    parser.add_argument('--graphs', nargs='+', default=list(GENERATORS.keys()), choices=list(GENERATORS.keys()))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000], help='节点数量，最大可以到50000')
+    parser.add_argument('--ops', nargs='+', default=OPERATIONS, choices=OPERATIONS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default='', help='结果保存的json文件，默认输出到标准输出')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='比较两个结果文件')
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    report = run(args.graphs, args.sizes, args.ops, args.repeat)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+生成用于性能测试的节点图，数据格式与View.save_graph保存的.vgf文件相同，节点都是nodes中真实的节点类
+"""
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+from editorWnd.env import ENV
+
+# 节点在画布上按网格排列
+GRID_COLUMNS = 50
+GRID_WIDTH = 250
+GRID_HEIGHT = 150
+
+
+class GraphBuilder:
+    def __init__(self):
+        self._nodes: List[Dict[str, Any]] = []
+        self._edges: List[Dict[str, Any]] = []
+
+    def add(self, cls_name: str, *values: Any) -> int:
+        """
+        添加节点
+        :param cls_name: 节点类名
+        :param values: 输入端口的默认值，None表示不设置
+        :return: 节点id
+        """
+        cls = ENV.get_cls_by_name(cls_name)
+        if cls is None:
+            raise ValueError(f'找不到节点类 {cls_name}')
+        node_id = len(self._nodes) + 1
+        index = node_id - 1
+        self._nodes.append({
+            'id': node_id,
+            'class': cls_name,
+            'module': cls.__module__,
+            'pos': ((index % GRID_COLUMNS) * GRID_WIDTH, (index // GRID_COLUMNS) * GRID_HEIGHT),
+            'port_values': {i: value for i, value in enumerate(values) if value is not None},
+        })
+        return node_id
+
+    def link(self, source: int, source_port: int, dest: int, dest_port: int):
+        self._edges.append({
+            'edge_id': len(self._edges) + 1,
+            'source_node_id': source,
+            'source_port_index': source_port,
+            'dest_node_id': dest,
+            'dest_port_index': dest_port,
+        })
+
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+    def to_data(self) -> Dict[str, Any]:
+        # 经过一次json转换，与从文件加载的数据完全相同(例如字典的键都是字符串)
+        return json.loads(json.dumps({'graph_name': '', 'time': '', 'nodes': self._nodes, 'edges': self._edges,
+                                      'groups': []}))
+
+
+def chain(n: int) -> Dict[str, Any]:
+    """
+    开始运行节点后面连接一条执行链，每个打印节点的输入来自一个字符串节点
+    :param n: 节点数量
+    :return:
+    """
+    builder = GraphBuilder()
+    prev = builder.add('BeginNode')
+    while builder.node_count() + 2 <= n:
+        text = builder.add('StringNode', f'第{builder.node_count()}个节点')
+        node = builder.add('PrintNode')
+        builder.link(text, 0, node, 1)
+        builder.link(prev, 0, node, 0)
+        prev = node
+    return builder.to_data()
+
+
+def fan_in(n: int) -> Dict[str, Any]:
+    """
+    浮点数节点通过加法节点两两合并成一棵二叉树，最后打印结果
+    :param n: 节点数量
+    :return:
+    """
+    builder = GraphBuilder()
+    begin = builder.add('BeginNode')
+    # 叶子数量为k时，整棵树有2k-1个节点，另外还有开始、转换、打印三个节点
+    leaves = max(2, (n - 2) // 2)
+    layer = [builder.add('FloatNode', float(i)) for i in range(leaves)]
+    while len(layer) > 1:
+        next_layer = []
+        for i in range(0, len(layer) - 1, 2):
+            node = builder.add('AddNode')
+            builder.link(layer[i], 0, node, 0)
+            builder.link(layer[i + 1], 0, node, 1)
+            next_layer.append(node)
+        if len(layer) % 2:
+            next_layer.append(layer[-1])
+        layer = next_layer
+    text = builder.add('Float2StringNode')
+    builder.link(layer[0], 0, text, 0)
+    node = builder.add('PrintNode')
+    builder.link(begin, 0, node, 0)
+    builder.link(text, 0, node, 1)
+    return builder.to_data()
+
+
+def nested_loops(n: int, iterations: int = 4) -> Dict[str, Any]:
+    """
+    两层For循环，循环体中是一条由乘法和加法组成的数据链，依赖内外两层的索引
+    :param n: 节点数量
+    :param iterations: 每层循环的次数
+    :return:
+    """
+    builder = GraphBuilder()
+    begin = builder.add('BeginNode')
+    outer = builder.add('ForLoopNode', None, 0, iterations - 1, 1)
+    builder.link(begin, 0, outer, 0)
+    inner = builder.add('ForLoopNode', None, 0, iterations - 1, 1)
+    builder.link(outer, 0, inner, 0)
+    outer_index = builder.add('Integer2FloatNode')
+    builder.link(outer, 1, outer_index, 0)
+    inner_index = builder.add('Integer2FloatNode')
+    builder.link(inner, 1, inner_index, 0)
+    prev = outer_index
+    while builder.node_count() + 3 <= n:
+        multiply = builder.add('MultiplyNode', None, 1.0001)
+        builder.link(prev, 0, multiply, 0)
+        add = builder.add('AddNode')
+        builder.link(multiply, 0, add, 0)
+        builder.link(inner_index, 0, add, 1)
+        prev = add
+    text = builder.add('Float2StringNode')
+    builder.link(prev, 0, text, 0)
+    node = builder.add('PrintNode')
+    builder.link(inner, 0, node, 0)
+    builder.link(text, 0, node, 1)
+    return builder.to_data()
+
+
+GENERATORS: Dict[str, Callable[[int], Dict[str, Any]]] = {
+    'chain': chain,
+    'fan_in': fan_in,
+    'nested_loops': nested_loops,
+}
+
+
+def generate(kind: str, n: int) -> Tuple[Dict[str, Any], int]:
+    """
+    :param kind: GENERATORS中的名字
+    :param n: 期望的节点数量
+    :return: (图数据, 实际的节点数量)
+    """
+    if not ENV.cls_lst:
+        ENV.init_node_env()
+    data = GENERATORS[kind](n)
+    return data, len(data['nodes'])
@@ -0,0 +1,232 @@
+"""
+在多个进程中批量运行.vgf文件，运行结束后输出每个文件的状态、耗时和打印的内容
+
+用法: python -m editorWnd.batch graphs/ "nightly/**/*.vgf" [--jobs N] [--timeout 秒] [--codegen] [--disk-cache]
+      [-o summary.json]
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from collections import deque
+from multiprocessing.connection import Connection, wait
+from typing import Any, Deque, Dict, List, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.env import ENV
+from editorWnd.runtime.codegen import load_cached
+from editorWnd.runtime.graph import RuntimeGraph
+from editorWnd.runtime.output import OUTPUT, capture_output, setup_logging
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_TIMEOUT = 'timeout'
+# 工作进程意外退出，例如节点中的扩展模块崩溃
+STATUS_CRASHED = 'crashed'
+
+
+def collect_files(patterns: List[str]) -> List[str]:
+    """
+    :param patterns: 目录(递归查找其中的.vgf文件)、文件路径或者通配符
+    :return: 去重并排序后的文件路径
+    """
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '**', '*.vgf')
+        files.update(os.path.abspath(path) for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+def _run_file(filepath: str, codegen: bool) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        if codegen:
+            load_cached(filepath)()
+        else:
+            RuntimeGraph.load(filepath).run()
+        status, error = STATUS_OK, ''
+    except Exception as e:
+        status, error = STATUS_FAILED, ''.join(traceback.format_exception_only(e)).strip()
+    finally:
+        OUTPUT.flush()
+    return {'status': status, 'duration': time.perf_counter() - start, 'error': error}
+
+
+def _worker_main(conn: Connection, codegen: bool, output_lines: int, disk_cache_size: int):
+    """
+    工作进程：只初始化一次节点环境，然后依次运行主进程发来的文件，收到None时退出
+    :param conn: 与主进程通信的管道
+    :param codegen: 是否翻译成Python代码后运行
+    :param output_lines: 每个文件最多保留的输出行数，保留最后的部分
+    :param disk_cache_size: 主进程中的RuntimeConfig.DISK_CACHE_SIZE，spawn启动的进程不会继承修改后的设置
+    :return:
+    """
+    RuntimeConfig.DISK_CACHE_SIZE = disk_cache_size
+    ENV.init_node_env()
+    lines: Deque[str] = deque(maxlen=output_lines)
+    stdout = capture_output(lines)
+    while True:
+        filepath = conn.recv()
+        if filepath is None:
+            break
+        lines.clear()
+        result = _run_file(filepath, codegen)
+        stdout.finish()
+        result['output'] = list(lines)
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, context: multiprocessing.context.BaseContext, codegen: bool, output_lines: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, codegen, output_lines, RuntimeConfig.DISK_CACHE_SIZE),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.filepath: Union[str, None] = None
+        self.start_time: float = 0.0
+
+    def submit(self, filepath: str):
+        self.filepath = filepath
+        self.start_time = time.perf_counter()
+        self.conn.send(filepath)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def run_batch(files: List[str], jobs: int, timeout: Union[float, None] = None, codegen: bool = False,
+              output_lines: int = 1000) -> List[Dict[str, Any]]:
+    """
+    :param files: .vgf文件路径
+    :param jobs: 同时运行的进程数
+    :param timeout: 每个文件的运行时间上限(秒)，超时的进程会被结束并替换为新进程，None表示不限制
+    :param codegen: 是否翻译成Python代码后运行
+    :param output_lines: 每个文件最多保留的输出行数
+    :return: 与files顺序相同的结果
+    """
+    # 与parallel.create_pool相同，统一使用spawn
+    context = multiprocessing.get_context('spawn')
+    pending: Deque[str] = deque(files)
+    results: Dict[str, Dict[str, Any]] = {}
+    workers = [_Worker(context, codegen, output_lines) for _ in range(max(1, min(jobs, len(files))))]
+    idle = list(workers)
+    busy: Dict[Connection, _Worker] = {}
+
+    def finish(worker: _Worker, result: Dict[str, Any]):
+        result['file'] = worker.filepath
+        results[worker.filepath] = result
+        print(f'运行时: [{len(results)}/{len(files)}] {result["status"]} {worker.filepath} '
+              f'{result["duration"]:.3f}s', file=sys.stderr)
+        worker.filepath = None
+
+    def replace(worker: _Worker):
+        worker.kill()
+        workers.remove(worker)
+        new_worker = _Worker(context, codegen, output_lines)
+        workers.append(new_worker)
+        idle.append(new_worker)
+
+    try:
+        while pending or busy:
+            while idle and pending:
+                worker = idle.pop()
+                worker.submit(pending.popleft())
+                busy[worker.conn] = worker
+            wait_time = None
+            if timeout is not None:
+                now = time.perf_counter()
+                wait_time = max(0.0, min(worker.start_time + timeout for worker in busy.values()) - now)
+            for conn in wait(list(busy), wait_time):
+                worker = busy.pop(conn)
+                try:
+                    result = conn.recv()
+                except (EOFError, OSError):
+                    # 管道关闭时进程可能还没有被回收，等待后才能获取退出码
+                    worker.process.join(1)
+                    finish(worker, {'status': STATUS_CRASHED, 'duration': time.perf_counter() - worker.start_time,
+                                    'error': f'工作进程意外退出，退出码{worker.process.exitcode}', 'output': []})
+                    replace(worker)
+                    continue
+                finish(worker, result)
+                idle.append(worker)
+            if timeout is not None:
+                now = time.perf_counter()
+                for conn, worker in list(busy.items()):
+                    if now - worker.start_time < timeout:
+                        continue
+                    del busy[conn]
+                    finish(worker, {'status': STATUS_TIMEOUT, 'duration': now - worker.start_time,
+                                    'error': f'运行超过{timeout}秒', 'output': []})
+                    replace(worker)
+    finally:
+        for worker in workers:
+            if worker.filepath is None:
+                worker.stop()
+        for worker in workers:
+            if worker.filepath is not None:
+                worker.kill()
+            else:
+                worker.process.join()
+    return [results[filepath] for filepath in files]
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description='在多个进程中批量运行保存的节点图')
+    parser.add_argument('patterns', nargs='+', help='目录(递归查找.vgf文件)、.vgf文件路径或者通配符')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help='同时运行的进程数，默认为CPU核心数')
+    parser.add_argument('--timeout', type=float, default=None, help='每个文件的运行时间上限(秒)，默认不限制')
+    parser.add_argument('--codegen', action='store_true',
+                        help='把节点图翻译成Python代码后运行，代码缓存在.vgf文件同目录的__vgfcache__中')
+    parser.add_argument('--output-lines', type=int, default=1000, help='每个文件最多保留的输出行数(保留最后的部分)')
+    parser.add_argument('--disk-cache', action='store_true',
+                        help='启用纯数据子图结果的磁盘缓存，大小上限为RuntimeConfig.DISK_CACHE_DEFAULT_SIZE')
+    parser.add_argument('-o', '--output', default='', help='结果保存为json文件，默认输出到标准输出')
+    args = parser.parse_args(argv)
+    setup_logging()
+    if args.disk_cache:
+        RuntimeConfig.DISK_CACHE_SIZE = RuntimeConfig.DISK_CACHE_DEFAULT_SIZE
+    files = collect_files(args.patterns)
+    if not files:
+        print('运行时: 没有找到.vgf文件', file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    results = run_batch(files, args.jobs, args.timeout, args.codegen, args.output_lines)
+    counts = {status: 0 for status in (STATUS_OK, STATUS_FAILED, STATUS_TIMEOUT, STATUS_CRASHED)}
+    for result in results:
+        counts[result['status']] += 1
+    summary = {
+        'total': len(results),
+        **counts,
+        'jobs': args.jobs,
+        'duration': time.perf_counter() - start,
+        'results': results,
+    }
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f'运行时: 结果保存成功 -> {args.output}', file=sys.stderr)
+    else:
+        print(text)
+    return 0 if counts[STATUS_OK] == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 '''
 editor的一些可设置的参数
 '''
+import os
 
 
 class EditorConfig:
@@ -13,6 +14,16 @@ class EditorConfig:
 
     EDITOR_SCENE_GRID_SIZE = 20
     EDITOR_SCENE_GRID_CHUNK = 10
+    # 细线在屏幕上的间隔小于这么多像素时只画框线
+    EDITOR_SCENE_GRID_MIN_PIXELS = 12
+
+    # 视图缩放的范围，缩小到最小时可以看到整个大图的概览
+    EDITOR_VIEW_MIN_SCALE = 0.1
+    EDITOR_VIEW_MAX_SCALE = 5
+    # 按缩放比例减少绘制的细节：低于LOD_MEDIUM时不画端口的文字和输入控件，
+    # 低于LOD_LOW时节点只画纯色的矩形，不画标题和端口，连接边画成直线
+    EDITOR_LOD_MEDIUM = 0.6
+    EDITOR_LOD_LOW = 0.35
 
     EDITOR_SCENE_WIDTH = 32000
     EDITOR_SCENE_HEIGHT = 32000
@@ -22,6 +33,13 @@ class EditorConfig:
     EDITOR_NODE_PIN_LABEL_FONT_SIZE = 12
     EDITOR_NODE_PIN_LABEL_FONT = 'Microsoft YaHei'
 
+    # 输出面板最多保留的行数，超出后丢弃最早的行
+    CONSOLE_MAX_LINES = 10000
+    # 输出面板刷新的间隔(毫秒)，两次刷新之间的输出合并后一次性显示
+    CONSOLE_REFRESH_INTERVAL = 100
+    # 在界面线程中检查是否需要垃圾回收的间隔(毫秒)，编辑器关闭了自动回收
+    GC_INTERVAL = 500
+
 
 class NodeConfig:
     PORT_ICON_SIZE = 20
@@ -32,7 +50,20 @@ class NodeConfig:
         '节点转换': '#fa8b17',
         '控制结构': '#4e90fe',
         '输入节点': '#00bfff',
+        '向量运算': '#055c54',
+        '数据流': '#8e44ad',
+        '文件读写': '#2c6e49',
     }
+    # 性能分析时标题栏的颜色，按节点耗时在两种颜色之间过渡
+    HEAT_COLD_COLOR = '#2b2b2b'
+    HEAT_HOT_COLOR = '#ff3b1f'
+    # 端口输入框的边框颜色，输入的值无法转换为端口类型时显示为错误颜色
+    PORT_WIDGET_BORDER_COLOR = '#9499b3'
+    PORT_WIDGET_ERROR_COLOR = '#ff3b1f'
+    # 标记为参数扫描参数的输入框边框颜色
+    PORT_WIDGET_SWEEP_COLOR = '#f5a623'
+    # 标记为参数扫描结果的输出端口名称颜色
+    PORT_RESULT_COLOR = '#f5a623'
 
 
 class GroupConfig:
@@ -42,3 +73,37 @@ class GroupConfig:
     GROUP_TITLE_FONT_SIZE = 14
     GROUP_TITLE_FONT = 'Microsoft YaHei'
     GROUP_RADIUS = 1
+
+
+class RuntimeConfig:
+    # 运行前删除不会运行的节点，并把只依赖默认值的纯数据节点折叠为常量
+    OPTIMIZE_PLAN = True
+    # 纯数据节点结果缓存的条目上限，设置为0表示不缓存
+    MEMO_CACHE_SIZE = 4096
+    # 并行计算纯数据分支使用的线程/进程数，设置为0表示不并行
+    PARALLEL_WORKERS = 0
+    # 'thread': 线程池，适合会释放GIL的节点; 'process': 进程池，适合纯Python的CPU密集型节点
+    PARALLEL_BACKEND = 'thread'
+    # 性能分析时是否统计内存分配(使用tracemalloc，运行会变慢)
+    PROFILE_MEMORY = True
+    # 文件读写节点使用的缓冲区大小(字节)
+    IO_BUFFER_SIZE = 1 << 20
+    # 打印节点的输出积累到这么多行时批量写出，一次运行结束时也会写出
+    OUTPUT_FLUSH_LINES = 1000
+    # 诊断信息的级别，设置为'ERROR'时不再输出端口未设置值等警告
+    LOG_LEVEL = 'INFO'
+    # 运行轨迹最多保留的事件数量，超出后丢弃最早的事件
+    TRACE_BUFFER_SIZE = 100000
+    # 编辑器中参数扫描使用的进程数，设置为0表示使用CPU核心数
+    SWEEP_WORKERS = 0
+    # 纯数据子图结果的磁盘缓存目录，在多次运行和编辑器重启之间共享
+    DISK_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.vgf_cache')
+    # 磁盘缓存的总大小上限(字节)，超出后删除最久没有使用的结果，默认为0不使用磁盘缓存，
+    # 可以通过命令行的--disk-cache或者编辑器中的【运行】->【使用磁盘缓存】开启
+    DISK_CACHE_SIZE = 0
+    # 开启磁盘缓存时使用的大小上限(字节)
+    DISK_CACHE_DEFAULT_SIZE = 1 << 30
+    # 单个来源值或者结果在序列化之前估计的大小上限(字节)，更大的值不使用磁盘缓存
+    DISK_CACHE_MAX_VALUE = 16 << 20
+    # 子图计算耗时(秒)达到这个值时才把结果保存到磁盘
+    DISK_CACHE_MIN_TIME = 0.05
@@ -11,6 +11,8 @@ class DTypes:
     Dict = 'dict'
     Class = 'class'
     Vector = 'vector'
+    # 可迭代对象(生成器、文件等)，只能按顺序遍历一次
+    Iterator = 'iter'
 
     Color_Map = {
         'float': '#2fff09',
@@ -20,7 +22,28 @@ class DTypes:
         'bool': '#cc0606',
         'dict': '#ed6c03',
         'class': '#0747bb',
-        'vector': '#055c54'
+        'vector': '#055c54',
+        'iter': '#8e44ad',
+    }
+
+    # 可以互相连接的不同类型: (输出端口类型, 输入端口类型)，向量与标量运算时按元素广播
+    Compatible = {
+        ('vector', 'float'),
+        ('float', 'vector'),
+        ('vector', 'int'),
+        ('int', 'vector'),
+        ('bool', 'vector'),
+        # 数组和向量也可以流式遍历
+        ('list', 'iter'),
+        ('vector', 'iter'),
+        # class表示任意类型的对象
+        ('int', 'class'),
+        ('float', 'class'),
+        ('str', 'class'),
+        ('list', 'class'),
+        ('bool', 'class'),
+        ('dict', 'class'),
+        ('vector', 'class'),
     }
 
     default_widget = {
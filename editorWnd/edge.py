@@ -4,13 +4,14 @@
 from __future__ import annotations
 
 import uuid
-from typing import TYPE_CHECKING, Dict, Any, Union
+from typing import TYPE_CHECKING, Dict, Any, Union, Tuple
 
 from PySide6.QtCore import Qt, QPointF, QPoint
 from PySide6.QtGui import QPen, QPainterPath, QPainter, QColor, QPolygonF
 from PySide6.QtWidgets import QGraphicsItem, QGraphicsPathItem, QGraphicsDropShadowEffect
 
-from editorWnd.node_port import NodePort
+from editorWnd.dtypes import DTypes
+from editorWnd.node_port import NodePort, DETAIL_LOW, DETAIL_FULL
 
 if TYPE_CHECKING:
     from editorWnd.scene import Scene
@@ -35,9 +36,16 @@ class NodeEdge(QGraphicsPathItem):
         self._shadow.setOffset(0, 0)
         self._shadow.setBlurRadius(20)
         self._shadow_color = Qt.GlobalColor.yellow
+        self._shadow.setColor(self._shadow_color)
+        # 只在选中时启用阴影，未选中的边直接绘制
+        self._shadow.setEnabled(False)
+        self.setGraphicsEffect(self._shadow)
         self.setFlags(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable)
         self.setZValue(-1)  # 降低线的级别
+        # 视图缩放时设置的细节等级，paint中只读取
+        self._detail_level: int = DETAIL_FULL
 
+        self._end_points: Union[Tuple[QPointF, QPointF], None] = None
         self.update_edge_path()
         self.add_to_scene()
         self.init_edge_id()
@@ -84,6 +92,10 @@ class NodeEdge(QGraphicsPathItem):
         """
         src_pos = self.src_port.get_port_pos()
         dest_pos = self.dest_port.get_port_pos()
+        # 每次绘制都会调用，两端的位置没有变化时不需要重新计算曲线
+        if (src_pos, dest_pos) == self._end_points:
+            return
+        self._end_points = (src_pos, dest_pos)
         path = QPainterPath(src_pos)
         # 计算贝塞尔曲线手柄的长度
         x_width = src_pos.x() - dest_pos.x()
@@ -103,19 +115,32 @@ class NodeEdge(QGraphicsPathItem):
                      dest_pos)
         self.setPath(path)
 
+    def itemChange(self, change, value):
+        if change == QGraphicsItem.GraphicsItemChange.ItemSelectedHasChanged:
+            self._shadow.setEnabled(bool(value))
+        elif change == QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged:
+            # 加入场景时使用视图当前的细节等级
+            if value is not None:
+                self.set_detail_level(value.get_detail_level())
+        return super().itemChange(change, value)
+
+    def set_detail_level(self, level: int):
+        if level == self._detail_level:
+            return
+        self._detail_level = level
+        self.update()
+
     def paint(self, painter: QPainter, option, widget=...):
         # 画线
         self.update_edge_path()
         painter.setPen(self._default_pen)
         painter.setBrush(Qt.BrushStyle.NoBrush)
-        painter.drawPath(self.path())
-
-        if self.isSelected():
-            self._shadow.setColor(self._shadow_color)
-            self.setGraphicsEffect(self._shadow)
+        if self._detail_level == DETAIL_LOW:
+            # 缩小后画成直线
+            path = self.path()
+            painter.drawLine(path.elementAt(0), path.elementAt(path.elementCount() - 1))
         else:
-            self._shadow.setColor('#00000000')
-            self.setGraphicsEffect(self._shadow)
+            painter.drawPath(self.path())
 
     def to_string(self) -> Dict[str, Any]:
         edge: Dict[str, Any] = {
@@ -220,6 +245,8 @@ class DraggingEdge(QGraphicsPathItem):
     def __has_same_class(self):
         if self.src_port.port_class == self.dst_port.port_class:
             return True
+        if (self.src_port.port_class, self.dst_port.port_class) in DTypes.Compatible:
+            return True
         return False
 
     def __can_connect(self) -> bool:
@@ -8,18 +8,23 @@ import os
 from functools import partial
 from typing import List, Union, Dict, Any
 
-from PySide6.QtCore import QPointF
+from PySide6.QtCore import QPointF, QTimer, Qt
 from PySide6.QtGui import QAction, QKeySequence, QUndoStack, QUndoCommand, QGuiApplication, QCursor
 from PySide6.QtWidgets import QWidget, QBoxLayout, QMainWindow, QFileDialog, QTabWidget, QLayout, QApplication, \
-    QGraphicsItem, QMessageBox
+    QGraphicsItem, QMessageBox, QDockWidget, QInputDialog
 
 from editorWnd.command import CutCommand, PasteCommand, DelCommand, GroupCommand, UngroupCommand
+from editorWnd.config import RuntimeConfig
 from editorWnd.edge import NodeEdge
 from editorWnd.env import ENV
 from editorWnd.group import NodeGroup
 from editorWnd.node import GraphicNode
+from editorWnd.runner import GarbageCollector
+from editorWnd.runtime.output import OUTPUT, logger
 from editorWnd.scene import Scene
 from editorWnd.view import View
+from editorWnd.sweep import grid_param_sets, parse_grid, read_param_sets
+from editorWnd.widgets import ConsoleWidget, ProfileWidget, SweepWidget
 
 
 class VisualGraphWindow(QMainWindow):
@@ -27,6 +32,8 @@ class VisualGraphWindow(QMainWindow):
         super().__init__(parent)
         self.setWindowTitle('可视化编程编辑器')
         self.resize(1200, 700)
+        # 垃圾回收只在界面线程中进行，删除的节点不会在后台运行的线程中被销毁
+        self._garbage_collector = GarbageCollector(parent=self)
         self.editor = Editor(self)
         self.setCentralWidget(self.editor)
         self.__center()
@@ -65,6 +72,9 @@ class VisualGraphWindow(QMainWindow):
         self.save_all_action.setShortcut(QKeySequence('Ctrl+Alt+S'))
         self.save_all_action.triggered.connect(self.__save_all)
         file_menu.addAction(self.save_all_action)
+        self.export_code_action = QAction(text='&导出Python代码', parent=self)
+        self.export_code_action.triggered.connect(self.__export_code)
+        file_menu.addAction(self.export_code_action)
         file_menu.addSeparator()
         self.quit_action = QAction(text='&退出', parent=self)
         self.quit_action.setShortcut(QKeySequence('Alt+F4'))
@@ -126,17 +136,87 @@ class VisualGraphWindow(QMainWindow):
         self.run_action.setShortcuts([QKeySequence('F5'), QKeySequence('Ctrl+R')])
         self.run_action.triggered.connect(self.__run)
         run_menu.addAction(self.run_action)
+        self.stop_action = QAction(text='&停止运行', parent=self)
+        self.stop_action.setShortcut(QKeySequence('Shift+F5'))
+        self.stop_action.setEnabled(False)
+        self.stop_action.triggered.connect(self.__stop)
+        run_menu.addAction(self.stop_action)
+        self.live_evaluate_action = QAction(text='&实时计算', parent=self)
+        self.live_evaluate_action.setCheckable(True)
+        self.live_evaluate_action.triggered.connect(self.__live_evaluate)
+        run_menu.addAction(self.live_evaluate_action)
+        self.profile_action = QAction(text='&性能分析', parent=self)
+        self.profile_action.setCheckable(True)
+        self.profile_action.triggered.connect(self.__profile)
+        run_menu.addAction(self.profile_action)
+        self.trace_action = QAction(text='&记录运行轨迹', parent=self)
+        self.trace_action.setCheckable(True)
+        self.trace_action.triggered.connect(self.__trace)
+        run_menu.addAction(self.trace_action)
+        self.export_trace_action = QAction(text='&导出运行轨迹', parent=self)
+        self.export_trace_action.triggered.connect(self.__export_trace)
+        run_menu.addAction(self.export_trace_action)
+        self.disk_cache_action = QAction(text='&使用磁盘缓存', parent=self)
+        self.disk_cache_action.setCheckable(True)
+        self.disk_cache_action.setChecked(RuntimeConfig.DISK_CACHE_SIZE > 0)
+        self.disk_cache_action.triggered.connect(self.__disk_cache)
+        run_menu.addAction(self.disk_cache_action)
+        self.sweep_action = QAction(text='&参数扫描...', parent=self)
+        self.sweep_action.triggered.connect(self.__sweep)
+        run_menu.addAction(self.sweep_action)
+        self.sweep_csv_action = QAction(text='&参数扫描(CSV参数表)...', parent=self)
+        self.sweep_csv_action.triggered.connect(self.__sweep_csv)
+        run_menu.addAction(self.sweep_csv_action)
+        self.export_sweep_action = QAction(text='&导出扫描结果', parent=self)
+        self.export_sweep_action.triggered.connect(self.__export_sweep)
+        run_menu.addAction(self.export_sweep_action)
 
         help_menu = menubar.addMenu('帮助(&H)')
         self.about_action = QAction(text='&关于', parent=self)
         self.about_action.triggered.connect(self.__about)
         help_menu.addAction(self.about_action)
 
-        # 上次打开的路径
+        # 上次打开的路径和参数扫描的网格
         self._last_open_path: str = os.getcwd()
+        self._last_sweep_grid: str = ''
         # 最近文件列表，只记录文件的绝对路径
         self.recent_files: List[str] = []
 
+        # 后台运行时定时刷新状态栏中的进度
+        self._run_progress_timer = QTimer(self)
+        self._run_progress_timer.setInterval(200)
+        self._run_progress_timer.timeout.connect(self.__show_run_progress)
+
+        # 性能分析结果
+        self.profile_widget = ProfileWidget(self)
+        self.profile_widget.node_activated.connect(self.__profile_node_activated)
+        self.profile_dock = QDockWidget('性能分析', self)
+        self.profile_dock.setWidget(self.profile_widget)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.profile_dock)
+        self.profile_dock.hide()
+
+        # 参数扫描结果
+        self.sweep_widget = SweepWidget(self)
+        self.sweep_dock = QDockWidget('参数扫描', self)
+        self.sweep_dock.setWidget(self.sweep_widget)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.sweep_dock)
+        self.sweep_dock.hide()
+
+        # 输出面板，显示打印节点的输出和诊断信息
+        self.console_widget = ConsoleWidget(self)
+        self.console_dock = QDockWidget('输出', self)
+        self.console_dock.setWidget(self.console_widget)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.console_dock)
+        OUTPUT.set_sink(self.console_widget.append_lines)
+        logger.addHandler(self.console_widget.get_log_handler())
+        run_menu.addSeparator()
+        self.console_action = self.console_dock.toggleViewAction()
+        self.console_action.setText('&输出面板')
+        run_menu.addAction(self.console_action)
+        self.clear_console_action = QAction(text='&清空输出', parent=self)
+        self.clear_console_action.triggered.connect(self.console_widget.clear)
+        run_menu.addAction(self.clear_console_action)
+
         # tab栏
         self.tabs: List[Editor] = []
         self.tab_widget = QTabWidget(self)
@@ -171,7 +251,115 @@ class VisualGraphWindow(QMainWindow):
 
     # =================================================  运行操作  ======================================================
     def __run(self):
-        self.editor.view.run_graph()
+        self.editor.view.start_run()
+
+    def __profile(self, checked: bool):
+        self.editor.view.set_profile(checked)
+        self.profile_dock.setVisible(checked)
+
+    def __profile_updated(self, stats: List[Dict[str, Any]]):
+        # 只显示当前tab的结果
+        if stats is self.editor.view.get_profile_stats():
+            self.profile_widget.set_stats(stats)
+
+    def __trace(self, checked: bool):
+        self.editor.view.set_trace(checked)
+
+    def __disk_cache(self, checked: bool):
+        # 对所有tab生效，参数扫描的工作进程也使用这个设置
+        RuntimeConfig.DISK_CACHE_SIZE = RuntimeConfig.DISK_CACHE_DEFAULT_SIZE if checked else 0
+        for tab in self.tabs:
+            tab.view.update_disk_cache()
+
+    def __export_trace(self):
+        if not self.editor.view.has_trace():
+            QMessageBox.information(self, '导出运行轨迹', '请先打开【记录运行轨迹】并运行一次')
+            return
+        filepath, filetype = QFileDialog.getSaveFileName(self, '导出运行轨迹', os.path.join(os.getcwd(), 'trace.json'),
+                                                         'Chrome Trace(*.json)')
+        if filepath == '':
+            # 取消
+            return
+        self.editor.view.export_trace(filepath)
+
+    def __sweep(self):
+        # 与命令行的--grid相同，每行一个参数
+        lines = self._last_sweep_grid or '\n'.join(f'{name}=' for name in self.editor.view.get_sweep_port_names())
+        text, ok = QInputDialog.getMultiLineText(self, '参数扫描',
+                                                 '每行一个参数: 名称=取值\n'
+                                                 '取值为逗号分隔的列表(1,2,4)或者包含终点的范围(0:1:0.25)，运行所有组合',
+                                                 lines)
+        if not ok:
+            return
+        self._last_sweep_grid = text
+        try:
+            param_sets = grid_param_sets(parse_grid([line for line in text.splitlines() if line.strip()]))
+        except ValueError as e:
+            QMessageBox.warning(self, '参数扫描', f'参数网格无效，{e}')
+            return
+        if self.editor.view.start_sweep(param_sets):
+            self.sweep_dock.show()
+
+    def __sweep_csv(self):
+        filepath, filetype = QFileDialog.getOpenFileName(self, '选择参数表', self._last_open_path, 'CSV(*.csv)')
+        if filepath == '':
+            # 取消
+            return
+        try:
+            param_sets = read_param_sets(filepath)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, '参数扫描', f'读取参数表失败，{e}')
+            return
+        if self.editor.view.start_sweep(param_sets):
+            self.sweep_dock.show()
+
+    def __sweep_updated(self, rows: List[Dict[str, Any]]):
+        # 只显示当前tab的结果
+        if rows is self.editor.view.get_sweep_rows():
+            self.sweep_widget.set_rows(self.editor.view.get_sweep_param_names(), rows,
+                                       self.editor.view.get_sweep_result_names())
+
+    def __export_sweep(self):
+        if not self.editor.view.get_sweep_rows():
+            QMessageBox.information(self, '导出扫描结果', '请先运行一次【参数扫描】')
+            return
+        filepath, filetype = QFileDialog.getSaveFileName(self, '导出扫描结果', os.path.join(os.getcwd(), 'sweep.csv'),
+                                                         'CSV(*.csv);;JSON(*.json)')
+        if filepath == '':
+            # 取消
+            return
+        self.editor.view.export_sweep(filepath)
+
+    def __profile_node_activated(self, node_id: int):
+        self.editor.view.center_on_node(node_id)
+
+    def __stop(self):
+        self.editor.view.cancel_run()
+
+    def __update_run_actions(self, *args):
+        running = self.editor.view.is_running()
+        self.run_action.setEnabled(not running)
+        self.sweep_action.setEnabled(not running)
+        self.sweep_csv_action.setEnabled(not running)
+        self.stop_action.setEnabled(running)
+        if any(tab.view.is_running() for tab in self.tabs):
+            self._run_progress_timer.start()
+        else:
+            self._run_progress_timer.stop()
+        if running:
+            self.__show_run_progress()
+        else:
+            self.statusBar().clearMessage()
+
+    def __show_run_progress(self):
+        if self.editor.view.is_sweeping():
+            finished, total = self.editor.view.get_sweep_progress()
+            self.statusBar().showMessage(f'参数扫描中: 已完成{finished}/{total}组')
+        elif self.editor.view.is_running():
+            self.statusBar().showMessage(f'运行中: 已执行{self.editor.view.get_executed_count()}个节点')
+
+    def __live_evaluate(self, checked: bool):
+        self.editor.view.set_live_evaluate(checked)
     # ==================================================================================================================
 
     # ==================================================  编辑操作  ======================================================
@@ -194,7 +382,7 @@ class VisualGraphWindow(QMainWindow):
         self._is_cut = True
         selected_items = self.editor.stringfy_selected_items()
         if selected_items is None:
-            print('编辑器: 还没有选中任何节点和连接边')
+            logger.warning('编辑器: 还没有选中任何节点和连接边')
             return
         self.clipboard.clear()
         self.clipboard.setText(json.dumps(selected_items))
@@ -208,7 +396,7 @@ class VisualGraphWindow(QMainWindow):
         self._is_cut = False
         selected_items = self.editor.stringfy_selected_items()
         if selected_items is None:
-            print('编辑器: 还没有选中任何节点和连接边')
+            logger.warning('编辑器: 还没有选中任何节点和连接边')
             return
         # 将选中的node和edge保存为json数据存入到剪切板
         self.clipboard.clear()
@@ -224,17 +412,20 @@ class VisualGraphWindow(QMainWindow):
             if items.get('nodes', None) is not None:
                 self.editor.paste_selected_items(data=items, is_cut=self._is_cut)
             else:
-                print('编辑器: 剪切板中没有可粘贴的节点和连接边')
+                logger.warning('编辑器: 剪切板中没有可粘贴的节点和连接边')
         except ValueError:
-            print('编辑器: 剪切板中没有可粘贴的节点和连接边')
+            logger.warning('编辑器: 剪切板中没有可粘贴的节点和连接边')
 
     # ==================================================================================================================
 
     # ===============================================  文件操作  =========================================================
     def __quit(self):
-        QApplication.quit()
+        # 通过closeEvent停止并等待后台运行的线程
+        self.close()
 
     def __close_tab(self, index: int):
+        # 线程结束前不能销毁视图
+        self.tabs[index].view.cancel_run(wait=True)
         self.tab_widget.removeTab(index)
         filepath: str = ''
         for k, v in self.opened_files.items():
@@ -258,6 +449,14 @@ class VisualGraphWindow(QMainWindow):
         if len(self.tabs) > 0:
             self.tab_index = index
             self.editor = self.tabs[index]
+            self.live_evaluate_action.setChecked(self.editor.view.is_live_evaluate())
+            self.profile_action.setChecked(self.editor.view.is_profile())
+            self.trace_action.setChecked(self.editor.view.is_trace())
+            self.profile_dock.setVisible(self.editor.view.is_profile())
+            self.profile_widget.set_stats(self.editor.view.get_profile_stats())
+            self.sweep_widget.set_rows(self.editor.view.get_sweep_param_names(), self.editor.view.get_sweep_rows(),
+                                       self.editor.view.get_sweep_result_names())
+            self.__update_run_actions()
 
     def __add_a_tab(self, filepath: str = ''):
         tab_view = Editor(self)
@@ -265,6 +464,9 @@ class VisualGraphWindow(QMainWindow):
             tab_title = f'未命名-{len(self.tabs) + 1}'
         else:
             tab_title = os.path.basename(filepath)
+        tab_view.view.run_state_changed.connect(self.__update_run_actions)
+        tab_view.view.profile_updated.connect(self.__profile_updated)
+        tab_view.view.sweep_updated.connect(self.__sweep_updated)
         self.tab_widget.addTab(tab_view, tab_title)
         self.tabs.append(tab_view)
         self.__set_current_editor(tab_view, self.tab_widget.count() - 1)
@@ -341,6 +543,14 @@ class VisualGraphWindow(QMainWindow):
         self.__record_file_opened(filepath, self.tab_index)
         self.__add_to_recent_files(filepath)
 
+    def __export_code(self):
+        filepath, filetype = QFileDialog.getSaveFileName(self, '导出Python代码', os.path.join(os.getcwd(), 'graph.py'),
+                                                         'Python File(*.py)')
+        if filepath == '':
+            # 取消
+            return
+        self.editor.view.export_code(filepath)
+
     def __open_with_dialog(self):
         filepath, filetype = QFileDialog.getOpenFileName(self, '打开', self._last_open_path, 'Visual Graph File(*.vgf)')
         if filepath == '':
@@ -364,6 +574,14 @@ class VisualGraphWindow(QMainWindow):
 
     # ==================================================================================================================
 
+    def closeEvent(self, event):
+        for tab in self.tabs:
+            tab.view.cancel_run(wait=True)
+        # 之后的输出不再发送到即将销毁的面板
+        logger.removeHandler(self.console_widget.get_log_handler())
+        OUTPUT.set_sink(None)
+        super().closeEvent(event)
+
     def __center(self):
         screen = QGuiApplication.primaryScreen().geometry()
         size = self.geometry()
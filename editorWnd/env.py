@@ -7,6 +7,7 @@ from typing import Type, Dict, List
 import editorWnd.nodes
 from editorWnd.node import Node
 from editorWnd.node_lib import NodeClsLib
+from editorWnd.runtime.output import logger
 
 
 class ENV:
@@ -20,7 +21,11 @@ class ENV:
         for module in os.listdir(path_folder):
             if not module.endswith('.py') or module == '__init__.py':
                 continue
-            __import__(f'editorWnd.nodes.{module[:-3]}', locals(), globals())  # 导入模块，在locals和globals中添加模块的名字和对象
+            try:
+                __import__(f'editorWnd.nodes.{module[:-3]}', locals(), globals())  # 导入模块，在locals和globals中添加模块的名字和对象
+            except ImportError as e:
+                # 例如向量节点需要numpy，没有安装时只是不能使用这些节点
+                logger.warning('环境: 节点模块%s缺少依赖，已跳过，%s', module[:-3], e)
         # 对已导入的nodes包下的文件名进行遍历
         for module_name, _ in inspect.getmembers(editorWnd.nodes, inspect.ismodule):
             for cls_name, cls in inspect.getmembers(sys.modules[f'editorWnd.nodes.{module_name}'], inspect.isclass):
@@ -0,0 +1,71 @@
+"""
+命令行运行.vgf文件，整个过程不创建任何Qt对象
+节点类继承自Qt的图元，加载节点类时仍然会导入PySide6(不需要显示器，导入大约需要0.3秒)
+
+用法: python -m editorWnd.headless graph.vgf [graph.vgf ...] [--workers N [--processes]] [--codegen] [--profile] [--trace]
+      [--disk-cache]
+"""
+import argparse
+import os
+import sys
+from typing import List, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.runtime.codegen import CodegenError, load_cached
+from editorWnd.runtime.graph import RuntimeGraph, GraphLoadError
+from editorWnd.runtime.output import setup_logging
+from editorWnd.runtime.parallel import create_pool, POOL_PROCESS, POOL_THREAD
+from editorWnd.runtime.plan import GraphCompileError
+from editorWnd.runtime.profiler import NodeProfiler
+from editorWnd.runtime.trace import TraceRecorder
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description='不启动编辑器，直接运行保存的节点图',
+                                     epilog='不创建窗口和Qt对象，但节点类继承自Qt的图元，仍然需要安装PySide6')
+    parser.add_argument('files', nargs='+', help='.vgf文件路径')
+    parser.add_argument('--workers', type=int, default=0, help='并行计算纯数据分支的线程/进程数，默认不并行')
+    parser.add_argument('--processes', action='store_true', help='使用进程池代替线程池')
+    parser.add_argument('--codegen', action='store_true',
+                        help='把节点图翻译成Python代码后运行，代码缓存在.vgf文件同目录的__vgfcache__中')
+    parser.add_argument('--profile', action='store_true', help='运行结束后输出每个节点的耗时统计')
+    parser.add_argument('--trace', action='store_true',
+                        help='记录运行轨迹，保存为.vgf文件同目录的<文件名>.trace.json，可以在Perfetto中查看')
+    parser.add_argument('--disk-cache', action='store_true',
+                        help='启用纯数据子图结果的磁盘缓存，大小上限为RuntimeConfig.DISK_CACHE_DEFAULT_SIZE')
+    args = parser.parse_args(argv)
+    setup_logging()
+    if args.disk_cache:
+        RuntimeConfig.DISK_CACHE_SIZE = RuntimeConfig.DISK_CACHE_DEFAULT_SIZE
+    pool = create_pool(args.workers, POOL_PROCESS if args.processes else POOL_THREAD) if args.workers > 0 else None
+    try:
+        for filepath in args.files:
+            try:
+                if args.codegen:
+                    load_cached(filepath)()
+                    continue
+                graph = RuntimeGraph.load(filepath)
+                graph.set_pool(pool)
+                profiler = NodeProfiler(track_memory=True) if args.profile else None
+                graph.set_profiler(profiler)
+                tracer = TraceRecorder(RuntimeConfig.TRACE_BUFFER_SIZE) if args.trace else None
+                graph.set_tracer(tracer)
+                try:
+                    graph.run()
+                finally:
+                    # 运行出错时也保存已经记录的轨迹
+                    if tracer is not None:
+                        tracer.export(os.path.splitext(filepath)[0] + '.trace.json')
+                if profiler is not None:
+                    print(f'运行时: {filepath} 性能分析\n{profiler.report()}', file=sys.stderr)
+            except (OSError, ValueError, GraphLoadError, GraphCompileError, CodegenError) as e:
+                print(f'运行时: {filepath} 运行失败，{e}', file=sys.stderr)
+                return 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
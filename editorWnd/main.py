@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 import sys
 
@@ -6,6 +7,7 @@ from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QApplication
 
 from editorWnd.editor import VisualGraphWindow
+from editorWnd.runtime.output import setup_logging
 
 GLOBAL_STYLESHEET = '''
     QMainWindow {
@@ -116,8 +118,11 @@ GLOBAL_STYLESHEET = '''
 '''
 
 if __name__ == '__main__':
+    # 打包后参数扫描和进程池启动的子进程会重新运行本文件，需要在创建窗口之前交给multiprocessing处理
+    multiprocessing.freeze_support()
     # 把运行目录切换到项目根目录
     os.chdir(os.path.dirname(os.path.dirname(__file__)))
+    setup_logging()
     app = QApplication([])
     icon = QIcon()
     icon.addFile('assets/app.ico', QSize(), QIcon.Mode.Normal, QIcon.State.Off)
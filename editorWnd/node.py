@@ -6,19 +6,22 @@ from __future__ import annotations
 import abc
 import string
 import uuid
-from typing import TYPE_CHECKING, Union, List, Any, Dict
+from typing import TYPE_CHECKING, Union, List, Any, Dict, Tuple
 
 from PySide6.QtCore import QRectF, Qt
 from PySide6.QtGui import QPen, QColor, QBrush, QPainterPath, QFont
 from PySide6.QtWidgets import QGraphicsItem, QGraphicsTextItem, QGraphicsDropShadowEffect
 
 from editorWnd.config import EditorConfig, NodeConfig
-from editorWnd.node_port import NodePort, ExecInPort, ExecOutPort, ParamPort, OutputPort, NodeOutput, NodeInput, Pin
+from editorWnd.node_port import NodePort, ExecInPort, ExecOutPort, ParamPort, OutputPort, NodeOutput, NodeInput, Pin, \
+    DETAIL_LOW, DETAIL_FULL
+from editorWnd.runtime.output import logger
 
 if TYPE_CHECKING:
     from editorWnd.group import NodeGroup
     from editorWnd.edge import NodeEdge
     from editorWnd.scene import Scene
+    from editorWnd.runtime.executor import GraphExecutor
 
 
 class GraphicNode(QGraphicsItem):
@@ -54,6 +57,8 @@ class GraphicNode(QGraphicsItem):
         self._title_color = Qt.GlobalColor.white
         self._title_padding: float = 5
         self._title_background_brush = QBrush(QColor('#aa4e90fe'))
+        # 性能分析的热度颜色，为None时使用原来的标题颜色
+        self._heat_brush: Union[QBrush, None] = None
         # port的边距
         self._port_padding: float = 7
         self._param_ports: list[ParamPort] = param_ports
@@ -64,6 +69,13 @@ class GraphicNode(QGraphicsItem):
         self._shadow = QGraphicsDropShadowEffect()
         self._shadow.setOffset(0, 0)
         self._shadow.setBlurRadius(20)
+        self._shadow.setColor(Qt.GlobalColor.yellow)
+        # 阴影需要先把节点画到离屏图片中，只在选中时启用
+        self._shadow.setEnabled(False)
+        self.setGraphicsEffect(self._shadow)
+        # 当前的细节等级，以及缩小时隐藏的标题和端口
+        self._detail_level: int = DETAIL_FULL
+        self._lod_hidden_items: List[QGraphicsItem] = []
 
         self.setFlags(
             QGraphicsItem.GraphicsItemFlag.ItemIsMovable
@@ -122,6 +134,13 @@ class GraphicNode(QGraphicsItem):
             if len(self.edges) > 0:
                 for edge in self.edges:
                     edge.update()
+        elif change == QGraphicsItem.GraphicsItemChange.ItemSelectedHasChanged:
+            self._shadow.setEnabled(bool(value))
+            self.setZValue(1 if value else 0)
+        elif change == QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged:
+            # 加入场景时使用视图当前的细节等级
+            if value is not None:
+                self.set_detail_level(value.get_detail_level())
         return super().itemChange(change, value)
 
     def __init_exec_ports(self):
@@ -154,6 +173,23 @@ class GraphicNode(QGraphicsItem):
     def set_scene(self, scene: Scene = None):
         self._scene = scene
 
+    def set_heat(self, heat: Union[float, None]):
+        """
+        按性能分析的结果给标题栏着色
+        :param heat: 0~1，越大表示耗时越多，None表示恢复原来的颜色
+        :return:
+        """
+        if heat is None:
+            self._heat_brush = None
+        else:
+            heat = min(max(heat, 0.0), 1.0)
+            cold = QColor(NodeConfig.HEAT_COLD_COLOR)
+            hot = QColor(NodeConfig.HEAT_HOT_COLOR)
+            self._heat_brush = QBrush(QColor(int(cold.red() + (hot.red() - cold.red()) * heat),
+                                             int(cold.green() + (hot.green() - cold.green()) * heat),
+                                             int(cold.blue() + (hot.blue() - cold.blue()) * heat)))
+        self.update()
+
     def __init_title(self):
         color = QColor(NodeConfig.node_title_background_color.get(self.pkg_name, '#4e90fe'))
         self._pen_default = QPen(color)
@@ -185,14 +221,40 @@ class GraphicNode(QGraphicsItem):
     def boundingRect(self) -> QRectF:
         return QRectF(0, 0, self._node_width, self._node_height)
 
+    def set_detail_level(self, level: int):
+        """
+        视图缩放跨过细节等级时调用，缩小到DETAIL_LOW时隐藏标题和端口(包括端口的输入控件)，放大后恢复
+        :param level:
+        :return:
+        """
+        if level == self._detail_level:
+            return
+        if (level == DETAIL_LOW) != (self._detail_level == DETAIL_LOW):
+            if level == DETAIL_LOW:
+                self._lod_hidden_items = [item for item in self.childItems() if item.isVisible()]
+                for item in self._lod_hidden_items:
+                    item.setVisible(False)
+            else:
+                for item in self._lod_hidden_items:
+                    item.setVisible(True)
+                self._lod_hidden_items = []
+        self._detail_level = level
+        for item in self.childItems():
+            if isinstance(item, NodePort):
+                item.set_detail_level(level)
+        self.update()
+
     def paint(self, painter, option, widget=...) -> None:
-        # 先画选中时的阴影
-        if self.isSelected():
-            self._shadow.setColor(QColor('#cceeee00'))
-            self.setGraphicsEffect(self._shadow)
-        else:
-            self._shadow.setColor(QColor('#00000000'))
-            self.setGraphicsEffect(self._shadow)
+        title_brush = self._title_background_brush if self._heat_brush is None else self._heat_brush
+        if self._detail_level == DETAIL_LOW:
+            # 缩小后只画纯色的矩形，不画圆角
+            painter.fillRect(QRectF(0, 0, self._node_width, self._node_height), self._background_brush)
+            painter.fillRect(QRectF(0, 0, self._node_width, self._title_height), title_brush)
+            if self.isSelected():
+                painter.setPen(self._pen_selected)
+                painter.setBrush(Qt.BrushStyle.NoBrush)
+                painter.drawRect(self.boundingRect())
+            return
 
         # 画背景颜色
         node_outline = QPainterPath()
@@ -210,24 +272,13 @@ class GraphicNode(QGraphicsItem):
         title_outline.addRect(self._node_width - self._node_radius, self._title_height - self._node_radius,
                               self._node_radius, self._node_radius)
         painter.setPen(Qt.PenStyle.NoPen)
-        painter.setBrush(self._title_background_brush)
+        painter.setBrush(title_brush)
         painter.drawPath(title_outline.simplified())
 
         # 先画所有的背景，再画选择时的线，防止线被盖住
-        if self.isSelected():
-            painter.setPen(self._pen_selected)
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.drawPath(node_outline)
-            self._shadow.setColor(Qt.GlobalColor.yellow)
-            self.setGraphicsEffect(self._shadow)
-            self.setZValue(1)
-        else:
-            painter.setPen(self._pen_default)
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.drawPath(node_outline)
-            self._shadow.setColor(QColor('#00000000'))
-            self.setGraphicsEffect(self._shadow)
-            self.setZValue(0)
+        painter.setPen(self._pen_selected if self.isSelected() else self._pen_default)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawPath(node_outline)
 
     def add_port(self, port: NodePort = None, index: int = 0):
         if port.port_type == NodePort.PORT_TYPE_EXEC_IN:
@@ -276,6 +327,18 @@ class Node(GraphicNode):
     node_description: str = ''
     input_pins: List[NodeInput] = []
     output_pins: List[NodeOutput] = []
+    # 执行输出是否需要等待后续节点执行完毕才能继续，循环节点需要设置为True
+    sync_exec: bool = False
+    # sync_exec节点最后触发的执行输出(例如循环的完成端口)，触发后节点不再有其他操作，
+    # 后续节点在该节点返回后由调度循环运行，顺序连接的循环不会层层嵌套
+    tail_exec_outputs: Tuple[int, ...] = ()
+    # 纯数据节点：没有执行端口和副作用，输出只由输入决定，运行结果可以被缓存
+    pure: bool = False
+    # 生成Python代码时使用的表达式: {输出端口下标: 表达式}，表达式中的{i}替换为第i个输入的值
+    # 没有设置时生成的代码会调用run_node
+    code_outputs: Dict[int, str] = {}
+    # 表达式中用到的节点所在模块中的函数，生成的代码会导入它们
+    code_imports: Tuple[str, ...] = ()
 
     def __init__(self):
         # 状态
@@ -284,6 +347,9 @@ class Node(GraphicNode):
 
         self._session_id: int = 0
         self._node_id: int = uuid.uuid1().int
+        # 运行时绑定的执行器以及节点在执行计划中的下标
+        self._executor: Union[GraphExecutor, None] = None
+        self._plan_index: int = -1
 
         self.is_validate()
 
@@ -299,31 +365,40 @@ class Node(GraphicNode):
     def get_node_id(self) -> int:
         return self._node_id
 
+    def set_executor(self, executor: Union[GraphExecutor, None], index: int):
+        self._executor = executor
+        self._plan_index = index
+
     @abc.abstractmethod
     def run_node(self):
         pass
 
-    def new_session(self, session_id: int):
+    def run_finished(self):
+        """
+        一次运行结束后调用(包括出错和取消)，用于关闭节点在运行中打开的文件等资源
+        节点对象在多次运行之间复用(编辑器中重复运行、参数扫描)，运行中修改的属性也要在这里恢复
+        :return:
+        """
+        pass
+
+    def port_value_changed(self, port: NodePort):
         """
-        创建新的session
-        :param session_id:
+        输入端口控件中的值被修改
+        :param port:
         :return:
         """
-        self._session_id = session_id
-        for port in self.in_ports:
-            port.new_session(self._session_id)
-        for port in self.out_ports:
-            port.new_session(self._session_id)
+        if self._scene is not None and self._scene.get_view() is not None:
+            self._scene.get_view().port_value_changed(self)
 
     def is_validate(self) -> bool:
         if self.node_title == '':
-            print('节点: 节点标题不能为空')
+            logger.error('节点: 节点标题不能为空')
             return False
         if self.node_title is None:
-            print('节点: 节点标题不能为None')
+            logger.error('节点: 节点标题不能为None')
             return False
         if self.input_pins is None:
-            print('节点: 输入端口不能为None')
+            logger.error('节点: 输入端口不能为None')
             return False
         if self.output_pins is None:
             self.output_pins = []
@@ -335,9 +410,11 @@ class Node(GraphicNode):
         :param index: 索引
         :return: pin中存储的值
         """
+        if self._executor is not None:
+            return self._executor.input(self._plan_index, index)
         pin = self.input_pins[index]
         if not pin.pin_type == Pin.PinType.DATA:
-            print(f'节点: {self.node_title}的第{index}个端口不是一个数据端口')
+            logger.warning('节点: %s的第%d个端口不是一个数据端口', self.node_title, index)
             return None
         port = self.in_ports[index]
         port_value = port.get_default_value()
@@ -353,16 +430,21 @@ class Node(GraphicNode):
         :param index: 索引
         :return:
         """
+        if self._executor is not None:
+            self._executor.output(self._plan_index, index, value)
+            return
         pin = self.output_pins[index]
         if not pin.pin_type == Pin.PinType.DATA:
-            print(f'节点: {self.node_title}的第{index}个端口不是一个数据端口')
+            logger.warning('节点: %s的第%d个端口不是一个数据端口', self.node_title, index)
             return None
         self.out_ports[index].set_port_value(value)
 
     def exec_input(self, index) -> Union[bool, None]:
+        if self._executor is not None:
+            return self._executor.exec_input(self._plan_index, index)
         pin = self.input_pins[index]
         if not pin.pin_type == Pin.PinType.EXEC:
-            print(f'节点: {self.node_title}的第{index}个端口不是一个执行端口')
+            logger.warning('节点: %s的第%d个端口不是一个执行端口', self.node_title, index)
             return None
         # 如果是，则获取该端口连接的节点
         port = self.in_ports[index]
@@ -374,9 +456,12 @@ class Node(GraphicNode):
         :param index:
         :return:
         """
+        if self._executor is not None:
+            self._executor.exec_output(self._plan_index, index)
+            return
         pin = self.output_pins[index]
         if not pin.pin_type == Pin.PinType.EXEC:
-            print(f'节点: {self.node_title}的第{index}个端口不是一个执行端口')
+            logger.warning('节点: %s的第%d个端口不是一个执行端口', self.node_title, index)
             return
         # 如果是，则获取该端口连接的节点
         port = self.out_ports[index]
@@ -401,8 +486,20 @@ class Node(GraphicNode):
             'pos': (self.scenePos().x(), self.scenePos().y()),
             'port_values': {}
         }
+        sweep_params: Dict[int, str] = {}
         for index, port in enumerate(self.in_ports):
             value = port.get_default_value()
             if value is not None:
                 node['port_values'][index] = value
+            if isinstance(port, ParamPort) and port.get_sweep_name():
+                sweep_params[index] = port.get_sweep_name()
+        # 只有标记了扫描参数的节点才保存，旧版本的文件中没有这一项
+        if sweep_params:
+            node['sweep_params'] = sweep_params
+        result_ports: Dict[int, str] = {}
+        for index, port in enumerate(self.out_ports):
+            if isinstance(port, OutputPort) and port.get_result_name():
+                result_ports[index] = port.get_result_name()
+        if result_ports:
+            node['result_ports'] = result_ports
         return node
@@ -8,11 +8,14 @@ import string
 from typing import TYPE_CHECKING, Any, Type, List, Union
 
 from PySide6.QtCore import Qt, QRectF, QPointF, QPoint
-from PySide6.QtGui import QPainterPath, QColor, QBrush, QFont, QPolygonF, QPen, QIntValidator, QDoubleValidator
-from PySide6.QtWidgets import QGraphicsItem, QGraphicsProxyWidget, QLineEdit, QCheckBox
+from PySide6.QtGui import QPainterPath, QColor, QBrush, QFont, QPolygonF, QPen, QIntValidator, QDoubleValidator, \
+    QCursor, QTransform
+from PySide6.QtWidgets import QGraphicsItem, QGraphicsProxyWidget, QLineEdit, QCheckBox, QGraphicsSimpleTextItem, \
+    QMenu, QInputDialog, QStyleOptionGraphicsItem
 
 from editorWnd.config import NodeConfig, EditorConfig
 from editorWnd.dtypes import DTypes
+from editorWnd.runtime.output import logger
 
 if TYPE_CHECKING:
     from editorWnd.scene import Scene
@@ -20,12 +23,41 @@ if TYPE_CHECKING:
     from editorWnd.edge import NodeEdge
 
 
+LINE_EDIT_STYLE = '''
+background-color: transparent;
+border: 1px solid %s;
+color: #9499b3;
+'''
+
+# 绘制的细节等级，由视图的缩放比例决定
+DETAIL_LOW = 0
+DETAIL_MEDIUM = 1
+DETAIL_FULL = 2
+
+
+def get_detail_level(transform: QTransform) -> int:
+    """
+    视图缩放时调用，缩小视图后文字和控件已经看不清，不再绘制
+    :param transform: 视图的变换，包含了缩放
+    :return: DETAIL_LOW、DETAIL_MEDIUM或者DETAIL_FULL
+    """
+    lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(transform)
+    if lod < EditorConfig.EDITOR_LOD_LOW:
+        return DETAIL_LOW
+    if lod < EditorConfig.EDITOR_LOD_MEDIUM:
+        return DETAIL_MEDIUM
+    return DETAIL_FULL
+
+
 class NodePort(QGraphicsItem):
     PORT_TYPE_EXEC_IN = 1001
     PORT_TYPE_EXEC_OUT = 1002
     PORT_TYPE_PARAM = 1003
     PORT_TYPE_OUTPUT = 1004
 
+    # 全局的session计数，端口中的值只在设置它的session内有效，开启新的session时不需要逐个重置端口
+    session_counter: int = 0
+
     def __init__(self, port_label: str = '', port_class: str = 'str', port_color: str = '#ffffff',
                  port_type: int = PORT_TYPE_EXEC_IN, parent=None, connected_ports: list[NodePort] = None,
                  edges: list[NodeEdge] = None, default_widget: Type | None = None, hide_icon: bool = False):
@@ -63,13 +95,7 @@ class NodePort(QGraphicsItem):
             self._default_widget.setTextMargins(0, 0, 0, 0)
             self._default_widget.setFixedWidth(30)
             self._default_widget.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-            self._default_widget.setStyleSheet(
-                '''
-                background-color: transparent;
-                border: 1px solid #9499b3;
-                color: #9499b3;
-                '''
-            )
+            self._default_widget.setStyleSheet(LINE_EDIT_STYLE % NodeConfig.PORT_WIDGET_BORDER_COLOR)
             self.port_width += 25
         elif isinstance(self._default_widget, QCheckBox):
             self._default_widget.setFixedSize(20, 20)
@@ -91,48 +117,31 @@ class NodePort(QGraphicsItem):
         self._has_set_value: bool = False
 
         self._port_index:int = 0
+        # 视图缩放时由节点设置的细节等级，paint中只读取
+        self._detail_level: int = DETAIL_FULL
 
-    def new_session(self, session_id: int):
-        self._session_id = session_id
-        self._has_set_value = False
-        self._port_value = None
+    @staticmethod
+    def start_new_session() -> int:
+        NodePort.session_counter += 1
+        return NodePort.session_counter
 
     def is_connected(self) -> bool:
         return len(self._edges) > 0
 
     def has_set_value(self) -> bool:
-        return self._has_set_value
+        return self._has_set_value and self._session_id == NodePort.session_counter
 
     def set_port_value(self, value: Union[str, int, float, bool, None]):
+        self._session_id = NodePort.session_counter
         self._has_set_value = True
         self._port_value = value
 
     def get_port_value(self) -> Union[str, int, float, bool, None]:
-        return self._port_value
+        return self._port_value if self.has_set_value() else None
 
     def get_default_value(self) -> Union[str, bool, int, float, None]:
-        if self._default_widget is None or not self._default_widget.isVisible():
-            self._port_value = None
-            self._has_set_value = False
-            return None
-        else:
-            if isinstance(self._default_widget, QLineEdit):
-                if self.port_class == DTypes.Integer:
-                    try:
-                        self._port_value = int(self._default_widget.text())
-                    except:
-                        pass
-                elif self.port_class == DTypes.Float:
-                    try:
-                        self._port_value = float(self._default_widget.text())
-                    except:
-                        pass
-                else:
-                    self._port_value = self._default_widget.text()
-                return self._port_value
-            elif isinstance(self._default_widget, QCheckBox):
-                self._port_value = self._default_widget.isChecked()
-                return self._port_value
+        # 只有参数端口有默认值控件
+        return None
 
     def set_widget_value(self, value: Any):
         if isinstance(self._default_widget, QLineEdit):
@@ -143,12 +152,12 @@ class NodePort(QGraphicsItem):
     def get_value_from_connected_port(self) -> Union[str, int, float, bool, None]:
         if self.is_connected():
             connected_port = self._connected_ports[0]
-            # 如果连接的端口没有设置值，强制执行parent_node
-            if not connected_port._has_set_value:
+            # 如果连接的端口在本次session中没有设置值，强制执行parent_node
+            if not connected_port.has_set_value():
                 connected_port.parent_node.run_node()
-            return connected_port._port_value
+            return connected_port.get_port_value()
         else:
-            print(f'节点: {self.parent_node.node_title}的{self._port_label}端口还没有设置值且没有连接的边')
+            logger.warning('节点: %s的%s端口还没有设置值且没有连接的边', self.parent_node.node_title, self._port_label)
             return None
 
     def get_connected_ports(self) -> List[NodePort]:
@@ -170,6 +179,12 @@ class NodePort(QGraphicsItem):
                 __count += 1
         return __count
 
+    def set_detail_level(self, level: int):
+        if level == self._detail_level:
+            return
+        self._detail_level = level
+        self.update()
+
     def add_edge(self, edge: NodeEdge, port: NodePort):
         self.__remove_edge_by_condition()
         self.parent_node.add_connected_node(port.parent_node, edge)
@@ -219,6 +234,9 @@ class NodePort(QGraphicsItem):
     def get_port_index(self) -> int:
         return self._port_index
 
+    def get_port_label(self) -> str:
+        return self._port_label
+
 
 class ExecPort(NodePort):
     def __init__(self, port_label: str = '', port_class: str = 'str', port_color: str = '#ffffff',
@@ -265,6 +283,8 @@ class ExecInPort(ExecPort):
         if len(self._edges) > 0:
             self._fill_port(painter)
 
+        if self._detail_level < DETAIL_FULL:
+            return
         painter.setPen(self._default_pen)
         painter.setFont(self._port_font)
         painter.drawText(
@@ -293,11 +313,12 @@ class ExecOutPort(ExecPort):
         painter.drawPath(port_outline.simplified())
 
     def paint(self, painter, option, widget=...):
-        painter.setPen(self._default_pen)
-        painter.setFont(self._port_font)
-        painter.drawText(
-            QRectF(0, 0, self.port_label_size, self.port_icon_size),
-            Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, self._port_label)
+        if self._detail_level == DETAIL_FULL:
+            painter.setPen(self._default_pen)
+            painter.setFont(self._port_font)
+            painter.drawText(
+                QRectF(0, 0, self.port_label_size, self.port_icon_size),
+                Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, self._port_label)
 
         port_outline = QPainterPath()
         poly = QPolygonF()
@@ -330,6 +351,11 @@ class ParamPort(NodePort):
         super().__init__(port_label, port_class, port_color, NodePort.PORT_TYPE_PARAM, parent,
                          default_widget=default_widget, hide_icon=hide_icon)
         self._has_set_value = len(self._edges) > 0
+        # 控件中的值转换为端口类型后缓存起来，只在控件的值变化时重新转换，运行时不需要访问控件
+        self._default_value: Union[str, bool, int, float, None] = None
+        # 参数扫描时按这个名称替换默认值，空字符串表示不是扫描参数
+        self._sweep_name: str = ''
+        self._value_error: str = ''
         self.__init_default_widget()
 
     def _fill_port(self, painter):
@@ -358,19 +384,32 @@ class ParamPort(NodePort):
             painter.drawPolygon(poly)
 
             # 文字
-            painter.setPen(self._default_pen)
-            painter.setFont(self._port_font)
-            painter.drawText(
-                QRectF(self.port_icon_size, 0, self.port_label_size, self.port_icon_size),
-                Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, self._port_label)
+            if self._detail_level == DETAIL_FULL:
+                painter.setPen(self._default_pen)
+                painter.setFont(self._port_font)
+                painter.drawText(
+                    QRectF(self.port_icon_size, 0, self.port_label_size, self.port_icon_size),
+                    Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, self._port_label)
 
         if len(self._edges) > 0:
             self._fill_port(painter)
-            if self._default_widget:
-                self._default_widget.setVisible(False)
-        else:
-            if self._default_widget:
-                self._default_widget.setVisible(True)
+
+    def set_detail_level(self, level: int):
+        super().set_detail_level(level)
+        self.__update_widget_visible()
+
+    def add_edge(self, edge: NodeEdge, port: NodePort):
+        super().add_edge(edge, port)
+        self.__update_widget_visible()
+
+    def remove_edge(self, edge: NodeEdge):
+        super().remove_edge(edge)
+        self.__update_widget_visible()
+
+    def __update_widget_visible(self):
+        # 已经连接或者缩小后看不清时隐藏输入控件
+        if self._default_widget:
+            self._default_widget.setVisible(len(self._edges) == 0 and self._detail_level == DETAIL_FULL)
 
     def __init_default_widget(self):
         # 得到参数的类型
@@ -378,17 +417,147 @@ class ParamPort(NodePort):
             self._default_widget.setValidator(QIntValidator())
         elif self.port_class == DTypes.Float:
             self._default_widget.setValidator(QDoubleValidator())
+        # 控件的值发生变化时通知节点
+        if isinstance(self._default_widget, QLineEdit):
+            self._default_widget.textChanged.connect(self.__widget_value_changed)
+        elif isinstance(self._default_widget, QCheckBox):
+            self._default_widget.toggled.connect(self.__widget_value_changed)
+        if self._default_widget is not None:
+            self._default_widget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+            self._default_widget.customContextMenuRequested.connect(self.__show_widget_menu)
         proxy = QGraphicsProxyWidget(self)
         proxy.setWidget(self._default_widget)
         if self.hide_icon:
             proxy.setPos(10, 0)
         else:
             proxy.setPos(self.port_icon_size + self.port_label_size, 0)
+        if self._default_widget is not None:
+            self.__update_default_value()
+
+    def get_default_value(self) -> Union[str, bool, int, float, None]:
+        # 有连接时控件被隐藏，值从连接的端口获取
+        if self._edges:
+            return None
+        return self._default_value
+
+    def __update_default_value(self):
+        """
+        把控件中的值转换为端口的类型，转换失败时在控件上标出错误
+        :return:
+        """
+        if isinstance(self._default_widget, QCheckBox):
+            self._default_value = self._default_widget.isChecked()
+            return
+        text = self._default_widget.text()
+        self._value_error = ''
+        if self.port_class == DTypes.Integer or self.port_class == DTypes.Float:
+            value_type, type_name = (int, '整数') if self.port_class == DTypes.Integer else (float, '浮点数')
+            try:
+                self._default_value = value_type(text) if text else None
+            except ValueError:
+                self._default_value = None
+                self._value_error = f'{text}不是有效的{type_name}'
+        else:
+            self._default_value = text
+        self.__update_widget_style()
+
+    def __update_widget_style(self):
+        if self._value_error:
+            color, tooltip = NodeConfig.PORT_WIDGET_ERROR_COLOR, self._value_error
+        elif self._sweep_name:
+            color, tooltip = NodeConfig.PORT_WIDGET_SWEEP_COLOR, f'扫描参数: {self._sweep_name}'
+        else:
+            color, tooltip = NodeConfig.PORT_WIDGET_BORDER_COLOR, ''
+        if isinstance(self._default_widget, QLineEdit):
+            self._default_widget.setStyleSheet(LINE_EDIT_STYLE % color)
+        self._default_widget.setToolTip(tooltip)
+
+    def get_sweep_name(self) -> str:
+        return self._sweep_name
+
+    def set_sweep_name(self, name: str):
+        """
+        标记为参数扫描的参数，扫描时按名称替换控件中的值
+        :param name: 参数名称，空字符串表示取消标记
+        :return:
+        """
+        self._sweep_name = name
+        if self._default_widget is not None:
+            self.__update_widget_style()
+
+    def __show_widget_menu(self, pos):
+        if isinstance(self._default_widget, QLineEdit):
+            menu = self._default_widget.createStandardContextMenu()
+            menu.addSeparator()
+        else:
+            menu = QMenu()
+        sweep_action = menu.addAction('取消扫描参数' if self._sweep_name else '设为扫描参数...')
+        if menu.exec(QCursor.pos()) is not sweep_action:
+            return
+        if self._sweep_name:
+            self.set_sweep_name('')
+            return
+        default_name = self._port_label or (self.parent_node.node_title if self.parent_node is not None else '')
+        name, ok = QInputDialog.getText(None, '扫描参数', '参数名称:', text=default_name)
+        if ok and name.strip():
+            self.set_sweep_name(name.strip())
+
+    def __widget_value_changed(self, *args):
+        self.__update_default_value()
+        if self.parent_node is not None:
+            self.parent_node.port_value_changed(self)
 
 
 class OutputPort(NodePort):
     def __init__(self, port_label: str = '', port_class: str = 'str', port_color: str = '#ffffff', parent=None):
         super().__init__(port_label, port_class, port_color, NodePort.PORT_TYPE_OUTPUT, parent)
+        # 实时计算时显示在端口右侧的值
+        self._value_item: Union[QGraphicsSimpleTextItem, None] = None
+        # 参数扫描时把这个端口的值按名称记录到结果表中，空字符串表示不是结果
+        self._result_name: str = ''
+        self._result_pen = QPen(QColor(NodeConfig.PORT_RESULT_COLOR))
+
+    def get_result_name(self) -> str:
+        return self._result_name
+
+    def set_result_name(self, name: str):
+        """
+        标记为参数扫描的结果，每次运行后端口的值记录在结果表中
+        :param name: 结果名称，空字符串表示取消标记
+        :return:
+        """
+        self._result_name = name
+        self.setToolTip(f'结果: {name}' if name else '')
+        self.update()
+
+    def contextMenuEvent(self, event):
+        menu = QMenu()
+        result_action = menu.addAction('取消结果' if self._result_name else '设为结果...')
+        if menu.exec(event.screenPos()) is not result_action:
+            return
+        if self._result_name:
+            self.set_result_name('')
+            return
+        default_name = self._port_label or (self.parent_node.node_title if self.parent_node is not None else '')
+        name, ok = QInputDialog.getText(None, '参数扫描结果', '结果名称:', text=default_name)
+        if ok and name.strip():
+            self.set_result_name(name.strip())
+
+    def show_value(self, value: Any):
+        if self._value_item is None:
+            self._value_item = QGraphicsSimpleTextItem(self)
+            self._value_item.setFont(self._port_font)
+            self._value_item.setBrush(self._default_brush)
+            self._value_item.setPos(self.port_label_size + self.port_icon_size + 5, 1)
+        text = '' if value is None else str(value)
+        if len(text) > 20:
+            text = text[:17] + '...'
+        self._value_item.setText(text)
+        self._value_item.setVisible(True)
+
+    def hide_value(self):
+        if self._value_item is not None:
+            self._value_item.setVisible(False)
 
     def _fill_port(self, painter):
         # 填充
@@ -407,11 +576,12 @@ class OutputPort(NodePort):
 
     def paint(self, painter, option, widget=...):
         # 文字
-        painter.setPen(self._default_pen)
-        painter.setFont(self._port_font)
-        painter.drawText(
-            QRectF(0, 0, self.port_label_size, self.port_icon_size),
-            Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, self._port_label)
+        if self._detail_level == DETAIL_FULL:
+            painter.setPen(self._result_pen if self._result_name else self._default_pen)
+            painter.setFont(self._port_font)
+            painter.drawText(
+                QRectF(0, 0, self.port_label_size, self.port_icon_size),
+                Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, self._port_label)
 
         # 圆
         painter.setPen(self._default_pen)
@@ -455,6 +625,9 @@ class Pin:
     def get_pin_type(self) -> PinType:
         return self.pin_type
 
+    def get_pin_name(self) -> str:
+        return self._pin_name
+
     @abc.abstractmethod
     def init_port(self, index: int):
         pass
@@ -471,7 +644,7 @@ class NodeInput(Pin):
             self.port.set_port_index(index)
         else:
             self.port = None
-            print('no such kinds of pin type')
+            logger.error('端口: 不支持的端口类型 %s', self.pin_type)
         return self.port
 
 
@@ -485,5 +658,5 @@ class NodeOutput(Pin):
             self.port.set_port_index(index)
         else:
             self.port = None
-            print('no such kinds of pin type')
+            logger.error('端口: 不支持的端口类型 %s', self.pin_type)
         return self.port
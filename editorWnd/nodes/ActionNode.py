@@ -1,6 +1,7 @@
 from editorWnd.node import Node
 from editorWnd.node_port import NodeOutput, NodeInput, Pin
 from editorWnd.dtypes import DTypes
+from editorWnd.runtime.output import OUTPUT
 
 
 class BeginNode(Node):
@@ -19,7 +20,7 @@ class BeginNode(Node):
 class PrintNode(Node):
     pkg_name = '默认行为'
     node_title = '打印到控制台'
-    node_description = '打印节点，输出到控制台'
+    node_description = '打印节点，输出到编辑器的输出面板(命令行运行时输出到控制台)'
     input_pins = [
         NodeInput(pin_type=Pin.PinType.EXEC),
         NodeInput(pin_type=Pin.PinType.DATA, pin_name='输入', pin_class=DTypes.String)
@@ -31,6 +32,7 @@ class PrintNode(Node):
 
     def run_node(self):
         input_value = self.input(1)
-        print(input_value)
+        # 放入缓冲区批量输出，循环中大量打印时不会每次都等待控制台
+        OUTPUT.write(str(input_value))
         self.output(1, input_value)
         self.exec_output(0)
@@ -1,6 +1,40 @@
 from editorWnd.dtypes import DTypes
 from editorWnd.node import Node
 from editorWnd.node_port import Pin, NodeInput, NodeOutput
+from editorWnd.runtime.output import logger
+
+
+# 运算节点的输入也可以是向量(numpy数组)，运算按元素广播，这里不直接依赖numpy
+def _is_vector(value) -> bool:
+    return getattr(value, 'ndim', 0) > 0
+
+
+def _has_zero(value) -> bool:
+    if _is_vector(value):
+        return bool((value == 0).any())
+    return value == 0
+
+
+def divide(dividend, divisor):
+    """
+    除法节点的运算，生成的代码中也使用这个函数，除数为0时给出警告并返回None
+    :param dividend:
+    :param divisor:
+    :return:
+    """
+    if _has_zero(divisor):
+        logger.warning('除法节点: 除数不能为0')
+        return None
+    return dividend / divisor
+
+
+def _to_bool(value):
+    """
+    标量的比较结果转换为bool，向量的比较结果保持为布尔数组
+    :param value:
+    :return:
+    """
+    return value if _is_vector(value) else bool(value)
 
 
 class AddNode(Node):
@@ -14,11 +48,13 @@ class AddNode(Node):
     output_pins = [
         NodeOutput(pin_name='结果', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
     ]
+    pure = True
+    code_outputs = {0: '0 + {0} + {1}'}
 
     def run_node(self):
         sum = 0
         for index in range(len(self.in_ports)):
-            sum += self.input(index)
+            sum = sum + self.input(index)
         self.output(0, sum)
 
 
@@ -32,11 +68,14 @@ class MinusNode(Node):
     output_pins = [
         NodeOutput(pin_name='结果', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
     ]
+    pure = True
+    code_outputs = {0: '{0} - {1}'}
 
     def run_node(self):
         diff = self.input(0)
         for index in range(1, len(self.in_ports)):
-            diff -= self.input(index)
+            # 不能原地修改，输入是向量时会改变上游节点的输出
+            diff = diff - self.input(index)
         self.output(0, diff)
 
 
@@ -51,11 +90,13 @@ class MultiplyNode(Node):
     output_pins = [
         NodeOutput(pin_name='结果', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
     ]
+    pure = True
+    code_outputs = {0: '{0} * {1}'}
 
     def run_node(self):
         result = self.input(0)
         for index in range(1, len(self.in_ports)):
-            result *= self.input(index)
+            result = result * self.input(index)
         self.output(0, result)
 
 
@@ -70,14 +111,16 @@ class DivideNode(Node):
     output_pins = [
         NodeOutput(pin_name='结果', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
     ]
+    pure = True
+    code_outputs = {0: 'divide({0}, {1})'}
+    code_imports = ('divide',)
 
     def run_node(self):
         result = self.input(0)
         for index in range(1, len(self.in_ports)):
-            if self.input(index) == 0:
-                print('除法节点: 除数不能为0')
+            result = divide(result, self.input(index))
+            if result is None:
                 return
-            result /= self.input(index)
         self.output(0, result)
 
 
@@ -94,12 +137,11 @@ class GreaterNodeF(Node):
         NodeOutput(pin_name='输出1', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
         NodeOutput(pin_name='输出2', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
     ]
+    pure = True
+    code_outputs = {0: '{0} > {1}', 1: '{0}', 2: '{1}'}
 
     def run_node(self):
-        if self.input(0) > self.input(1):
-            self.output(0, True)
-        else:
-            self.output(0, False)
+        self.output(0, _to_bool(self.input(0) > self.input(1)))
         self.output(1, self.input(0))
         self.output(2, self.input(1))
 
@@ -117,12 +159,11 @@ class LessNodeF(Node):
         NodeOutput(pin_name='输出1', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
         NodeOutput(pin_name='输出2', pin_type=Pin.PinType.DATA, pin_class=DTypes.Float),
     ]
+    pure = True
+    code_outputs = {0: '{0} < {1}', 1: '{0}', 2: '{1}'}
 
     def run_node(self):
-        if self.input(0) < self.input(1):
-            self.output(0, True)
-        else:
-            self.output(0, False)
+        self.output(0, _to_bool(self.input(0) < self.input(1)))
         self.output(1, self.input(0))
         self.output(2, self.input(1))
 
@@ -139,12 +180,11 @@ class GreaterNode(Node):
         NodeOutput(pin_name='输出1', pin_type=Pin.PinType.DATA, pin_class=DTypes.Integer),
         NodeOutput(pin_name='输出2', pin_type=Pin.PinType.DATA, pin_class=DTypes.Integer),
     ]
+    pure = True
+    code_outputs = {0: '{0} > {1}', 1: '{0}', 2: '{1}'}
 
     def run_node(self):
-        if self.input(0) > self.input(1):
-            self.output(0, True)
-        else:
-            self.output(0, False)
+        self.output(0, _to_bool(self.input(0) > self.input(1)))
         self.output(1, self.input(0))
         self.output(2, self.input(1))
 
@@ -162,11 +202,10 @@ class LessNode(Node):
         NodeOutput(pin_name='输出1', pin_type=Pin.PinType.DATA, pin_class=DTypes.Integer),
         NodeOutput(pin_name='输出2', pin_type=Pin.PinType.DATA, pin_class=DTypes.Integer),
     ]
+    pure = True
+    code_outputs = {0: '{0} < {1}', 1: '{0}', 2: '{1}'}
 
     def run_node(self):
-        if self.input(0) < self.input(1):
-            self.output(0, True)
-        else:
-            self.output(0, False)
+        self.output(0, _to_bool(self.input(0) < self.input(1)))
         self.output(1, self.input(0))
         self.output(2, self.input(1))
\ No newline at end of file
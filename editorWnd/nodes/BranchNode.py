@@ -1,8 +1,27 @@
+import itertools
+from typing import Any, Iterable, Iterator
+
 from editorWnd.dtypes import DTypes
 from editorWnd.node import Node
 from editorWnd.node_port import Pin, NodeInput, NodeOutput
 
 
+def iter_chunks(iterable: Iterable[Any], size: int) -> Iterator[Any]:
+    """
+    按需从可迭代对象中取值，不会一次性生成所有元素
+    :param iterable: 列表、生成器、文件、向量等
+    :param size: 每块的元素数量，为空或小于1时逐个返回元素
+    :return: 元素或者元素列表的迭代器，向量按块返回切片(不复制数据)
+    """
+    if not size or size < 1:
+        return iter(iterable)
+    if getattr(iterable, 'ndim', 0) > 0:
+        # numpy数组(包括内存映射)的切片是原数据的视图，映射文件时只有访问到的部分会被读入内存
+        return (iterable[i:i + size] for i in range(0, len(iterable), size))
+    iterator = iter(iterable)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
+
+
 class BranchNode(Node):
     pkg_name = '控制结构'
     node_title = '分支'
@@ -40,15 +59,46 @@ class ForEachNode(Node):
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='元素', pin_class=DTypes.Class),
         NodeOutput(pin_type=Pin.PinType.EXEC, pin_name='完成'),
     ]
+    sync_exec = True
+    tail_exec_outputs = (3,)
 
     def run_node(self):
         start = self.input(1)
         end = self.input(2) + 1
         step = self.input(3)
+        array = self.input(4)
         for i in range(start, end, step):
             self._scene.get_view().new_session()
             self.output(1, i)
-            self.output(2, self.input(4)[i])
+            self.output(2, array[i])
+            self.exec_output(0)
+        self.exec_output(3)
+
+
+class StreamForEachNode(Node):
+    pkg_name = '控制结构'
+    node_title = '流式遍历'
+    node_description = '逐个(或按块)遍历生成器、文件等可迭代对象，不需要把所有元素放入内存'
+    input_pins = [
+        NodeInput(pin_type=Pin.PinType.EXEC),
+        NodeInput(pin_name='可迭代对象', pin_class=DTypes.Iterator, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='块大小', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_type=Pin.PinType.EXEC, pin_name='循环体'),
+        NodeOutput(pin_type=Pin.PinType.DATA, pin_name='索引', pin_class=DTypes.Integer),
+        NodeOutput(pin_type=Pin.PinType.DATA, pin_name='元素', pin_class=DTypes.Class),
+        NodeOutput(pin_type=Pin.PinType.EXEC, pin_name='完成'),
+    ]
+    sync_exec = True
+    tail_exec_outputs = (3,)
+
+    def run_node(self):
+        # 可迭代对象只获取一次，块大小为0时逐个遍历元素，否则每次循环得到一个元素列表
+        for i, item in enumerate(iter_chunks(self.input(1), self.input(2))):
+            self._scene.get_view().new_session()
+            self.output(1, i)
+            self.output(2, item)
             self.exec_output(0)
         self.exec_output(3)
 
@@ -68,6 +118,8 @@ class ForLoopNode(Node):
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='索引', pin_class=DTypes.Integer),
         NodeOutput(pin_type=Pin.PinType.EXEC, pin_name='完成'),
     ]
+    sync_exec = True
+    tail_exec_outputs = (2,)
 
     def run_node(self):
         start = self.input(1)
@@ -96,6 +148,8 @@ class ForLoopWithBreakNode(Node):
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='索引', pin_class=DTypes.Integer),
         NodeOutput(pin_type=Pin.PinType.EXEC, pin_name='完成'),
     ]
+    sync_exec = True
+    tail_exec_outputs = (2,)
     loop_break: bool = False
 
     def run_node(self):
@@ -113,6 +167,10 @@ class ForLoopWithBreakNode(Node):
             self.exec_output(0)
         self.exec_output(2)
 
+    def run_finished(self):
+        # 节点对象在多次运行(编辑器中重复运行、参数扫描)之间复用，跳出的标记只在本次运行中有效
+        self.loop_break = False
+
 
 class WhileLoopNode(Node):
     pkg_name = '控制结构'
@@ -127,9 +185,11 @@ class WhileLoopNode(Node):
         NodeOutput(pin_type=Pin.PinType.EXEC, pin_name='循环体'),
         NodeOutput(pin_type=Pin.PinType.EXEC, pin_name='完成'),
     ]
+    sync_exec = True
+    tail_exec_outputs = (1,)
 
     def run_node(self):
-        while input(1):
+        while self.input(1):
             self._scene.get_view().new_session()
             self.exec_output(0)
         self.exec_output(1)
@@ -13,6 +13,8 @@ class Integer2FloatNode(Node):
     output_pins = [
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='浮点数', pin_class=DTypes.Float)
     ]
+    pure = True
+    code_outputs = {0: 'float({0})'}
 
     def run_node(self):
         self.output(0, float(self.input(0)))
@@ -28,6 +30,8 @@ class Float2IntegerNode(Node):
     output_pins = [
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='整数', pin_class=DTypes.Integer)
     ]
+    pure = True
+    code_outputs = {0: 'int({0})'}
 
     def run_node(self):
         self.output(0, int(self.input(0)))
@@ -43,6 +47,8 @@ class Bool2StringNode(Node):
     output_pins = [
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='字符串', pin_class=DTypes.String)
     ]
+    pure = True
+    code_outputs = {0: 'str({0})'}
 
     def run_node(self):
         self.output(0, str(self.input(0)))
@@ -58,6 +64,8 @@ class Integer2StringNode(Node):
     output_pins = [
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='字符串', pin_class=DTypes.String)
     ]
+    pure = True
+    code_outputs = {0: 'str({0})'}
 
     def run_node(self):
         self.output(0, str(self.input(0)))
@@ -73,6 +81,8 @@ class Float2StringNode(Node):
     output_pins = [
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='字符串', pin_class=DTypes.String)
     ]
+    pure = True
+    code_outputs = {0: 'str({0})'}
 
     def run_node(self):
         self.output(0, str(self.input(0)))
@@ -88,6 +98,8 @@ class Class2StringNode(Node):
     output_pins = [
         NodeOutput(pin_type=Pin.PinType.DATA, pin_name='字符串', pin_class=DTypes.String)
     ]
+    pure = True
+    code_outputs = {0: 'str({0})'}
 
     def run_node(self):
         self.output(0, str(self.input(0)))
\ No newline at end of file
@@ -0,0 +1,170 @@
+import csv
+import mmap
+import os
+from typing import Dict, Iterator, TextIO, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.dtypes import DTypes
+from editorWnd.node import Node
+from editorWnd.node_port import NodeInput, NodeOutput, Pin
+from editorWnd.nodes.BranchNode import iter_chunks
+
+
+def _check_file(filepath: str):
+    # 读取在开始遍历时才会进行，在节点运行时先检查文件，及时报错
+    if not filepath or not os.path.isfile(filepath):
+        raise FileNotFoundError(f'文件不存在: {filepath}')
+
+
+def _iter_text(filepath: str, use_mmap: bool) -> Iterator[str]:
+    """
+    逐行读取UTF-8文本文件，保留每行末尾的换行符
+    :param filepath: 文件路径
+    :param use_mmap: 使用内存映射，由操作系统按需加载文件页，适合反复读取的大文件
+    :return:
+    """
+    if use_mmap and os.path.getsize(filepath) > 0:
+        with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # UTF-8中多字节字符不会包含换行符的字节，按字节分行后再解码是安全的
+            for line in iter(mm.readline, b''):
+                yield line.decode('utf-8')
+    else:
+        with open(filepath, 'r', encoding='utf-8', newline='', buffering=RuntimeConfig.IO_BUFFER_SIZE) as f:
+            yield from f
+
+
+class _OpenFiles:
+    """
+    写入节点在一次运行中打开的文件，多次写入同一个文件时复用，运行结束后统一关闭
+    """
+
+    def __init__(self):
+        self._files: Dict[str, TextIO] = {}
+
+    def get(self, filepath: str, append: bool) -> TextIO:
+        file = self._files.get(filepath, None)
+        if file is None:
+            # 每次运行第一次写入时按需清空文件，之后的写入都追加在后面
+            file = open(filepath, 'a' if append else 'w', encoding='utf-8', newline='',
+                        buffering=RuntimeConfig.IO_BUFFER_SIZE)
+            self._files[filepath] = file
+        return file
+
+    def close(self):
+        files, self._files = self._files, {}
+        for file in files.values():
+            file.close()
+
+
+class LineReaderNode(Node):
+    pkg_name = '文件读写'
+    node_title = '逐行读取'
+    node_description = '逐行读取文本文件(UTF-8)，每次只在内存中保留一行'
+    input_pins = [
+        NodeInput(pin_name='文件路径', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='内存映射', pin_class=DTypes.Boolean, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='行', pin_class=DTypes.Iterator, pin_type=Pin.PinType.DATA),
+    ]
+    # 生成器只能遍历一次，每次运行都要重新打开文件，不能作为纯数据节点缓存
+
+    def run_node(self):
+        filepath = self.input(0)
+        _check_file(filepath)
+        self.output(0, (line.rstrip('\r\n') for line in _iter_text(filepath, bool(self.input(1)))))
+
+
+class CsvReaderNode(Node):
+    pkg_name = '文件读写'
+    node_title = '读取CSV'
+    node_description = '按块读取CSV文件，每块是若干行，每行是字符串列表；块大小为0时逐行读取'
+    input_pins = [
+        NodeInput(pin_name='文件路径', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='分隔符', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='块大小', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='有表头', pin_class=DTypes.Boolean, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='内存映射', pin_class=DTypes.Boolean, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='行', pin_class=DTypes.Iterator, pin_type=Pin.PinType.DATA),
+        NodeOutput(pin_name='表头', pin_class=DTypes.Array, pin_type=Pin.PinType.DATA),
+    ]
+
+    def run_node(self):
+        filepath = self.input(0)
+        _check_file(filepath)
+        rows = csv.reader(_iter_text(filepath, bool(self.input(4))), delimiter=self.input(1) or ',')
+        header = next(rows, []) if self.input(3) else []
+        self.output(0, iter_chunks(rows, self.input(2)))
+        self.output(1, header)
+
+
+class LineWriterNode(Node):
+    pkg_name = '文件读写'
+    node_title = '写入文本行'
+    node_description = '把内容作为一行写入文本文件，内容是列表(例如一块数据)时每个元素写一行'
+    input_pins = [
+        NodeInput(pin_type=Pin.PinType.EXEC),
+        NodeInput(pin_name='文件路径', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='内容', pin_class=DTypes.Class, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='追加', pin_class=DTypes.Boolean, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_type=Pin.PinType.EXEC),
+    ]
+    _open_files: Union[_OpenFiles, None] = None
+
+    def run_node(self):
+        if self._open_files is None:
+            self._open_files = _OpenFiles()
+        # 写入缓冲区，缓冲区满或者运行结束时才真正写入磁盘
+        file = self._open_files.get(self.input(1), bool(self.input(3)))
+        content = self.input(2)
+        if isinstance(content, (list, tuple)):
+            file.writelines(f'{item}\n' for item in content)
+        else:
+            file.write(f'{content}\n')
+        self.exec_output(0)
+
+    def run_finished(self):
+        if self._open_files is not None:
+            self._open_files.close()
+
+
+class CsvWriterNode(Node):
+    pkg_name = '文件读写'
+    node_title = '写入CSV'
+    node_description = '写入一行(列表)或者一块数据(行的列表)到CSV文件'
+    input_pins = [
+        NodeInput(pin_type=Pin.PinType.EXEC),
+        NodeInput(pin_name='文件路径', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='行', pin_class=DTypes.Class, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='分隔符', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='追加', pin_class=DTypes.Boolean, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_type=Pin.PinType.EXEC),
+    ]
+    _open_files: Union[_OpenFiles, None] = None
+
+    def run_node(self):
+        if self._open_files is None:
+            self._open_files = _OpenFiles()
+        file = self._open_files.get(self.input(1), bool(self.input(4)))
+        writer = csv.writer(file, delimiter=self.input(3) or ',')
+        rows = self.input(2)
+        if getattr(rows, 'ndim', 0) > 0:
+            # numpy数组不能直接判断真假，二维数组是一块数据，一维数组是一行
+            rows = rows.tolist()
+        if rows is None or len(rows) == 0:
+            pass
+        elif isinstance(rows[0], (list, tuple)) or getattr(rows[0], 'ndim', 0) > 0:
+            writer.writerows(row.tolist() if getattr(row, 'ndim', 0) > 0 else row for row in rows)
+        else:
+            writer.writerow(rows)
+        self.exec_output(0)
+
+    def run_finished(self):
+        if self._open_files is not None:
+            self._open_files.close()
@@ -13,6 +13,8 @@ class IntegerNode(Node):
     output_pins = [
         NodeOutput(pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA)
     ]
+    pure = True
+    code_outputs = {0: '{0}'}
 
     def run_node(self):
         self.output(0, self.input(0))
@@ -28,6 +30,8 @@ class FloatNode(Node):
     output_pins = [
         NodeOutput(pin_class=DTypes.Float, pin_type=Pin.PinType.DATA)
     ]
+    pure = True
+    code_outputs = {0: '{0}'}
 
     def run_node(self):
         self.output(0, self.input(0))
@@ -43,6 +47,8 @@ class StringNode(Node):
     output_pins = [
         NodeOutput(pin_class=DTypes.String, pin_type=Pin.PinType.DATA)
     ]
+    pure = True
+    code_outputs = {0: '{0}'}
 
     def run_node(self):
         self.output(0, self.input(0))
@@ -58,6 +64,8 @@ class BooleanNode(Node):
     output_pins = [
         NodeOutput(pin_class=DTypes.Boolean, pin_type=Pin.PinType.DATA)
     ]
+    pure = True
+    code_outputs = {0: '{0}'}
 
     def run_node(self):
         self.output(0, self.input(0))
@@ -76,6 +84,8 @@ class StringArrayNode(Node):
     output_pins = [
         NodeOutput(pin_class=DTypes.Array, pin_type=Pin.PinType.DATA),
     ]
+    pure = True
+    code_outputs = {0: '[{0}, {1}, {2}, {3}]'}
 
     def run_node(self):
         self.output(0, [self.input(i) for i in range(len(self.in_ports))])
@@ -0,0 +1,23 @@
+from editorWnd.dtypes import DTypes
+from editorWnd.node import Node
+from editorWnd.node_port import NodeInput, NodeOutput, Pin
+
+
+class RangeIteratorNode(Node):
+    pkg_name = '数据流'
+    node_title = '范围生成器'
+    node_description = '按需生成从开始到结束(包括结束)的整数，不会创建列表'
+    input_pins = [
+        NodeInput(pin_name='开始', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='结束', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='步长', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='整数', pin_class=DTypes.Iterator, pin_type=Pin.PinType.DATA),
+    ]
+    # range可以重复遍历，结果可以缓存
+    pure = True
+
+    def run_node(self):
+        self.output(0, range(self.input(0), self.input(1) + 1, self.input(2)))
+
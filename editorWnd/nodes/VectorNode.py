@@ -0,0 +1,207 @@
+import os
+
+import numpy as np
+
+from editorWnd.dtypes import DTypes
+from editorWnd.node import Node
+from editorWnd.node_port import NodeInput, NodeOutput, Pin
+
+
+class LinspaceVectorNode(Node):
+    pkg_name = '向量运算'
+    node_title = '等差向量'
+    node_description = '生成从开始到结束(包括结束)均匀分布的向量'
+    input_pins = [
+        NodeInput(pin_name='开始', pin_class=DTypes.Float, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='结束', pin_class=DTypes.Float, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='数量', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        self.output(0, np.linspace(self.input(0), self.input(1), self.input(2)))
+
+
+class MemmapVectorNode(Node):
+    pkg_name = '向量运算'
+    node_title = '映射向量文件'
+    node_description = '以内存映射的方式只读打开.npy文件或原始二进制文件，数据只在被访问时才读入内存'
+    input_pins = [
+        NodeInput(pin_name='文件路径', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='数据类型', pin_class=DTypes.String, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='偏移(字节)', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    # 文件内容可能在两次运行之间被修改，每次运行都重新映射
+
+    def run_node(self):
+        filepath = self.input(0)
+        if not filepath or not os.path.isfile(filepath):
+            raise FileNotFoundError(f'文件不存在: {filepath}')
+        if filepath.lower().endswith('.npy'):
+            # .npy文件头中记录了数据类型和形状
+            self.output(0, np.load(filepath, mmap_mode='r'))
+        else:
+            self.output(0, np.memmap(filepath, dtype=np.dtype(self.input(1) or 'float64'), mode='r',
+                                     offset=self.input(2) or 0))
+
+
+class VectorSliceNode(Node):
+    pkg_name = '向量运算'
+    node_title = '向量切片'
+    node_description = '取出向量中从开始到结束(不包括结束)的部分，结果与原向量共享数据，不会复制'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='开始', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='结束', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+        NodeInput(pin_name='步长', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='切片', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        # 结束为0表示到向量末尾
+        self.output(0, self.input(0)[self.input(1):self.input(2) or None:self.input(3) or None])
+
+
+class Array2VectorNode(Node):
+    pkg_name = '向量运算'
+    node_title = '数组转向量'
+    node_description = '将数组转换为浮点数向量'
+    input_pins = [
+        NodeInput(pin_name='数组', pin_class=DTypes.Array, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        self.output(0, np.asarray(self.input(0), dtype=float))
+
+
+class Vector2ArrayNode(Node):
+    pkg_name = '向量运算'
+    node_title = '向量转数组'
+    node_description = '将向量转换为数组'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='数组', pin_class=DTypes.Array, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        self.output(0, np.asarray(self.input(0)).tolist())
+
+
+class VectorLengthNode(Node):
+    pkg_name = '向量运算'
+    node_title = '向量长度'
+    node_description = '向量中元素的数量'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='长度', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        self.output(0, int(np.size(self.input(0))))
+
+
+class VectorSumNode(Node):
+    pkg_name = '向量运算'
+    node_title = '求和'
+    node_description = '向量中所有元素的和'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='和', pin_class=DTypes.Float, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        self.output(0, float(np.sum(self.input(0))))
+
+
+class VectorMeanNode(Node):
+    pkg_name = '向量运算'
+    node_title = '平均值'
+    node_description = '向量中所有元素的平均值'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='平均值', pin_class=DTypes.Float, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        self.output(0, float(np.mean(self.input(0))))
+
+
+class VectorMinNode(Node):
+    pkg_name = '向量运算'
+    node_title = '最小值'
+    node_description = '向量中的最小值和它的索引'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='最小值', pin_class=DTypes.Float, pin_type=Pin.PinType.DATA),
+        NodeOutput(pin_name='索引', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        vector = np.asarray(self.input(0))
+        index = int(np.argmin(vector))
+        self.output(0, float(vector.flat[index]))
+        self.output(1, index)
+
+
+class VectorMaxNode(Node):
+    pkg_name = '向量运算'
+    node_title = '最大值'
+    node_description = '向量中的最大值和它的索引'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='最大值', pin_class=DTypes.Float, pin_type=Pin.PinType.DATA),
+        NodeOutput(pin_name='索引', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        vector = np.asarray(self.input(0))
+        index = int(np.argmax(vector))
+        self.output(0, float(vector.flat[index]))
+        self.output(1, index)
+
+
+class VectorCountNode(Node):
+    pkg_name = '向量运算'
+    node_title = '计数'
+    node_description = '布尔向量(例如比较运算的结果)中为真的元素数量'
+    input_pins = [
+        NodeInput(pin_name='向量', pin_class=DTypes.Vector, pin_type=Pin.PinType.DATA),
+    ]
+    output_pins = [
+        NodeOutput(pin_name='数量', pin_class=DTypes.Integer, pin_type=Pin.PinType.DATA),
+    ]
+    pure = True
+
+    def run_node(self):
+        self.output(0, int(np.count_nonzero(self.input(0))))
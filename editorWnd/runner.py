@@ -0,0 +1,174 @@
+"""
+在后台线程中运行图，运行期间界面不会被阻塞
+"""
+from __future__ import annotations
+
+import gc
+import threading
+from typing import Any, Dict, List, Union
+
+from PySide6.QtCore import QObject, QThread, QTimer, Signal
+
+from editorWnd.config import EditorConfig, RuntimeConfig
+from editorWnd.runtime.executor import ExecutionCancelled
+from editorWnd.runtime.graph import RuntimeGraph
+from editorWnd.runtime.output import logger
+from editorWnd.runtime.parallel import create_pool
+from editorWnd.runtime.profiler import NodeProfiler
+from editorWnd.runtime.trace import TraceRecorder
+from editorWnd.sweep import run_sweep
+
+
+class GarbageCollector(QObject):
+    """
+    关闭自动垃圾回收，改为在界面线程中定时回收
+    删除的节点、端口和输入控件之间有循环引用，只能由垃圾回收释放，自动回收可能发生在任意线程中，
+    在后台运行的线程中销毁Qt控件会导致崩溃
+    """
+
+    def __init__(self, interval: int = EditorConfig.GC_INTERVAL, parent=None):
+        super().__init__(parent)
+        self._threshold = gc.get_threshold()
+        gc.disable()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.__check)
+        self._timer.start(interval)
+        self.destroyed.connect(lambda: gc.enable())
+
+    def __check(self):
+        # 与自动回收相同的分代规则，只是在界面线程中执行
+        count0, count1, count2 = gc.get_count()
+        if count0 > self._threshold[0]:
+            gc.collect(0)
+            if count1 > self._threshold[1]:
+                gc.collect(1)
+                if count2 > self._threshold[2]:
+                    gc.collect(2)
+
+
+class GraphRunThread(QThread):
+    """
+    后台线程只使用图数据的副本(View.get_runtime_graph)和不依赖Qt对象的RuntimeGraph，
+    不会访问场景中的节点和控件，运行结果通过信号交回界面线程
+    """
+    # {节点id: {端口下标: 值}}
+    run_succeeded = Signal(object)
+    run_failed = Signal(str)
+    # [NodeStats.to_dict(), ...]，开启性能分析时无论运行是否成功都会发出
+    profile_ready = Signal(object)
+    # TraceRecorder，开启运行轨迹时无论运行是否成功都会发出
+    trace_ready = Signal(object)
+
+    def __init__(self, graph: RuntimeGraph, profile: bool = False, trace: bool = False, parent=None):
+        """
+        :param graph: 图的副本，没有被编辑时在多次运行之间复用，其中的执行计划和结果缓存不需要重新生成
+        :param profile: 是否统计每个节点的耗时
+        :param trace: 是否记录运行轨迹
+        :param parent:
+        """
+        super().__init__(parent)
+        self._graph: RuntimeGraph = graph
+        self._profiler: Union[NodeProfiler, None] = NodeProfiler(RuntimeConfig.PROFILE_MEMORY) if profile else None
+        self._tracer: Union[TraceRecorder, None] = TraceRecorder(RuntimeConfig.TRACE_BUFFER_SIZE) if trace else None
+        self._cancelled: bool = False
+        self._running: bool = False
+        # 运行结束后图可能被下一次运行使用，取消请求不能再发给它
+        self._lock = threading.Lock()
+
+    def run(self):
+        graph = self._graph
+        pool = None
+        try:
+            if RuntimeConfig.PARALLEL_WORKERS > 0:
+                pool = create_pool(RuntimeConfig.PARALLEL_WORKERS, RuntimeConfig.PARALLEL_BACKEND)
+                graph.set_pool(pool)
+            graph.set_profiler(self._profiler)
+            graph.set_tracer(self._tracer)
+            with self._lock:
+                if self._cancelled:
+                    raise ExecutionCancelled()
+                self._running = True
+            try:
+                graph.run()
+            finally:
+                with self._lock:
+                    self._running = False
+        except ExecutionCancelled:
+            self.run_failed.emit('运行已取消')
+            return
+        except Exception as e:
+            # 调用栈交给日志，输出面板和其他日志处理器都能看到
+            logger.exception('运行时: 运行图时出错')
+            self.run_failed.emit(str(e))
+            return
+        finally:
+            # 图会在之后的运行中复用，不保留本次运行的设置
+            graph.set_pool(None)
+            graph.set_profiler(None)
+            graph.set_tracer(None)
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if self._profiler is not None:
+                self.profile_ready.emit(self.__profile_stats())
+            if self._tracer is not None:
+                self.trace_ready.emit(self._tracer)
+        self.run_succeeded.emit(graph.get_output_values())
+
+    def cancel(self):
+        """
+        请求停止运行，正在运行的节点结束后才会停止
+        :return:
+        """
+        with self._lock:
+            self._cancelled = True
+            if self._running:
+                self._graph.cancel()
+
+    def __profile_stats(self) -> List[Dict[str, Any]]:
+        return [stats.to_dict() for stats in self._profiler.get_stats()]
+
+    def get_executed_count(self) -> int:
+        return self._graph.get_executed_count() if self._running else 0
+
+
+class GraphSweepThread(QThread):
+    """
+    在后台线程中等待参数扫描的工作进程，每完成一组参数发出一行结果
+    """
+    # sweep.SweepRunner.run()返回的一行结果
+    row_ready = Signal(object)
+    sweep_failed = Signal(str)
+
+    def __init__(self, data: Dict[str, Any], param_sets: List[Dict[str, str]], workers: int, parent=None):
+        super().__init__(parent)
+        self._data: Dict[str, Any] = data
+        self._param_sets: List[Dict[str, str]] = param_sets
+        self._workers: int = workers
+        self._cancelled: bool = False
+        self._finished_count: int = 0
+
+    def run(self):
+        try:
+            for row in run_sweep(self._data, self._param_sets, self._workers):
+                self._finished_count += 1
+                self.row_ready.emit(row)
+                if self._cancelled:
+                    # 关闭生成器时取消还没有开始的参数组
+                    self.sweep_failed.emit('参数扫描已取消')
+                    return
+        except Exception as e:
+            logger.exception('运行时: 参数扫描时出错')
+            self.sweep_failed.emit(str(e))
+
+    def cancel(self):
+        """
+        请求停止扫描，正在运行的参数组结束后才会停止
+        :return:
+        """
+        self._cancelled = True
+
+    def get_total_count(self) -> int:
+        return len(self._param_sets)
+
+    def get_executed_count(self) -> int:
+        return self._finished_count
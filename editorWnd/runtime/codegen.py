@@ -0,0 +1,408 @@
+"""
+把节点图翻译成普通的Python模块：数据端口变成局部变量，循环和分支节点变成原生的for/while/if，
+生成的模块只在遇到没有code_outputs的节点时才依赖编辑器的代码
+
+用法: python -m editorWnd.runtime.codegen graph.vgf [-o graph.py]
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import os
+import sys
+from typing import Any, Callable, Dict, List, Set, Tuple, Type, Union
+
+from editorWnd.node import Node
+from editorWnd.node_port import Pin
+from editorWnd.nodes.ActionNode import BeginNode, PrintNode
+from editorWnd.nodes.BranchNode import BranchNode, ForEachNode, ForLoopNode, ForLoopWithBreakNode, WhileLoopNode, \
+    StreamForEachNode
+from editorWnd.runtime.graph import RuntimeGraph, GraphLoadError
+from editorWnd.runtime.plan import ExecutionPlan, GraphCompileError, UNCONNECTED
+
+# 生成规则变化后修改版本号，磁盘上缓存的代码会重新生成
+CODEGEN_VERSION = 4
+# 展开后的执行节点数量上限，执行连接汇合过多时代码会成倍增长
+MAX_EXEC_EMITS = 100000
+INDENT = '    '
+
+
+class CodegenError(Exception):
+    pass
+
+
+class _CodeGenerator:
+    def __init__(self, plan: ExecutionPlan):
+        self._plan = plan
+        self._nodes = plan.nodes
+        self._classes: List[Type[Node]] = [getattr(node, 'node_cls', type(node)) for node in plan.nodes]
+        self._is_exec: List[bool] = [any(kind == Pin.PinType.EXEC for kind in plan.input_kinds[i] + plan.output_kinds[i])
+                                     for i in range(len(plan.nodes))]
+        # 执行输入槽位 -> 端口下标
+        self._exec_port: Dict[int, int] = {}
+        for i, slots in enumerate(plan.input_slots):
+            for port_index, kind in enumerate(plan.input_kinds[i]):
+                if kind == Pin.PinType.EXEC:
+                    self._exec_port[slots[port_index]] = port_index
+        # 只依赖常量的纯数据节点，每条路径都会经过时在函数开头计算一次，
+        # 只在分支或循环体中用到时在原处计算，并用标记保证只计算一次
+        self._invariant: List[bool] = [False] * len(plan.nodes)
+        for i in plan.topo_order:
+            self._invariant[i] = not self._is_exec[i] and plan.pure[i] and \
+                                 all(self._invariant[plan.slot_owner[slot]] for slot in plan.data_deps[i])
+        self._hoisted: Set[int] = set()
+        self._guarded: Set[int] = set()
+        # 当前所在的分支和循环体层数，为0时生成的代码一定会运行
+        self._depth: int = 0
+        # 槽位 -> 读取该值的表达式，输出等于某个输入时直接复用输入的表达式
+        self._exprs: Dict[int, str] = {}
+        self._imports: Dict[str, Set[str]] = {}
+        self._prologue: List[str] = []
+        self._init: List[str] = []
+        self._emit_count: int = 0
+
+    def generate(self, source: str) -> str:
+        if self._plan.entry < 0:
+            raise CodegenError('需要一个【开始运行】节点来生成代码')
+        self._check_exec_cycle()
+        for i, node in enumerate(self._nodes):
+            if not self._is_exec[i]:
+                continue
+            for slot in self._plan.output_slots[i]:
+                if slot >= 0:
+                    self._init.append(f'{INDENT}{self._var(slot)} = None')
+            if issubclass(self._classes[i], ForLoopWithBreakNode):
+                self._init.append(f'{INDENT}b{i} = False')
+        body: List[str] = []
+        self._emit_targets([(self._plan.entry, UNCONNECTED)], set(), INDENT, body)
+
+        lines = ['# 由节点图生成的代码，修改节点图后需要重新生成', f'# source: {source}', '']
+        for module, names in sorted(self._imports.items()):
+            lines.append(f'from {module} import {", ".join(sorted(names))}')
+        if self._imports:
+            lines.append('')
+        lines.extend(['', 'def run():'])
+        lines.extend(self._prologue + self._init + body or [f'{INDENT}pass'])
+        lines.extend(['', '', "if __name__ == '__main__':", f'{INDENT}run()', ''])
+        return '\n'.join(lines)
+
+    def _check_exec_cycle(self):
+        """
+        执行连接中的环路在解释器中也会无限运行，跳出循环的端口除外
+        :return:
+        """
+        plan = self._plan
+        edges: List[List[int]] = [[] for _ in self._nodes]
+        for i, ports in enumerate(plan.exec_targets):
+            for targets in ports:
+                for dest, slot in targets:
+                    if not self._is_break_port(dest, self._exec_port[slot]):
+                        edges[i].append(dest)
+        state = [0] * len(self._nodes)  # 0: 未访问 1: 访问中 2: 已完成
+        for start in range(len(self._nodes)):
+            if state[start]:
+                continue
+            state[start] = 1
+            stack = [(start, iter(edges[start]))]
+            while stack:
+                index, it = stack[-1]
+                dest = next(it, None)
+                if dest is None:
+                    state[index] = 2
+                    stack.pop()
+                elif state[dest] == 1:
+                    raise CodegenError(f'执行连接存在环路: {self._nodes[dest].node_title}')
+                elif state[dest] == 0:
+                    state[dest] = 1
+                    stack.append((dest, iter(edges[dest])))
+
+    def _is_break_port(self, index: int, port_index: int) -> bool:
+        return issubclass(self._classes[index], ForLoopWithBreakNode) and port_index == 4
+
+    @staticmethod
+    def _var(slot: int) -> str:
+        return f'v{slot}'
+
+    # ==============================================  数据节点  =======================================================
+    def _available(self, index: int, scope: Set[int]) -> bool:
+        # 执行节点的输出只在运行时设置，直接读取变量中最后一次的值
+        return self._is_exec[index] or index in scope or index in self._hoisted
+
+    def _input_exprs(self, index: int, scope: Set[int], indent: str, lines: List[str],
+                     ports: Union[List[int], None] = None) -> List[str]:
+        """
+        生成计算节点输入所需的代码
+        :param ports: 只计算这些端口，None表示所有数据端口
+        :return: 每个输入端口的表达式，执行端口为'None'
+        """
+        plan = self._plan
+        exprs = []
+        for port_index, slot in enumerate(plan.input_slots[index]):
+            if plan.input_kinds[index][port_index] != Pin.PinType.DATA or (ports is not None and port_index not in ports):
+                exprs.append('None')
+            elif slot == UNCONNECTED:
+                exprs.append(self._literal(index, port_index))
+            else:
+                self._ensure(plan.slot_owner[slot], scope, indent, lines)
+                exprs.append(self._exprs.get(slot, self._var(slot)))
+        return exprs
+
+    def _literal(self, index: int, port_index: int) -> str:
+        value = self._nodes[index].in_ports[port_index].get_default_value()
+        text = repr(value)
+        try:
+            if ast.literal_eval(text) != value:
+                raise ValueError()
+        except (ValueError, SyntaxError):
+            raise CodegenError(f'节点 {self._nodes[index].node_title} 的默认值 {text} 无法写入代码')
+        return text
+
+    def _ensure(self, root: int, scope: Set[int], indent: str, lines: List[str]):
+        """
+        按依赖顺序生成计算root所需的代码，已经计算过的节点不再重复
+        :return:
+        """
+        plan = self._plan
+        stack = [root]
+        while stack:
+            index = stack[-1]
+            if self._available(index, scope):
+                stack.pop()
+                continue
+            for slot in plan.data_deps[index]:
+                owner = plan.slot_owner[slot]
+                if not self._available(owner, scope):
+                    stack.append(owner)
+                    break
+            else:
+                stack.pop()
+                if self._invariant[index] and not self._depth:
+                    self._emit_data(index, scope, INDENT, self._prologue)
+                    self._hoisted.add(index)
+                elif self._invariant[index]:
+                    self._emit_guarded(index, scope, indent, lines)
+                    scope.add(index)
+                else:
+                    self._emit_data(index, scope, indent, lines)
+                    scope.add(index)
+
+    def _emit_guarded(self, index: int, scope: Set[int], indent: str, lines: List[str]):
+        """
+        在分支或循环体中计算不变的节点，没有运行到的分支不会计算，循环中也只计算一次
+        :return:
+        """
+        body: List[str] = []
+        self._emit_data(index, scope, indent + INDENT, body)
+        if not body:
+            # 直接复用输入表达式的节点没有需要计算的代码
+            return
+        if index not in self._guarded:
+            self._guarded.add(index)
+            self._init.append(f'{INDENT}h{index} = False')
+        lines.append(f'{indent}if not h{index}:')
+        lines.extend(body)
+        lines.append(f'{indent}{INDENT}h{index} = True')
+
+    def _emit_data(self, index: int, scope: Set[int], indent: str, lines: List[str]):
+        plan = self._plan
+        cls = self._classes[index]
+        inputs = self._input_exprs(index, scope, indent, lines)
+        if cls.code_outputs:
+            if cls.code_imports:
+                self._imports.setdefault(cls.__module__, set()).update(cls.code_imports)
+            for port_index, template in cls.code_outputs.items():
+                slot = plan.output_slots[index][port_index]
+                expr = template.format(*inputs)
+                if template in (f'{{{i}}}' for i in range(len(inputs))):
+                    self._exprs[slot] = expr
+                else:
+                    lines.append(f'{indent}{self._var(slot)} = {expr}')
+            return
+        # 没有表达式的节点在生成的代码中直接运行run_node
+        self._imports.setdefault('editorWnd.runtime.parallel', set()).add('run_pure_node')
+        self._imports.setdefault(cls.__module__, set()).add(cls.__name__)
+        lines.append(f'{indent}_outputs = run_pure_node({cls.__name__}, [{", ".join(inputs)}])')
+        for port_index, slot in enumerate(plan.output_slots[index]):
+            if slot >= 0:
+                lines.append(f'{indent}{self._var(slot)} = _outputs.get({port_index})')
+
+    # ==================================================================================================================
+
+    # ==============================================  执行节点  =======================================================
+    def _emit_targets(self, targets, scope: Set[int], indent: str, lines: List[str]):
+        """
+        与执行器的调度循环相同，节点触发的执行输出压入栈中依次展开
+        :param targets: ((节点, 执行输入槽位), ...)
+        :return:
+        """
+        stack = list(reversed(targets))
+        while stack:
+            index, slot = stack.pop()
+            self._emit_count += 1
+            if self._emit_count > MAX_EXEC_EMITS:
+                raise CodegenError('执行连接汇合过多，生成的代码过大')
+            port_index = self._exec_port.get(slot, 0)
+            emitted = self._emit_exec(index, port_index, scope, indent, lines)
+            if emitted:
+                stack.extend(reversed(emitted))
+
+    def _emit_block(self, targets, scope: Set[int], indent: str, lines: List[str]):
+        start = len(lines)
+        self._emit_targets(targets, scope, indent, lines)
+        if len(lines) == start:
+            lines.append(f'{indent}pass')
+
+    def _emit_exec(self, index: int, port_index: int, scope: Set[int], indent: str, lines: List[str]):
+        """
+        生成一个执行节点的代码
+        :return: 节点最后触发的执行输出，由调用者继续展开
+        """
+        plan = self._plan
+        cls = self._classes[index]
+        targets = plan.exec_targets[index]
+        outputs = plan.output_slots[index]
+        inner = indent + INDENT
+        if issubclass(cls, BeginNode):
+            return targets[0]
+        if issubclass(cls, PrintNode):
+            value = self._input_exprs(index, scope, indent, lines)[1]
+            lines.append(f'{indent}{self._var(outputs[1])} = {value}')
+            lines.append(f'{indent}print({self._var(outputs[1])})')
+            return targets[0]
+        if issubclass(cls, BranchNode):
+            condition = self._input_exprs(index, scope, indent, lines)[1]
+            lines.append(f'{indent}if {condition}:')
+            self._depth += 1
+            scope_true = set(scope)
+            self._emit_block(targets[0], scope_true, inner, lines)
+            lines.append(f'{indent}else:')
+            scope_false = set(scope)
+            self._emit_block(targets[1], scope_false, inner, lines)
+            self._depth -= 1
+            scope.intersection_update(scope_true & scope_false)
+            return ()
+        if issubclass(cls, WhileLoopNode):
+            # 每次循环都是新的session，条件需要重新计算
+            lines.append(f'{indent}while True:')
+            body_scope: Set[int] = set()
+            condition = self._input_exprs(index, body_scope, inner, lines)[1]
+            lines.append(f'{inner}if not {condition}:')
+            lines.append(f'{inner}{INDENT}break')
+            self._depth += 1
+            self._emit_targets(targets[0], body_scope, inner, lines)
+            self._depth -= 1
+            scope.clear()
+            # 完成端口与执行器一样交给调用者继续展开，顺序连接的循环不会嵌套调用
+            return targets[1]
+        if issubclass(cls, (ForLoopNode, ForLoopWithBreakNode, ForEachNode)):
+            if issubclass(cls, ForLoopWithBreakNode) and port_index == 4:
+                lines.append(f'{indent}b{index} = True')
+                return ()
+            start, end, step = self._input_exprs(index, scope, indent, lines, ports=[1, 2, 3])[1:4]
+            if issubclass(cls, ForEachNode):
+                body_port, index_slot, done_port = 0, outputs[1], 3
+                # 数组在循环开始前获取一次
+                array = self._input_exprs(index, scope, indent, lines, ports=[4])[4]
+                lines.append(f'{indent}a{index} = {array}')
+            else:
+                body_port, index_slot, done_port = 0, outputs[1], 2
+            lines.append(f'{indent}for {self._var(index_slot)} in range({start}, {end} + 1, {step}):')
+            if issubclass(cls, ForLoopWithBreakNode):
+                lines.append(f'{inner}if b{index}:')
+                lines.append(f'{inner}{INDENT}break')
+            body_scope = set()
+            if issubclass(cls, ForEachNode):
+                lines.append(f'{inner}{self._var(outputs[2])} = a{index}[{self._var(index_slot)}]')
+            self._depth += 1
+            self._emit_block(targets[body_port], body_scope, inner, lines)
+            self._depth -= 1
+            # 循环结束后处于最后一次循环的session中，保守起见重新计算需要的值
+            scope.clear()
+            return targets[done_port]
+        if issubclass(cls, StreamForEachNode):
+            iterable, size = self._input_exprs(index, scope, indent, lines)[1:3]
+            self._imports.setdefault('editorWnd.nodes.BranchNode', set()).add('iter_chunks')
+            lines.append(f'{indent}for {self._var(outputs[1])}, {self._var(outputs[2])} in '
+                         f'enumerate(iter_chunks({iterable}, {size})):')
+            body_scope = set()
+            self._depth += 1
+            self._emit_block(targets[0], body_scope, inner, lines)
+            self._depth -= 1
+            scope.clear()
+            return targets[3]
+        raise CodegenError(f'节点 {self._nodes[index].node_title} 不支持生成代码')
+
+    # ==================================================================================================================
+
+
+def generate_code(plan: ExecutionPlan, source: str = '') -> str:
+    """
+    把执行计划翻译成Python模块的源代码
+    :param plan: 包含开始运行节点的执行计划
+    :param source: 写在代码开头的来源说明
+    :return: 源代码，模块中的run()函数运行整个图
+    """
+    return _CodeGenerator(plan).generate(source)
+
+
+def load_code(code: str, filename: str = '<graph>') -> Callable[[], None]:
+    """
+    执行生成的代码
+    :return: 生成代码中的run函数
+    """
+    namespace: Dict[str, Any] = {'__name__': os.path.splitext(os.path.basename(filename))[0]}
+    exec(compile(code, filename, 'exec'), namespace)
+    return namespace['run']
+
+
+def load_cached(filepath: str) -> Callable[[], None]:
+    """
+    为.vgf文件生成代码并缓存在同目录的__vgfcache__中，文件内容没有变化时直接使用缓存
+    :param filepath: .vgf文件路径
+    :return: 生成代码中的run函数
+    """
+    with open(filepath, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha1(content + f'codegen-{CODEGEN_VERSION}'.encode()).hexdigest()
+    header = f'# sha1: {digest}\n'
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), '__vgfcache__')
+    cache_path = os.path.join(cache_dir, os.path.splitext(os.path.basename(filepath))[0] + '.py')
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            code = f.read()
+        if code.startswith(header):
+            return load_code(code, cache_path)
+    except OSError:
+        pass
+    graph = RuntimeGraph.load(filepath)
+    code = header + generate_code(graph.get_execution_plan(), os.path.basename(filepath))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            f.write(code)
+    except OSError as e:
+        print(f'运行时: 无法写入代码缓存 {cache_path}，{e}', file=sys.stderr)
+    return load_code(code, cache_path)
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description='把节点图翻译成Python代码')
+    parser.add_argument('file', help='.vgf文件路径')
+    parser.add_argument('-o', '--output', default='', help='输出的.py文件路径，默认与.vgf文件同名')
+    args = parser.parse_args(argv)
+    output = args.output or os.path.splitext(args.file)[0] + '.py'
+    try:
+        graph = RuntimeGraph.load(args.file)
+        code = generate_code(graph.get_execution_plan(), os.path.basename(args.file))
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(code)
+    except (OSError, ValueError, GraphLoadError, GraphCompileError, CodegenError) as e:
+        print(f'运行时: {args.file} 生成代码失败，{e}', file=sys.stderr)
+        return 1
+    print(f'运行时: 代码生成成功 -> {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
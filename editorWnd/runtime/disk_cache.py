@@ -0,0 +1,312 @@
+"""
+纯数据子图结果的磁盘缓存，在多次运行、编辑器重启以及多个进程之间共享
+
+缓存的键由两部分组成：子图的结构哈希(节点类、未连接端口的默认值、连接关系)，
+以及子图依赖的非纯节点输出(plan.pure_sources)的值。修改图中无关的部分不会改变子图的哈希，
+重新运行时直接读取之前的结果；节点类所在的文件被修改后，相关的结果不再使用
+数组(包括内存映射的文件)、迭代器以及估计大小超过上限的值不会被序列化，包含它们的子图不使用磁盘缓存
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+from collections.abc import Iterator
+from typing import Any, Dict, List, Sequence, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.runtime.output import logger
+from editorWnd.runtime.plan import ExecutionPlan, UNCONNECTED
+
+_SUFFIX = '.pkl'
+
+
+@functools.lru_cache(maxsize=None)
+def _class_id(cls: type) -> str:
+    # 节点类所在的文件被修改后，之前缓存的结果不再使用
+    try:
+        mtime = os.path.getmtime(inspect.getfile(cls))
+    except (TypeError, OSError):
+        mtime = 0
+    return f'{cls.__module__}.{cls.__qualname__}:{mtime}'
+
+
+def _fits(value: Any, max_bytes: int) -> bool:
+    """
+    在序列化之前检查值是否适合保存到磁盘，大小按sys.getsizeof逐层累加估计，超过上限时提前结束
+    数组按引用传递或者映射文件，迭代器只能遍历一次，都不保存
+    :param value:
+    :param max_bytes: 估计大小的上限
+    :return:
+    """
+    size = 0
+    stack = [value]
+    # 同一个对象只计算一次，也避免循环引用
+    seen = set()
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if getattr(item, 'ndim', 0) > 0 or isinstance(item, (Iterator, memoryview)):
+            return False
+        size += sys.getsizeof(item)
+        if size > max_bytes:
+            return False
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            stack.extend(vars(item).values())
+    return True
+
+
+class SubgraphHasher:
+    """
+    计算纯数据节点与它的所有纯数据上游组成的子图的结构哈希，与节点下标、槽位编号和图中的其他节点无关
+    只在需要时计算，运行时被折叠或者没有用到的节点不计算
+    """
+
+    def __init__(self, plan: ExecutionPlan):
+        self._plan = plan
+        self._hashes: Dict[int, str] = {}
+
+    def get(self, index: int) -> Union[str, None]:
+        """
+        :param index: 节点下标
+        :return: 哈希，非纯节点为None
+        """
+        plan = self._plan
+        if not plan.pure[index]:
+            return None
+        # 先计算还没有哈希的纯数据上游，用显式栈避免长链递归过深
+        stack = [index]
+        while stack:
+            current = stack[-1]
+            if current in self._hashes:
+                stack.pop()
+                continue
+            for slot in plan.data_deps[current]:
+                owner = plan.slot_owner[slot]
+                if plan.pure[owner] and owner not in self._hashes:
+                    stack.append(owner)
+                    break
+            else:
+                stack.pop()
+                self._hashes[current] = self.__hash(current)
+        return self._hashes[index]
+
+    def __hash(self, index: int) -> str:
+        plan = self._plan
+        node = plan.nodes[index]
+        # 来源槽位在本节点pure_sources中的位置，运行时按这个顺序取值组成键
+        source_position = {slot: position for position, slot in enumerate(plan.pure_sources[index])}
+        parts: List[Any] = [_class_id(getattr(node, 'node_cls', type(node)))]
+        for port_index, slot in enumerate(plan.input_slots[index]):
+            if slot == UNCONNECTED:
+                value = node.in_ports[port_index].get_default_value()
+                parts.append(('default', type(value).__name__, repr(value)))
+            elif slot < 0:
+                parts.append(('exec',))
+            elif plan.pure[plan.slot_owner[slot]]:
+                owner = plan.slot_owner[slot]
+                # 上游子图的来源对应到本节点的来源位置，区分同一个来源被使用多次的情况
+                parts.append(('node', self._hashes[owner], plan.output_slots[owner].index(slot),
+                              tuple(source_position[source] for source in plan.pure_sources[owner])))
+            else:
+                parts.append(('source', source_position[slot]))
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:32]
+
+
+class DiskCache:
+    """
+    以文件保存结果，每个结果一个文件，文件名为 <子图哈希>_<来源值哈希>.pkl
+    读取时更新文件的修改时间，总大小超过上限时删除最久没有使用的文件
+    """
+    MISSING = object()
+
+    def __init__(self, directory: str, max_bytes: int, max_value_bytes: int = RuntimeConfig.DISK_CACHE_MAX_VALUE):
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        # 单个值在序列化之前估计的大小上限
+        self.max_value_bytes: int = min(max_bytes, max_value_bytes)
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.Lock()
+        # 已经保存过结果的子图哈希 -> 文件数，没有保存过的子图不需要计算来源值的哈希
+        self._subgraphs: Dict[str, int] = {}
+        self._size: int = 0
+        os.makedirs(directory, exist_ok=True)
+        for name, size in self.__list_files().items():
+            self.__index(name, 1)
+            self._size += size
+
+    def __list_files(self) -> Dict[str, int]:
+        files = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        files[entry.name] = entry.stat().st_size
+                    except OSError:
+                        pass
+        return files
+
+    def __index(self, name: str, count: int):
+        subgraph = name.split('_', 1)[0]
+        self._subgraphs[subgraph] = self._subgraphs.get(subgraph, 0) + count
+        if self._subgraphs[subgraph] <= 0:
+            del self._subgraphs[subgraph]
+
+    def has_subgraph(self, subgraph_hash: Union[str, None] = None) -> bool:
+        """
+        :param subgraph_hash: 子图的结构哈希，None表示任意子图
+        :return: 是否保存过这个子图的结果，没有保存过时不需要计算键
+        """
+        if subgraph_hash is None:
+            return bool(self._subgraphs)
+        return subgraph_hash in self._subgraphs
+
+    def make_key(self, subgraph_hash: Union[str, None], source_values: Sequence[Any],
+                 check_index: bool = True) -> Union[str, None]:
+        """
+        :param subgraph_hash: subgraph_hashes计算的结构哈希
+        :param source_values: 子图依赖的非纯节点输出的值，按plan.pure_sources的顺序
+        :param check_index: 为True时，子图没有保存过结果则直接返回None，不计算来源值的哈希
+        :return: 缓存的键，来源值无法序列化或者不适合保存(数组、迭代器、过大的值)时返回None
+        """
+        if subgraph_hash is None or (check_index and subgraph_hash not in self._subgraphs):
+            return None
+        if not source_values:
+            return subgraph_hash + '_'
+        if not _fits(source_values, self.max_value_bytes):
+            return None
+        try:
+            data = pickle.dumps(tuple(source_values), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+        return f'{subgraph_hash}_{hashlib.sha256(data).hexdigest()[:32]}'
+
+    def get(self, key: str) -> Any:
+        """
+        :param key: make_key生成的键
+        :return: 保存的值，没有找到时返回DiskCache.MISSING
+        """
+        path = os.path.join(self.directory, key + _SUFFIX)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return DiskCache.MISSING
+        except Exception as e:
+            # 文件损坏或者其中的类已经不存在了
+            logger.debug('运行时: 磁盘缓存%s读取失败，%s', key, e)
+            self.misses += 1
+            self.__remove(key + _SUFFIX)
+            return DiskCache.MISSING
+        try:
+            # 修改时间作为最近使用的时间
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        :param key: make_key生成的键
+        :param value: 要保存的值，不适合保存(数组、迭代器、过大的值)时不序列化，直接跳过
+        :return:
+        """
+        if not _fits(value, self.max_value_bytes):
+            return
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug('运行时: 结果无法保存到磁盘缓存，%s', e)
+            return
+        if len(data) > self.max_bytes:
+            return
+        name = key + _SUFFIX
+        path = os.path.join(self.directory, name)
+        # 先写入临时文件再替换，其他进程不会读到写了一半的文件
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.debug('运行时: 磁盘缓存%s写入失败，%s', key, e)
+            return
+        with self._lock:
+            self.__index(name, 1)
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self.__evict()
+
+    def __evict(self):
+        # 其他进程也可能写入同一个目录，按目录中实际的文件重新统计
+        files = self.__list_files()
+        mtimes = {}
+        for name in files:
+            try:
+                mtimes[name] = os.path.getmtime(os.path.join(self.directory, name))
+            except OSError:
+                mtimes[name] = 0
+        self._size = sum(files.values())
+        # 删除到上限的90%，避免每次写入都要整理
+        for name in sorted(files, key=mtimes.__getitem__):
+            if self._size <= self.max_bytes * 0.9:
+                break
+            if self.__remove(name):
+                self._size -= files[name]
+
+    def __remove(self, name: str) -> bool:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            return False
+        self.__index(name, -1)
+        return True
+
+    def clear(self):
+        with self._lock:
+            for name in self.__list_files():
+                self.__remove(name)
+            self._subgraphs.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'size': self._size, 'max_bytes': self.max_bytes, 'subgraphs': len(self._subgraphs),
+                'hits': self.hits, 'misses': self.misses}
+
+
+_default_cache: Union[DiskCache, None] = None
+_default_lock = threading.Lock()
+
+
+def get_disk_cache() -> Union[DiskCache, None]:
+    """
+    :return: 进程中共享的磁盘缓存，RuntimeConfig.DISK_CACHE_SIZE为0(默认)或者目录无法创建时返回None
+    """
+    global _default_cache
+    if RuntimeConfig.DISK_CACHE_SIZE <= 0:
+        return None
+    with _default_lock:
+        if _default_cache is None or _default_cache.directory != RuntimeConfig.DISK_CACHE_DIR or \
+                _default_cache.max_bytes != RuntimeConfig.DISK_CACHE_SIZE:
+            try:
+                _default_cache = DiskCache(RuntimeConfig.DISK_CACHE_DIR, RuntimeConfig.DISK_CACHE_SIZE)
+            except OSError as e:
+                logger.warning('运行时: 无法创建磁盘缓存目录%s，%s', RuntimeConfig.DISK_CACHE_DIR, e)
+                return None
+        return _default_cache
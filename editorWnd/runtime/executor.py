@@ -0,0 +1,546 @@
+"""
+执行计划的解释器，用显式的栈驱动执行流和数据拉取，不依赖递归调用
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import Executor, Future, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.node_port import Pin
+from editorWnd.runtime.cache import LRUCache
+from editorWnd.runtime.disk_cache import DiskCache, SubgraphHasher
+from editorWnd.runtime.output import OUTPUT, logger
+from editorWnd.runtime.parallel import run_pure_node
+from editorWnd.runtime.plan import ExecutionPlan, UNCONNECTED
+from editorWnd.runtime.profiler import NodeProfiler
+from editorWnd.runtime.trace import TraceRecorder
+
+
+class ExecutionCancelled(Exception):
+    pass
+
+
+class GraphExecutor:
+    def __init__(self, plan: ExecutionPlan, memo_cache: Union[LRUCache, None] = None,
+                 pool: Union[Executor, None] = None, profiler: Union[NodeProfiler, None] = None,
+                 tracer: Union[TraceRecorder, None] = None, disk_cache: Union[DiskCache, None] = None):
+        """
+        :param plan: 执行计划
+        :param memo_cache: 纯数据节点的结果缓存，以(节点id, 输入值)为键，可以在多次运行和同一个图的不同计划之间共享
+        :param pool: 线程池或进程池(parallel.create_pool)，设置后互不依赖的纯数据分支会并行计算
+        :param profiler: 统计每个节点的耗时，设置后不再并行计算，保证统计的时间准确
+        :param tracer: 记录运行的时间线
+        :param disk_cache: 耗时的纯数据子图的结果保存到磁盘，以子图结构和来源值为键，在多次运行和进程之间共享
+        """
+        self._plan = plan
+        self._nodes = plan.nodes
+        self._input_slots = plan.input_slots
+        self._output_slots = plan.output_slots
+        self._exec_targets = plan.exec_targets
+        self._slot_owner = plan.slot_owner
+        self._data_deps = plan.data_deps
+        self._pure = plan.pure
+        self._pure_sources = plan.pure_sources
+        self._memo_cache = memo_cache
+        self._disk_cache = disk_cache
+        # 子图的结构哈希包含端口的默认值，每次运行创建新的执行器时重新计算
+        self._disk_hasher = SubgraphHasher(plan) if disk_cache is not None else None
+        self._pool = pool if profiler is None and tracer is None else None
+        self._profiler = profiler
+        self._tracer = tracer
+        # 当前session的编号，开启新的session只需要加一，不需要重置任何状态
+        self._epoch: int = 0
+        # 槽位中的值以及设置该值时的session编号
+        self._values: List[Any] = [None] * plan.slot_count
+        self._slot_epoch: List[int] = [-1] * plan.slot_count
+        # 节点最后一次运行时的session编号
+        self._node_epoch: List[int] = [-1] * len(self._nodes)
+        # 纯数据节点最后一次真正计算的session编号，复用结果时不更新
+        self._computed_epoch: List[int] = [-1] * len(self._nodes)
+        # 正在运行中的节点(可重入)
+        self._running: List[int] = [0] * len(self._nodes)
+        # 当前运行节点触发的执行输出
+        self._emitted: List[Tuple[int, int]] = []
+        # 只运行纯数据节点，不触发执行流和有副作用的节点(实时计算时使用)
+        self._pure_only: bool = False
+        # 已经运行的节点次数，用于显示进度
+        self.executed_count: int = 0
+        # 其他线程请求取消运行
+        self._cancelled: bool = False
+        # 折叠的常量视为在第0个session中计算好的结果，节点没有非纯的来源，之后的session都会直接复用
+        for slot, value in plan.constants.items():
+            self._values[slot] = value
+            self._slot_epoch[slot] = 0
+            self._computed_epoch[self._slot_owner[slot]] = 0
+
+    def run(self):
+        """
+        从开始节点运行整个图
+        :return:
+        """
+        self.bind()
+        try:
+            self.new_session()
+            self._drive([(self._plan.entry, UNCONNECTED)])
+        finally:
+            try:
+                # 出错时也写出已经打印的内容，便于定位
+                OUTPUT.flush()
+                for node in self._nodes:
+                    node.run_finished()
+            finally:
+                self.unbind()
+
+    def bind(self):
+        for index, node in enumerate(self._nodes):
+            node.set_executor(self, index)
+
+    def unbind(self):
+        for node in self._nodes:
+            node.set_executor(None, -1)
+
+    def new_session(self):
+        if self._cancelled:
+            raise ExecutionCancelled()
+        self._epoch += 1
+        if self._tracer is not None:
+            self._tracer.new_session(self._epoch)
+
+    def cancel(self):
+        """
+        请求停止运行，可以在其他线程中调用，运行中的图会在下一个节点或下一次循环时停止
+        :return:
+        """
+        self._cancelled = True
+
+    def get_output_values(self) -> Dict[int, Dict[int, Any]]:
+        """
+        获取所有设置过的输出端口最后一次的值
+        :return: {节点id: {端口下标: 值}}
+        """
+        values: Dict[int, Dict[int, Any]] = {}
+        for index, node in enumerate(self._nodes):
+            outputs = {port_index: self._values[slot] for port_index, slot in enumerate(self._output_slots[index])
+                       if slot >= 0 and self._slot_epoch[slot] >= 0}
+            if outputs:
+                values[node.get_node_id()] = outputs
+        return values
+
+    # ==============================================  实时计算  =======================================================
+    def invalidate(self, indices: Iterable[int]) -> List[int]:
+        """
+        沿数据连接把节点以及所有下游节点标记为需要重新计算
+        :param indices: 值发生变化的节点
+        :return: 需要重新计算的节点，按依赖顺序排列
+        """
+        consumers = self._plan.consumers
+        dirty = set()
+        stack = list(indices)
+        while stack:
+            index = stack.pop()
+            if index in dirty:
+                continue
+            dirty.add(index)
+            stack.extend(consumers[index])
+        for index in dirty:
+            self._node_epoch[index] = -1
+            self._computed_epoch[index] = -1
+            for slot in self._output_slots[index]:
+                if slot >= 0:
+                    self._slot_epoch[slot] = -1
+        return sorted(dirty, key=self._plan.topo_rank.__getitem__)
+
+    def evaluate(self, indices: Iterable[int]):
+        """
+        在当前session中计算纯数据节点，已经计算过的上游节点直接复用
+        :param indices: 要计算的节点
+        :return:
+        """
+        self.bind()
+        self._pure_only = True
+        try:
+            for index in indices:
+                if not self._pure[index] or self._node_epoch[index] == self._epoch:
+                    continue
+                try:
+                    self._evaluate(index)
+                except Exception as e:
+                    # 计算失败的节点本次不再重试，输出保持为空
+                    self._node_epoch[index] = self._epoch
+                    logger.warning('节点: %s计算失败，%s', self._nodes[index].node_title, e)
+        finally:
+            self._pure_only = False
+            self.unbind()
+
+    def get_output_value(self, index: int, port_index: int) -> Any:
+        slot = self._output_slots[index][port_index]
+        if slot < 0 or self._slot_epoch[slot] != self._epoch:
+            return None
+        return self._values[slot]
+
+    # ==================================================================================================================
+
+    # ==============================================  节点调用的接口  ==================================================
+    def input(self, index: int, port_index: int) -> Any:
+        slot = self._input_slots[index][port_index]
+        if slot >= 0:
+            if self._slot_epoch[slot] == self._epoch:
+                return self._values[slot]
+            return self._pull(slot)
+        node = self._nodes[index]
+        if slot == UNCONNECTED:
+            port_value = node.in_ports[port_index].get_default_value()
+            if port_value is None:
+                logger.warning('节点: %s的%s端口还没有设置值且没有连接的边', node.node_title,
+                               node.in_ports[port_index].get_port_label())
+            return port_value
+        logger.warning('节点: %s的第%d个端口不是一个数据端口', node.node_title, port_index)
+        return None
+
+    def output(self, index: int, port_index: int, value: Any):
+        slot = self._output_slots[index][port_index]
+        if slot < 0:
+            logger.warning('节点: %s的第%d个端口不是一个数据端口', self._nodes[index].node_title, port_index)
+            return
+        self._values[slot] = value
+        self._slot_epoch[slot] = self._epoch
+
+    def exec_input(self, index: int, port_index: int) -> Any:
+        if self._plan.input_kinds[index][port_index] != Pin.PinType.EXEC:
+            logger.warning('节点: %s的第%d个端口不是一个执行端口', self._nodes[index].node_title, port_index)
+            return None
+        slot = self._input_slots[index][port_index]
+        return self._values[slot] if self._slot_epoch[slot] == self._epoch else None
+
+    def exec_output(self, index: int, port_index: int):
+        if self._plan.output_kinds[index][port_index] != Pin.PinType.EXEC:
+            logger.warning('节点: %s的第%d个端口不是一个执行端口', self._nodes[index].node_title, port_index)
+            return
+        targets = self._exec_targets[index][port_index]
+        if self._tracer is not None:
+            self._tracer.exec_output(self._nodes[index], port_index, len(targets))
+        node = self._nodes[index]
+        if node.sync_exec and port_index not in node.tail_exec_outputs:
+            # 循环之类的节点需要等后续节点执行完毕后才能继续
+            self._drive(targets)
+        else:
+            # 其余节点的执行输出都是最后一步，交给调度循环处理，不再嵌套调用
+            self._emitted.extend(targets)
+
+    # ==================================================================================================================
+
+    def _drive(self, targets):
+        """
+        调度循环：依次运行被触发的节点，节点触发的执行输出压入栈中
+        :param targets: ((节点, 执行输入槽位), ...)
+        :return:
+        """
+        stack = list(reversed(targets))
+        while stack:
+            if self._cancelled:
+                raise ExecutionCancelled()
+            index, slot = stack.pop()
+            if slot >= 0:
+                self._values[slot] = True
+                self._slot_epoch[slot] = self._epoch
+            emitted = self._run(index)
+            if emitted:
+                stack.extend(reversed(emitted))
+
+    def _run(self, index: int) -> List[Tuple[int, int]]:
+        emitted, self._emitted = self._emitted, []
+        self.executed_count += 1
+        self._running[index] += 1
+        profiler = self._profiler
+        tracer = self._tracer
+        if profiler is not None:
+            profiler.enter(self._nodes[index])
+        if tracer is not None:
+            tracer.enter(self._nodes[index])
+        try:
+            self._nodes[index].run_node()
+            self._node_epoch[index] = self._epoch
+            self._computed_epoch[index] = self._epoch
+        finally:
+            if tracer is not None:
+                tracer.exit()
+            if profiler is not None:
+                profiler.exit()
+            self._running[index] -= 1
+            emitted, self._emitted = self._emitted, emitted
+        return emitted
+
+    def _pull(self, slot: int) -> Any:
+        """
+        获取还没有设置值的槽位，先按依赖顺序运行上游节点
+        :param slot: 槽位
+        :return: 槽位的值
+        """
+        owner = self._slot_owner[slot]
+        if self._running[owner]:
+            # 正在运行的节点(例如外层循环)，它输出的值在新的session中仍然有效
+            return self._values[slot]
+        if self._node_epoch[owner] != self._epoch and not (self._pure_only and not self._pure[owner]) \
+                and not self._reuse(owner):
+            self._evaluate(owner)
+        return self._values[slot] if self._slot_epoch[slot] == self._epoch else None
+
+    def _evaluate(self, root: int):
+        """
+        用显式栈做后序遍历，保证节点运行时它的输入都已经求值完毕
+        :param root: 要运行的节点
+        :return:
+        """
+        disk = self._disk_hasher is not None
+        if disk and self._pure[root] and self._load_from_disk(root):
+            return
+        # 开始计算纯数据节点(包括它的上游)的时间，用于判断结果是否值得保存到磁盘
+        started: Dict[int, float] = {root: time.perf_counter()} if disk else {}
+        if self._pool is not None and self._pure[root] and self._evaluate_parallel(root):
+            if disk:
+                self._save_to_disk(root, started[root], True)
+            return
+        stack = [root]
+        while stack:
+            index = stack[-1]
+            for slot in self._data_deps[index]:
+                if self._slot_epoch[slot] == self._epoch:
+                    continue
+                owner = self._slot_owner[slot]
+                if self._node_epoch[owner] != self._epoch and not self._running[owner] \
+                        and not (self._pure_only and not self._pure[owner]) and not self._reuse(owner):
+                    if disk and self._pure[owner]:
+                        # 上游子图的结果在磁盘中时不需要再向上计算
+                        if self._load_from_disk(owner):
+                            continue
+                        started[owner] = time.perf_counter()
+                    stack.append(owner)
+                    break
+            else:
+                stack.pop()
+                if self._node_epoch[index] == self._epoch:
+                    continue
+                if self._pure[index]:
+                    # 来源的值在上游计算完之后才确定，再查找一次磁盘缓存
+                    if disk and self._load_from_disk(index):
+                        continue
+                    if self._memo_cache is not None:
+                        self._run_memoized(index)
+                    else:
+                        self._run(index)
+                    if disk:
+                        self._save_to_disk(index, started[index], index == root)
+                    continue
+                emitted = self._run(index)
+                if emitted:
+                    self._drive(emitted)
+
+    def _pending_cone(self, root: int) -> Union[List[int], None]:
+        """
+        找出计算root需要运行的所有节点
+        :param root:
+        :return: 需要运行的节点，其中有不是纯数据的节点时返回None
+        """
+        cone = []
+        visited = {root}
+        stack = [root]
+        while stack:
+            index = stack.pop()
+            if not self._pure[index]:
+                return None
+            cone.append(index)
+            for slot in self._data_deps[index]:
+                owner = self._slot_owner[slot]
+                if owner in visited or self._slot_epoch[slot] == self._epoch \
+                        or self._node_epoch[owner] == self._epoch or self._running[owner] or self._reuse(owner):
+                    continue
+                visited.add(owner)
+                stack.append(owner)
+        return cone
+
+    def _evaluate_parallel(self, root: int) -> bool:
+        """
+        按依赖关系分批把纯数据节点提交到池中，一个节点的上游全部完成后立即提交，
+        输入值在当前线程中求好，输出值也在当前线程中写回，池中的任务不会访问执行器的状态
+        :param root: 要运行的节点
+        :return: 上游中有不是纯数据的节点，或者没有可以并行的分支时返回False，按顺序计算
+        """
+        cone = self._pending_cone(root)
+        if cone is None or len(cone) < 3:
+            return False
+        members = set(cone)
+        remaining: Dict[int, int] = {}
+        for index in cone:
+            owners = {self._slot_owner[slot] for slot in self._data_deps[index]}
+            remaining[index] = len(owners & members)
+        ready = [index for index in cone if remaining[index] == 0]
+        if len(ready) < 2:
+            return False
+        futures: Dict[Future, Tuple[int, Union[Tuple, None]]] = {}
+        while ready or futures:
+            if self._cancelled:
+                raise ExecutionCancelled()
+            finished = []
+            for index in ready:
+                key = self._memo_key(index) if self._memo_cache is not None else None
+                outputs = self._memo_cache.get(key) if key is not None else LRUCache.MISSING
+                if outputs is not LRUCache.MISSING:
+                    for port_index, value in outputs:
+                        self.output(index, port_index, value)
+                    finished.append(index)
+                    continue
+                node = self._nodes[index]
+                values = [self.input(index, port_index) if kind == Pin.PinType.DATA else None
+                          for port_index, kind in enumerate(self._plan.input_kinds[index])]
+                # 编辑器中的节点类就是nodes中的类，运行时替身通过node_cls找到原来的类
+                node_cls = getattr(node, 'node_cls', type(node))
+                futures[self._pool.submit(run_pure_node, node_cls, values)] = (index, key)
+            ready = []
+            if futures and not finished:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, key = futures.pop(future)
+                    for port_index, value in future.result().items():
+                        self.output(index, port_index, value)
+                    self.executed_count += 1
+                    if key is not None:
+                        self._memo_put(index, key)
+                    finished.append(index)
+            for index in finished:
+                self._node_epoch[index] = self._epoch
+                self._computed_epoch[index] = self._epoch
+                for consumer in self._plan.consumers[index]:
+                    if consumer in members:
+                        remaining[consumer] -= 1
+                        if remaining[consumer] == 0:
+                            ready.append(consumer)
+        return True
+
+    def _reuse(self, index: int) -> bool:
+        """
+        循环不变量外提：纯数据节点依赖的非纯节点输出(例如循环的索引)在上次计算之后都没有变化时，
+        上次的结果在当前session中仍然有效，只更新session编号，不重新计算
+        :param index: 节点
+        :return: 是否复用了上次的结果
+        """
+        sources = self._pure_sources[index]
+        computed = self._computed_epoch[index]
+        if sources is None or computed < 0:
+            return False
+        for slot in sources:
+            slot_epoch = self._slot_epoch[slot]
+            # 来源在计算之后被重新设置，或者已经失效(不是当前session设置的，也不是正在运行的循环的输出)
+            if slot_epoch > computed or (slot_epoch != self._epoch and not self._running[self._slot_owner[slot]]):
+                return False
+        self._node_epoch[index] = self._epoch
+        for slot in self._output_slots[index]:
+            if slot >= 0 and self._slot_epoch[slot] >= computed:
+                self._slot_epoch[slot] = self._epoch
+        return True
+
+    def _run_memoized(self, index: int):
+        """
+        运行纯数据节点，输入值相同时直接使用缓存的输出
+        :param index:
+        :return:
+        """
+        key = self._memo_key(index)
+        if key is not None:
+            outputs = self._memo_cache.get(key)
+            if outputs is not LRUCache.MISSING:
+                for port_index, value in outputs:
+                    self.output(index, port_index, value)
+                self._node_epoch[index] = self._epoch
+                self._computed_epoch[index] = self._epoch
+                if self._profiler is not None:
+                    self._profiler.cache_hit(self._nodes[index])
+                if self._tracer is not None:
+                    self._tracer.cache_hit(self._nodes[index])
+                return
+        self._run(index)
+        if key is not None:
+            self._memo_put(index, key)
+
+    def _memo_put(self, index: int, key: Tuple):
+        """
+        缓存刚计算完的输出，没有设置全部输出的节点(例如除数为0)不缓存，下次运行时再报告
+        槽位编号只在当前计划中有效，按输出端口下标保存
+        :return:
+        """
+        outputs = [(port_index, slot) for port_index, slot in enumerate(self._output_slots[index]) if slot >= 0]
+        if all(self._slot_epoch[slot] == self._epoch for _, slot in outputs):
+            self._memo_cache.put(key, tuple((port_index, self._values[slot]) for port_index, slot in outputs))
+
+    def _disk_key(self, index: int, check_index: bool = True) -> Union[str, None]:
+        if check_index and not self._disk_cache.has_subgraph():
+            return None
+        subgraph_hash = self._disk_hasher.get(index)
+        if check_index and not self._disk_cache.has_subgraph(subgraph_hash):
+            return None
+        values = []
+        for slot in self._pure_sources[index]:
+            if self._slot_epoch[slot] != self._epoch and not self._running[self._slot_owner[slot]]:
+                return None
+            values.append(self._values[slot])
+        return self._disk_cache.make_key(subgraph_hash, values, check_index=False)
+
+    def _load_from_disk(self, index: int) -> bool:
+        """
+        读取纯数据子图保存在磁盘中的结果
+        :param index: 子图的输出节点
+        :return: 是否读取成功
+        """
+        key = self._disk_key(index)
+        if key is None:
+            return False
+        outputs = self._disk_cache.get(key)
+        if outputs is DiskCache.MISSING:
+            return False
+        for port_index, value in outputs.items():
+            self.output(index, port_index, value)
+        self._node_epoch[index] = self._epoch
+        self._computed_epoch[index] = self._epoch
+        if self._profiler is not None:
+            self._profiler.cache_hit(self._nodes[index])
+        if self._tracer is not None:
+            self._tracer.cache_hit(self._nodes[index])
+        return True
+
+    def _save_to_disk(self, index: int, started: float, is_root: bool):
+        """
+        :param index: 刚计算完的纯数据节点
+        :param started: 开始计算它和它的上游的时间，耗时较短的结果不保存
+        :param is_root: 是否是这次求值的目标节点
+        :return:
+        """
+        if time.perf_counter() - started < RuntimeConfig.DISK_CACHE_MIN_TIME:
+            return
+        # 只保存子图的出口(目标节点，或者有非纯下游的节点)，耗时的长链中间的节点不逐个保存
+        if not is_root and all(self._pure[consumer] for consumer in self._plan.consumers[index]):
+            return
+        if any(slot >= 0 and self._slot_epoch[slot] != self._epoch for slot in self._output_slots[index]):
+            return
+        key = self._disk_key(index, check_index=False)
+        if key is None:
+            return
+        self._disk_cache.put(key, {port_index: self._values[slot]
+                                   for port_index, slot in enumerate(self._output_slots[index]) if slot >= 0})
+
+    def _memo_key(self, index: int) -> Union[Tuple, None]:
+        values = []
+        for port_index, slot in enumerate(self._input_slots[index]):
+            if slot >= 0:
+                values.append(self._values[slot] if self._slot_epoch[slot] == self._epoch
+                              or self._running[self._slot_owner[slot]] else None)
+            elif slot == UNCONNECTED:
+                values.append(self._nodes[index].in_ports[port_index].get_default_value())
+        # 值相等但类型不同时(例如1和1.0)结果可能不同
+        # 优化后的计划删除了部分节点，同一个下标在不同的计划中可能是不同的节点，使用节点id
+        key = (self._nodes[index].get_node_id(), tuple(values), tuple(type(value) for value in values))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
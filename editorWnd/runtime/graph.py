@@ -0,0 +1,366 @@
+"""
+不依赖Qt对象的运行时图模型，用于加载.vgf文件并直接运行
+运行时替身只从节点类上复制属性和方法，但是nodes中的节点类继承自Qt的图元，导入它们时仍然会导入PySide6
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Tuple, Type, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.env import ENV
+from editorWnd.node import Node
+from editorWnd.node_port import NodePort, Pin
+from editorWnd.nodes.ActionNode import BeginNode
+from editorWnd.runtime.cache import LRUCache
+from editorWnd.runtime.disk_cache import DiskCache, get_disk_cache
+from editorWnd.runtime.executor import GraphExecutor
+from editorWnd.runtime.optimize import optimize_plan
+from editorWnd.runtime.plan import ExecutionPlan, GraphCompileError, compile_graph
+from editorWnd.runtime.profiler import NodeProfiler
+from editorWnd.runtime.trace import TraceRecorder
+
+
+class GraphLoadError(Exception):
+    pass
+
+
+class RuntimePort:
+    def __init__(self, pin: Pin, port_type: int, index: int):
+        self.port_type: int = port_type
+        self.port_class: str = getattr(pin, 'pin_class', '')
+        self.parent_node: Union[RuntimeNode, None] = None
+        self._port_label: str = pin.get_pin_name()
+        self._port_index: int = index
+        self._connected_ports: List[RuntimePort] = []
+        self._default_value: Any = None
+        self._sweep_name: str = ''
+        self._result_name: str = ''
+
+    def add_connected_port(self, port: RuntimePort):
+        self._connected_ports.append(port)
+
+    def get_connected_ports(self) -> List[RuntimePort]:
+        return self._connected_ports
+
+    def is_connected(self) -> bool:
+        return len(self._connected_ports) > 0
+
+    def set_widget_value(self, value: Any):
+        self._default_value = value
+
+    def get_default_value(self) -> Any:
+        return self._default_value
+
+    def get_sweep_name(self) -> str:
+        return self._sweep_name
+
+    def set_sweep_name(self, name: str):
+        self._sweep_name = name
+
+    def get_result_name(self) -> str:
+        return self._result_name
+
+    def set_result_name(self, name: str):
+        self._result_name = name
+
+    def get_port_index(self) -> int:
+        return self._port_index
+
+    def get_port_label(self) -> str:
+        return self._port_label
+
+
+class RuntimeNode:
+    """
+    节点的运行时替身，拥有和Node相同的运行接口，run_node直接复用nodes中节点类的实现
+    """
+    node_cls: Type[Node] = Node
+    pkg_name: str = ''
+    node_title: str = ''
+    node_description: str = ''
+    input_pins: List[Pin] = []
+    output_pins: List[Pin] = []
+    sync_exec: bool = False
+    tail_exec_outputs: Tuple[int, ...] = ()
+    pure: bool = False
+
+    def __init__(self, graph: RuntimeGraph, node_id: int):
+        self._scene: RuntimeGraph = graph
+        self._node_id: int = node_id
+        self._executor: Union[GraphExecutor, None] = None
+        self._plan_index: int = -1
+        self.in_ports: List[RuntimePort] = []
+        self.out_ports: List[RuntimePort] = []
+        for i, pin in enumerate(self.input_pins):
+            port_type = NodePort.PORT_TYPE_PARAM if pin.pin_type == Pin.PinType.DATA else NodePort.PORT_TYPE_EXEC_IN
+            self.__add_port(self.in_ports, RuntimePort(pin, port_type, i))
+        for i, pin in enumerate(self.output_pins):
+            port_type = NodePort.PORT_TYPE_OUTPUT if pin.pin_type == Pin.PinType.DATA else NodePort.PORT_TYPE_EXEC_OUT
+            self.__add_port(self.out_ports, RuntimePort(pin, port_type, i))
+
+    def __add_port(self, ports: List[RuntimePort], port: RuntimePort):
+        port.parent_node = self
+        ports.append(port)
+
+    def get_node_id(self) -> int:
+        return self._node_id
+
+    def get_input_port(self, index: int) -> Union[RuntimePort, None]:
+        if 0 <= index < len(self.in_ports):
+            return self.in_ports[index]
+
+    def get_output_port(self, index: int) -> Union[RuntimePort, None]:
+        if 0 <= index < len(self.out_ports):
+            return self.out_ports[index]
+
+    def set_executor(self, executor: Union[GraphExecutor, None], index: int):
+        self._executor = executor
+        self._plan_index = index
+
+    def run_node(self):
+        pass
+
+    def run_finished(self):
+        pass
+
+    def input(self, index: int) -> Any:
+        return self._executor.input(self._plan_index, index)
+
+    def output(self, index: int, value: Any):
+        self._executor.output(self._plan_index, index, value)
+
+    def exec_input(self, index: int) -> Union[bool, None]:
+        return self._executor.exec_input(self._plan_index, index)
+
+    def exec_output(self, index: int):
+        self._executor.exec_output(self._plan_index, index)
+
+
+class RuntimeGraph:
+    # 节点类 -> 运行时替身类
+    _runtime_cls: Dict[Type[Node], Type[RuntimeNode]] = {}
+
+    def __init__(self):
+        self._nodes: List[RuntimeNode] = []
+        self._node_id_obj: Dict[int, RuntimeNode] = {}
+        self._begin_node: Union[RuntimeNode, None] = None
+        self._plan: Union[ExecutionPlan, None] = None
+        # 优化后用于运行的计划，图被修改时与_plan一起清空
+        self._run_plan: Union[ExecutionPlan, None] = None
+        self._executor: Union[GraphExecutor, None] = None
+        self._memo_cache: LRUCache = LRUCache(RuntimeConfig.MEMO_CACHE_SIZE)
+        self._disk_cache: Union[DiskCache, None] = get_disk_cache()
+        self._cancel_requested: bool = False
+        self._pool: Union[Executor, None] = None
+        self._profiler: Union[NodeProfiler, None] = None
+        self._tracer: Union[TraceRecorder, None] = None
+
+    @staticmethod
+    def runtime_cls(cls: Type[Node]) -> Type[RuntimeNode]:
+        """
+        把节点类中定义的属性和方法(不包括Qt相关的基类)复制到运行时替身类上
+        :param cls: nodes中的节点类
+        :return: 运行时替身类
+        """
+        runtime_cls = RuntimeGraph._runtime_cls.get(cls, None)
+        if runtime_cls is None:
+            attrs: Dict[str, Any] = {}
+            for base in reversed(cls.__mro__):
+                if base is Node or not issubclass(base, Node):
+                    continue
+                attrs.update({k: v for k, v in vars(base).items() if not (k.startswith('__') and k.endswith('__'))})
+            attrs['node_cls'] = cls
+            attrs['__module__'] = cls.__module__
+            runtime_cls = type(cls.__name__, (RuntimeNode,), attrs)
+            RuntimeGraph._runtime_cls[cls] = runtime_cls
+        return runtime_cls
+
+    @staticmethod
+    def load(filepath: str) -> RuntimeGraph:
+        with open(filepath, 'r') as f:
+            data = json.loads(f.read())
+        graph = RuntimeGraph()
+        graph.load_data(data)
+        return graph
+
+    def load_data(self, data: Dict[str, Any]):
+        """
+        从View.save_graph保存的数据创建节点和连接
+        :param data:
+        :return:
+        """
+        if not ENV.cls_lst:
+            ENV.init_node_env()
+        node_id_obj: Dict[int, RuntimeNode] = {}
+        for node in data['nodes']:
+            cls = ENV.get_cls_by_name(node['class'])
+            if cls is None:
+                raise GraphLoadError(f'找不到节点类 {node["class"]}')
+            node_id = int(node['id'])
+            node_obj = self.add_node(cls, node_id)
+            node_id_obj[node_id] = node_obj
+            for index, value in node['port_values'].items():
+                node_obj.get_input_port(int(index)).set_widget_value(value)
+            for index, name in node.get('sweep_params', {}).items():
+                node_obj.get_input_port(int(index)).set_sweep_name(name)
+            for index, name in node.get('result_ports', {}).items():
+                node_obj.get_output_port(int(index)).set_result_name(name)
+        for edge in data['edges']:
+            source_port = node_id_obj[edge['source_node_id']].get_output_port(edge['source_port_index'])
+            dest_port = node_id_obj[edge['dest_node_id']].get_input_port(edge['dest_port_index'])
+            source_port.add_connected_port(dest_port)
+            dest_port.add_connected_port(source_port)
+        self._plan = None
+        self._run_plan = None
+
+    def add_node(self, cls: Type[Node], node_id: int) -> RuntimeNode:
+        node = RuntimeGraph.runtime_cls(cls)(self, node_id)
+        if issubclass(cls, BeginNode):
+            if self._begin_node is not None:
+                raise GraphLoadError('【开始运行】节点已经存在了')
+            self._begin_node = node
+        self._nodes.append(node)
+        self._node_id_obj[node_id] = node
+        self._plan = None
+        self._run_plan = None
+        return node
+
+    def get_node(self, node_id: int) -> Union[RuntimeNode, None]:
+        return self._node_id_obj.get(node_id, None)
+
+    def set_port_values(self, node_id: int, values: Dict[int, Any]):
+        """
+        修改节点输入端口的默认值，不需要重新加载和编译图，只重新生成优化后的计划
+        :param node_id:
+        :param values: {端口下标: 值}，与View.to_graph_data保存的port_values相同
+        :return:
+        """
+        node = self._node_id_obj[node_id]
+        for index, value in values.items():
+            node.get_input_port(index).set_widget_value(value)
+        # 折叠的常量可能依赖被修改的默认值
+        self._run_plan = None
+
+    def get_nodes(self) -> List[RuntimeNode]:
+        return self._nodes
+
+    def get_memo_cache(self) -> LRUCache:
+        return self._memo_cache
+
+    def set_pool(self, pool: Union[Executor, None]):
+        """
+        设置并行计算纯数据分支的池，池由调用者创建和关闭
+        :param pool: parallel.create_pool创建的池，None表示不并行
+        :return:
+        """
+        self._pool = pool
+
+    def set_disk_cache(self, disk_cache: Union[DiskCache, None]):
+        """
+        :param disk_cache: 保存耗时的纯数据子图结果的磁盘缓存，默认使用disk_cache.get_disk_cache()，None表示不使用
+        :return:
+        """
+        self._disk_cache = disk_cache
+        self._run_plan = None
+
+    def set_profiler(self, profiler: Union[NodeProfiler, None]):
+        self._profiler = profiler
+
+    def set_tracer(self, tracer: Union[TraceRecorder, None]):
+        self._tracer = tracer
+
+    def get_view(self) -> RuntimeGraph:
+        # 节点通过self._scene.get_view()来开启新的session
+        return self
+
+    def get_execution_plan(self) -> ExecutionPlan:
+        if self._plan is None:
+            self._plan = compile_graph(self._nodes, self._begin_node)
+            self._memo_cache.clear()
+        return self._plan
+
+    def get_run_plan(self) -> ExecutionPlan:
+        if self._run_plan is None:
+            plan = self.get_execution_plan()
+            # 扫描参数的值在每次运行前才设置，依赖它们的节点不能折叠
+            sweep_ports = [port for ports in self.get_sweep_ports().values() for port in ports]
+            self._run_plan = optimize_plan(plan, sweep_ports, self._disk_cache) if RuntimeConfig.OPTIMIZE_PLAN else plan
+        return self._run_plan
+
+    def get_sweep_ports(self) -> Dict[str, List[RuntimePort]]:
+        """
+        :return: {参数名称: 端口列表}，同一个名称可以标记多个端口
+        """
+        sweep_ports: Dict[str, List[RuntimePort]] = {}
+        for node in self._nodes:
+            for port in node.in_ports:
+                if port.get_sweep_name():
+                    sweep_ports.setdefault(port.get_sweep_name(), []).append(port)
+        return sweep_ports
+
+    def set_sweep_values(self, values: Dict[str, Any]):
+        """
+        设置扫描参数的值，执行计划不受影响，不需要重新编译
+        :param values: {参数名称: 值}
+        :return:
+        """
+        sweep_ports = self.get_sweep_ports()
+        for name, value in values.items():
+            if name not in sweep_ports:
+                raise ValueError(f'图中没有名为{name}的扫描参数')
+            for port in sweep_ports[name]:
+                port.set_widget_value(value)
+
+    def get_result_ports(self) -> Dict[str, Tuple[RuntimeNode, int]]:
+        """
+        :return: {结果名称: (节点, 输出端口下标)}，按节点的顺序排列
+        """
+        result_ports: Dict[str, Tuple[RuntimeNode, int]] = {}
+        for node in self._nodes:
+            for index, port in enumerate(node.out_ports):
+                if port.get_result_name():
+                    result_ports[port.get_result_name()] = (node, index)
+        return result_ports
+
+    def get_result_values(self) -> Dict[str, Any]:
+        """
+        :return: {结果名称: 最近一次运行中端口的值}，没有运行到的端口为None
+        """
+        values = self.get_output_values()
+        return {name: values.get(node.get_node_id(), {}).get(index, None)
+                for name, (node, index) in self.get_result_ports().items()}
+
+    def run(self):
+        if self._begin_node is None:
+            raise GraphCompileError('需要一个【开始运行】节点来运行')
+        # 运行结束后保留执行器，用于获取输出的值
+        self._executor = GraphExecutor(self.get_run_plan(), self._memo_cache, self._pool, self._profiler,
+                                       self._tracer, self._disk_cache)
+        if self._cancel_requested:
+            self._executor.cancel()
+        if self._profiler is not None:
+            self._profiler.start()
+        try:
+            self._executor.run()
+        finally:
+            # 图可以多次运行，取消只对本次运行有效
+            self._cancel_requested = False
+            if self._profiler is not None:
+                self._profiler.stop()
+
+    def cancel(self):
+        self._cancel_requested = True
+        if self._executor is not None:
+            self._executor.cancel()
+
+    def get_executed_count(self) -> int:
+        return self._executor.executed_count if self._executor is not None else 0
+
+    def get_output_values(self) -> Dict[int, Dict[int, Any]]:
+        return self._executor.get_output_values() if self._executor is not None else {}
+
+    def new_session(self):
+        if self._executor is not None:
+            self._executor.new_session()
@@ -0,0 +1,100 @@
+"""
+运行前对执行计划做的优化：删除不会运行的节点，把只依赖默认值的纯数据节点折叠为常量
+
+优化后的计划只用于从开始节点运行，实时计算需要显示所有节点的值，仍然使用完整的计划
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Collection, Dict, List, Set, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.runtime.disk_cache import DiskCache, SubgraphHasher
+from editorWnd.runtime.output import hold_diagnostics
+from editorWnd.runtime.parallel import run_pure_node
+from editorWnd.runtime.plan import ExecutionPlan, UNCONNECTED, compile_graph
+
+
+def optimize_plan(plan: ExecutionPlan, variable_ports: Collection[Any] = (),
+                  disk_cache: Union[DiskCache, None] = None) -> ExecutionPlan:
+    """
+    :param plan: compile_graph生成的包含开始运行节点的计划
+    :param variable_ports: 默认值会在运行前被修改的输入端口(例如扫描参数)，使用它们的节点不会被折叠
+    :param disk_cache: 折叠时先从磁盘缓存中读取之前的结果，耗时的结果也保存到磁盘
+    :return: 新的执行计划，节点下标与原计划不同
+    """
+    reachable = _reachable_nodes(plan)
+    if len(reachable) < len(plan.nodes):
+        plan = compile_graph([plan.nodes[i] for i in sorted(reachable)], plan.nodes[plan.entry])
+    _fold_constants(plan, set(variable_ports), disk_cache)
+    return plan
+
+
+def _reachable_nodes(plan: ExecutionPlan) -> List[int]:
+    """
+    从开始节点出发，沿执行连接找到会被触发的节点，沿数据连接找到它们需要的上游节点，
+    其余的节点在运行时不会被访问
+    :return: 节点下标
+    """
+    visited = {plan.entry}
+    stack = [plan.entry]
+    while stack:
+        index = stack.pop()
+        successors = [dest for targets in plan.exec_targets[index] for dest, _ in targets]
+        successors.extend(plan.slot_owner[slot] for slot in plan.data_deps[index])
+        for successor in successors:
+            if successor not in visited:
+                visited.add(successor)
+                stack.append(successor)
+    return list(visited)
+
+
+def _fold_constants(plan: ExecutionPlan, variable_ports: Set[Any], disk_cache: Union[DiskCache, None]):
+    """
+    没有间接依赖任何执行节点输出的纯数据节点，每次运行的结果都相同，在这里按依赖顺序计算一次，
+    结果写入plan.constants，运行时直接使用
+    计算出错、给出警告或者没有设置全部输出的节点不折叠，运行时再报告
+    :return:
+    """
+    constants: Dict[int, Any] = {}
+    folded = [False] * len(plan.nodes)
+    hasher = SubgraphHasher(plan) if disk_cache is not None else None
+    for index in plan.topo_order:
+        if plan.pure_sources[index] != () or not all(folded[plan.slot_owner[slot]] for slot in plan.data_deps[index]):
+            continue
+        node = plan.nodes[index]
+        if any(node.in_ports[port_index] in variable_ports for port_index, slot in enumerate(plan.input_slots[index])
+               if slot == UNCONNECTED):
+            continue
+        values: List[Any] = []
+        for port_index, slot in enumerate(plan.input_slots[index]):
+            if slot >= 0:
+                values.append(constants.get(slot, None))
+            elif slot == UNCONNECTED:
+                values.append(node.in_ports[port_index].get_default_value())
+            else:
+                values.append(None)
+        # 折叠的节点没有来源，子图的结构哈希就是键
+        key = None
+        if disk_cache is not None and disk_cache.has_subgraph():
+            key = disk_cache.make_key(hasher.get(index), ())
+        outputs = disk_cache.get(key) if key is not None else DiskCache.MISSING
+        if outputs is DiskCache.MISSING:
+            started = time.perf_counter()
+            try:
+                with hold_diagnostics() as records:
+                    outputs = run_pure_node(getattr(node, 'node_cls', type(node)), values)
+            except Exception:
+                continue
+            # 给出警告或者没有设置全部输出的节点(例如除数为0)同样留到运行时，运行到时才报告
+            if records or any(slot >= 0 and port_index not in outputs
+                              for port_index, slot in enumerate(plan.output_slots[index])):
+                continue
+            if disk_cache is not None and time.perf_counter() - started >= RuntimeConfig.DISK_CACHE_MIN_TIME:
+                disk_cache.put(disk_cache.make_key(hasher.get(index), (), check_index=False), outputs)
+        for port_index, value in outputs.items():
+            slot = plan.output_slots[index][port_index]
+            if slot >= 0:
+                constants[slot] = value
+        folded[index] = True
+    plan.constants = constants
@@ -0,0 +1,158 @@
+"""
+运行时的输出：节点打印的内容先放入缓冲区，批量写入控制台或编辑器的输出面板；
+诊断信息使用logging输出，级别低于设置的级别时只做一次级别判断，不会格式化消息
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import logging
+import sys
+import threading
+from typing import Callable, Deque, Iterator, List, Union
+
+from editorWnd.config import RuntimeConfig
+
+# 诊断信息使用%格式化的参数传入，例如logger.warning('节点: %s计算失败', title)，被过滤时不会格式化
+logger = logging.getLogger('editorWnd')
+
+
+def setup_logging(level: Union[str, int, None] = None):
+    """
+    把诊断信息输出到标准错误，编辑器和命令行运行时调用一次
+    :param level: 日志级别，默认使用RuntimeConfig.LOG_LEVEL
+    :return:
+    """
+    logger.setLevel(RuntimeConfig.LOG_LEVEL if level is None else level)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+
+
+class _HoldFilter(logging.Filter):
+    def __init__(self, thread_id: int):
+        super().__init__()
+        self._thread_id: int = thread_id
+        self.records: List[logging.LogRecord] = []
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.thread != self._thread_id:
+            return True
+        self.records.append(record)
+        return False
+
+
+@contextlib.contextmanager
+def hold_diagnostics() -> Iterator[List[logging.LogRecord]]:
+    """
+    当前线程产生的诊断信息暂不输出，记录到返回的列表中，其他线程的诊断信息不受影响
+    :return:
+    """
+    hold = _HoldFilter(threading.get_ident())
+    logger.addFilter(hold)
+    try:
+        yield hold.records
+    finally:
+        logger.removeFilter(hold)
+
+
+def _write_stdout(lines: List[str]):
+    # 每次写入时才获取sys.stdout，重定向标准输出后仍然有效
+    sys.stdout.write('\n'.join(lines) + '\n')
+    sys.stdout.flush()
+
+
+class OutputBuffer:
+    """
+    打印节点的输出缓冲区，可以在运行图的后台线程中写入
+    积累的行数达到上限或者一次运行结束时，整批交给输出目标
+    """
+
+    def __init__(self, flush_lines: int = RuntimeConfig.OUTPUT_FLUSH_LINES):
+        self._flush_lines: int = flush_lines
+        self._lines: List[str] = []
+        self._lock = threading.Lock()
+        self._sink: Union[Callable[[List[str]], None], None] = None
+
+    def set_sink(self, sink: Union[Callable[[List[str]], None], None]):
+        """
+        :param sink: 接收一批输出行的函数，可能在后台线程中调用，None表示写入标准输出
+        :return:
+        """
+        self.flush()
+        self._sink = sink
+
+    def write(self, text: str):
+        with self._lock:
+            self._lines.append(text)
+            full = len(self._lines) >= self._flush_lines
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+        if lines:
+            (self._sink or _write_stdout)(lines)
+
+
+OUTPUT = OutputBuffer()
+
+
+class _LinesHandler(logging.Handler):
+    def __init__(self, lines: Deque[str]):
+        super().__init__()
+        self.setFormatter(logging.Formatter('%(message)s'))
+        self._lines: Deque[str] = lines
+
+    def emit(self, record: logging.LogRecord):
+        # 先放入更早打印的内容，保持输出的顺序
+        OUTPUT.flush()
+        self._lines.append(self.format(record))
+
+
+class LinesWriter(io.TextIOBase):
+    """
+    代替标准输出，生成的代码和节点中直接print的内容也按行记录
+    """
+
+    def __init__(self, lines: Deque[str]):
+        super().__init__()
+        self._lines: Deque[str] = lines
+        self._partial: str = ''
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        *complete, self._partial = (self._partial + text).split('\n')
+        self._lines.extend(complete)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def finish(self):
+        """
+        一次运行结束时调用，记录最后没有换行的内容
+        :return:
+        """
+        OUTPUT.flush()
+        if self._partial:
+            self._lines.append(self._partial)
+            self._partial = ''
+
+
+def capture_output(lines: Deque[str]) -> LinesWriter:
+    """
+    在批量运行的工作进程中调用，打印的内容、诊断信息和标准输出都记录到lines中，
+    不会与其他进程的输出混在一起
+    :param lines: 记录输出的队列，调用者在每次运行前清空
+    :return: 代替sys.stdout的对象
+    """
+    OUTPUT.set_sink(lines.extend)
+    logger.addHandler(_LinesHandler(lines))
+    logger.propagate = False
+    sys.stdout = LinesWriter(lines)
+    return sys.stdout
@@ -0,0 +1,70 @@
+"""
+在线程池或进程池中运行纯数据节点
+
+任务只包含节点类和已经求好的输入值，工作线程/进程中创建一个独立的运行时替身来运行，
+不会访问执行器和图中的节点对象，因此不需要加锁，也可以把任务发送到其他进程
+"""
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Type
+
+from editorWnd.node import Node
+
+POOL_THREAD = 'thread'
+POOL_PROCESS = 'process'
+
+
+def create_pool(workers: int, backend: str = POOL_THREAD) -> Executor:
+    """
+    创建运行纯数据分支的池
+    :param workers: 线程/进程的数量
+    :param backend: POOL_THREAD适合会释放GIL的节点(例如numpy计算)，POOL_PROCESS适合纯Python的CPU密集型节点，
+        但进程池需要复制输入值，内存映射的向量也会被完整读入后发送给子进程
+    :return:
+    """
+    if backend == POOL_PROCESS:
+        # 编辑器进程中有Qt线程，fork出的子进程状态不可靠，统一使用spawn
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    if backend == POOL_THREAD:
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='graph-worker')
+    raise ValueError(f'未知的并行方式 {backend}')
+
+
+class _ValueExecutor:
+    """
+    只提供节点运行需要的接口，输入是预先求好的值，输出记录下来交回主线程
+    """
+
+    def __init__(self, values: List[Any]):
+        self.values: List[Any] = values
+        self.outputs: Dict[int, Any] = {}
+
+    def input(self, index: int, port_index: int) -> Any:
+        return self.values[port_index]
+
+    def output(self, index: int, port_index: int, value: Any):
+        self.outputs[port_index] = value
+
+    def exec_input(self, index: int, port_index: int) -> Any:
+        return None
+
+    def exec_output(self, index: int, port_index: int):
+        pass
+
+
+def run_pure_node(node_cls: Type[Node], values: List[Any]) -> Dict[int, Any]:
+    """
+    池中运行的任务
+    :param node_cls: nodes中的节点类，进程池中按模块名和类名传递
+    :param values: 每个输入端口的值，执行端口为None
+    :return: {输出端口下标: 值}
+    """
+    # graph模块依赖执行器，执行器又依赖本模块，只能在这里导入
+    from editorWnd.runtime.graph import RuntimeGraph
+    node = RuntimeGraph.runtime_cls(node_cls)(None, -1)
+    executor = _ValueExecutor(values)
+    node.set_executor(executor, 0)
+    node.run_node()
+    return executor.outputs
@@ -0,0 +1,199 @@
+"""
+执行计划：把节点图编译为扁平的表结构，运行时只做下标访问，不再遍历端口和连接
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import List, Tuple, Dict, Any, Sequence, Union
+
+from editorWnd.node_port import Pin
+
+# input_slots中的特殊值
+UNCONNECTED = -1  # 数据端口没有连接，使用默认值
+NOT_DATA = -2  # 不是数据端口
+
+
+class GraphCompileError(Exception):
+    pass
+
+
+class ExecutionPlan:
+    """
+    编译后的执行计划
+
+    所有数据输出端口和执行输入端口都被分配一个槽位(slot)，运行时的值存放在以槽位为下标的列表中
+    """
+
+    def __init__(self, nodes: List[Any], entry: int, slot_count: int,
+                 input_slots: List[Tuple[int, ...]], input_kinds: List[Tuple[str, ...]],
+                 output_slots: List[Tuple[int, ...]], output_kinds: List[Tuple[str, ...]],
+                 exec_targets: List[Tuple[Tuple[Tuple[int, int], ...], ...]],
+                 slot_owner: List[int], data_deps: List[Tuple[int, ...]], consumers: List[Tuple[int, ...]],
+                 topo_order: List[int], pure: Tuple[bool, ...],
+                 pure_sources: Tuple[Union[Tuple[int, ...], None], ...]):
+        self.nodes = nodes
+        # 开始节点的下标
+        self.entry = entry
+        self.slot_count = slot_count
+        # [节点][输入端口] -> 数据端口连接的槽位 / UNCONNECTED / 执行输入端口自己的槽位
+        self.input_slots = input_slots
+        self.input_kinds = input_kinds
+        # [节点][输出端口] -> 数据输出端口的槽位，执行端口为NOT_DATA
+        self.output_slots = output_slots
+        self.output_kinds = output_kinds
+        # [节点][输出端口] -> ((目标节点, 目标执行输入槽位), ...)
+        self.exec_targets = exec_targets
+        # [槽位] -> 产生该值的节点
+        self.slot_owner = slot_owner
+        # [节点] -> 所有已连接的数据输入槽位
+        self.data_deps = data_deps
+        # [节点] -> 通过数据连接直接依赖该节点的下游节点
+        self.consumers = consumers
+        # 按数据依赖排序后的节点顺序，上游在前
+        self.topo_order = topo_order
+        # [节点] -> 在topo_order中的位置
+        self.topo_rank: List[int] = [0] * len(nodes)
+        for rank, index in enumerate(topo_order):
+            self.topo_rank[index] = rank
+        # id(节点) -> 节点下标
+        self.node_index: Dict[int, int] = {id(node): i for i, node in enumerate(nodes)}
+        # [节点] -> 是否是纯数据节点
+        self.pure = pure
+        # [节点] -> 纯数据节点经过其他纯数据节点间接依赖的非纯节点输出槽位(例如循环的索引)，非纯节点为None
+        # 这些槽位的值没有变化时，纯数据节点上次计算的结果在新的session中仍然有效
+        self.pure_sources = pure_sources
+        # [槽位] -> 常量折叠(optimize.optimize_plan)后的值，运行时不再计算这些槽位的节点
+        self.constants: Dict[int, Any] = {}
+
+
+def compile_graph(nodes: Sequence[Any], entry_node: Any) -> ExecutionPlan:
+    """
+    遍历一次所有节点的连接关系，生成执行计划
+    :param nodes: 图中所有的节点
+    :param entry_node: 开始运行节点，只做数据计算时可以为None
+    :return: 执行计划
+    """
+    nodes = list(nodes)
+    node_index: Dict[int, int] = {id(node): i for i, node in enumerate(nodes)}
+    if entry_node is not None and id(entry_node) not in node_index:
+        raise GraphCompileError('开始运行节点不在图中')
+
+    # 分配槽位：数据输出端口 + 执行输入端口
+    slot_count = 0
+    slot_owner: List[int] = []
+    output_slots: List[Tuple[int, ...]] = []
+    output_kinds: List[Tuple[str, ...]] = []
+    exec_in_slots: List[Tuple[int, ...]] = []
+    for i, node in enumerate(nodes):
+        slots = []
+        for pin in node.output_pins:
+            if pin.pin_type == Pin.PinType.DATA:
+                slots.append(slot_count)
+                slot_owner.append(i)
+                slot_count += 1
+            else:
+                slots.append(NOT_DATA)
+        output_slots.append(tuple(slots))
+        output_kinds.append(tuple(pin.pin_type for pin in node.output_pins))
+        slots = []
+        for pin in node.input_pins:
+            if pin.pin_type == Pin.PinType.EXEC:
+                slots.append(slot_count)
+                slot_owner.append(i)
+                slot_count += 1
+            else:
+                slots.append(NOT_DATA)
+        exec_in_slots.append(tuple(slots))
+
+    # 解析输入端口的连接
+    input_slots: List[Tuple[int, ...]] = []
+    input_kinds: List[Tuple[str, ...]] = []
+    data_deps: List[Tuple[int, ...]] = []
+    for i, node in enumerate(nodes):
+        slots = []
+        deps = []
+        for index, pin in enumerate(node.input_pins):
+            if pin.pin_type != Pin.PinType.DATA:
+                slots.append(exec_in_slots[i][index])
+                continue
+            slot = UNCONNECTED
+            for port in node.in_ports[index].get_connected_ports():
+                src = node_index.get(id(port.parent_node), None)
+                if src is None:
+                    continue
+                slot = output_slots[src][port.get_port_index()]
+                break
+            slots.append(slot)
+            if slot >= 0:
+                deps.append(slot)
+        input_slots.append(tuple(slots))
+        input_kinds.append(tuple(pin.pin_type for pin in node.input_pins))
+        data_deps.append(tuple(deps))
+
+    # 解析执行输出端口连接的目标
+    exec_targets: List[Tuple[Tuple[Tuple[int, int], ...], ...]] = []
+    for i, node in enumerate(nodes):
+        targets = []
+        for index, pin in enumerate(node.output_pins):
+            if pin.pin_type != Pin.PinType.EXEC:
+                targets.append(())
+                continue
+            port_targets = []
+            for port in node.out_ports[index].get_connected_ports():
+                dest = node_index.get(id(port.parent_node), None)
+                if dest is None:
+                    continue
+                port_targets.append((dest, exec_in_slots[dest][port.get_port_index()]))
+            targets.append(tuple(port_targets))
+        exec_targets.append(tuple(targets))
+
+    consumers: List[List[int]] = [[] for _ in range(len(nodes))]
+    for i, deps in enumerate(data_deps):
+        for owner in dict.fromkeys(slot_owner[slot] for slot in deps):
+            consumers[owner].append(i)
+    topo_order = _sort_data_deps(nodes, consumers)
+
+    pure_sources: List[Union[Tuple[int, ...], None]] = [None] * len(nodes)
+    for i in topo_order:
+        if not nodes[i].pure:
+            continue
+        sources: Dict[int, None] = {}
+        for slot in data_deps[i]:
+            owner_sources = pure_sources[slot_owner[slot]]
+            if owner_sources is None:
+                sources[slot] = None
+            else:
+                sources.update(dict.fromkeys(owner_sources))
+        pure_sources[i] = tuple(sources)
+
+    return ExecutionPlan(nodes=nodes, entry=node_index.get(id(entry_node), -1), slot_count=slot_count,
+                         input_slots=input_slots, input_kinds=input_kinds,
+                         output_slots=output_slots, output_kinds=output_kinds,
+                         exec_targets=exec_targets, slot_owner=slot_owner,
+                         data_deps=data_deps, consumers=[tuple(c) for c in consumers], topo_order=topo_order,
+                         pure=tuple(node.pure for node in nodes), pure_sources=tuple(pure_sources))
+
+
+def _sort_data_deps(nodes: List[Any], consumers: List[List[int]]) -> List[int]:
+    """
+    按数据连接做拓扑排序，同时检查数据连接是否存在环路
+    :return: 排序后的节点下标
+    """
+    count = len(nodes)
+    in_degree = [0] * count
+    for i in range(count):
+        for consumer in consumers[i]:
+            in_degree[consumer] += 1
+    queue = deque(i for i in range(count) if in_degree[i] == 0)
+    order: List[int] = []
+    while queue:
+        i = queue.popleft()
+        order.append(i)
+        for consumer in consumers[i]:
+            in_degree[consumer] -= 1
+            if in_degree[consumer] == 0:
+                queue.append(consumer)
+    if len(order) != count:
+        titles = [nodes[i].node_title for i in range(count) if in_degree[i] > 0]
+        raise GraphCompileError(f'数据连接存在环路: {", ".join(titles)}')
+    return order
@@ -0,0 +1,96 @@
+"""
+按节点统计运行次数、耗时和内存分配
+"""
+from __future__ import annotations
+
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+
+class NodeStats:
+    def __init__(self, node_id: int, title: str):
+        self.node_id: int = node_id
+        self.title: str = title
+        self.calls: int = 0
+        # 命中结果缓存、没有真正运行的次数
+        self.cache_hits: int = 0
+        # 包括运行期间触发的其他节点(例如循环体、拉取的上游节点)
+        self.total_time: float = 0
+        # 只包括节点自己的代码
+        self.self_time: float = 0
+        # 节点自己的代码净分配的内存(字节)，没有开启内存统计时为0
+        self.memory: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'node_id': self.node_id, 'title': self.title, 'calls': self.calls, 'cache_hits': self.cache_hits,
+                'total_time': self.total_time, 'self_time': self.self_time, 'memory': self.memory}
+
+
+class NodeProfiler:
+    def __init__(self, track_memory: bool = False):
+        """
+        :param track_memory: 使用tracemalloc统计内存分配，会明显降低运行速度
+        """
+        self._track_memory: bool = track_memory
+        self._started_tracemalloc: bool = False
+        self._stats: Dict[int, NodeStats] = {}
+        # 正在运行的节点: [统计, 开始时间, 子节点耗时, 开始时的内存, 子节点分配的内存]
+        self._stack: List[List[Any]] = []
+
+    def start(self):
+        if self._track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __get_stats(self, node) -> NodeStats:
+        node_id = node.get_node_id()
+        stats = self._stats.get(node_id, None)
+        if stats is None:
+            stats = NodeStats(node_id, node.node_title)
+            self._stats[node_id] = stats
+        return stats
+
+    def enter(self, node):
+        memory = tracemalloc.get_traced_memory()[0] if self._started_tracemalloc else 0
+        self._stack.append([self.__get_stats(node), time.perf_counter(), 0.0, memory, 0])
+
+    def exit(self):
+        stats, start, child_time, memory, child_memory = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        allocated = tracemalloc.get_traced_memory()[0] - memory if self._started_tracemalloc else 0
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.self_time += elapsed - child_time
+        stats.memory += allocated - child_memory
+        if self._stack:
+            parent = self._stack[-1]
+            parent[2] += elapsed
+            parent[4] += allocated
+
+    def cache_hit(self, node):
+        self.__get_stats(node).cache_hits += 1
+
+    def get_stats(self) -> List[NodeStats]:
+        """
+        :return: 按自身耗时从大到小排列的统计
+        """
+        return sorted(self._stats.values(), key=lambda stats: stats.self_time, reverse=True)
+
+    def report(self, limit: int = 20) -> str:
+        """
+        生成文本表格
+        :param limit: 最多显示的节点数量
+        :return:
+        """
+        rows: List[Tuple[str, ...]] = [('节点', '调用次数', '缓存命中', '总耗时(ms)', '自身耗时(ms)', '内存(KB)')]
+        for stats in self.get_stats()[:limit]:
+            rows.append((stats.title, str(stats.calls), str(stats.cache_hits), f'{stats.total_time * 1000:.3f}',
+                         f'{stats.self_time * 1000:.3f}', f'{stats.memory / 1024:.1f}'))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return '\n'.join('  '.join(cell.ljust(widths[i]) for i, cell in enumerate(row)) for row in rows)
@@ -0,0 +1,81 @@
+"""
+记录运行的时间线，导出为Chrome trace-event格式的json，可以在Perfetto(ui.perfetto.dev)或chrome://tracing中查看
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+
+
+class TraceRecorder:
+    """
+    事件保存在固定大小的环形缓冲区中，超出容量时丢弃最早的事件，长时间运行也不会占用过多内存
+
+    节点的运行记录为完整事件(ph='X')，在节点结束时写入，丢弃旧事件不会留下不成对的开始/结束
+    """
+
+    def __init__(self, capacity: int = 100000):
+        self._events: Deque[Tuple] = deque(maxlen=capacity)
+        self._origin: float = time.perf_counter()
+        # 被丢弃的事件数量
+        self.dropped: int = 0
+        # 正在运行的节点: (节点, 开始时间)
+        self._stack: List[Tuple[Any, float]] = []
+
+    def __now(self) -> float:
+        # 微秒
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def __append(self, event: Tuple):
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+
+    def enter(self, node):
+        self._stack.append((node, self.__now()))
+
+    def exit(self):
+        node, start = self._stack.pop()
+        self.__append(('X', node.node_title, start, self.__now() - start, {'node_id': str(node.get_node_id())}))
+
+    def exec_output(self, node, port_index: int, target_count: int):
+        self.__append(('i', 'exec_output', self.__now(), 0,
+                       {'node': node.node_title, 'port': port_index, 'targets': target_count}))
+
+    def new_session(self, epoch: int):
+        # 正在运行的循环节点开启的session就是一次循环
+        node = self._stack[-1][0] if self._stack else None
+        if node is not None and node.sync_exec:
+            self.__append(('i', f'{node.node_title} 循环', self.__now(), 0, {'session': epoch}))
+        else:
+            self.__append(('i', 'session', self.__now(), 0, {'session': epoch}))
+
+    def cache_hit(self, node):
+        self.__append(('i', 'cache_hit', self.__now(), 0, {'node': node.node_title}))
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def to_json(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events: List[Dict[str, Any]] = [
+            {'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': tid, 'args': {'name': '可视化编程节点图'}},
+        ]
+        for ph, name, ts, dur, args in self._events:
+            event = {'ph': ph, 'name': name, 'ts': ts, 'pid': pid, 'tid': tid, 'args': args}
+            if ph == 'X':
+                event['dur'] = dur
+            else:
+                # 线程范围的瞬时事件
+                event['s'] = 't'
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'dropped_events': self.dropped}}
+
+    def export(self, filepath: str):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False)
@@ -3,15 +3,15 @@ QGraphicsScene的子类
 '''
 from __future__ import annotations
 
-import math
-from typing import Union, TYPE_CHECKING
+from typing import Tuple, Union, TYPE_CHECKING
 
 import PySide6.QtGui
-from PySide6.QtCore import Qt, QLine
-from PySide6.QtGui import QBrush, QColor, QPen
+from PySide6.QtCore import QLineF
+from PySide6.QtGui import QBrush, QColor, QPainter, QPen, QPixmap, QTransform
 from PySide6.QtWidgets import QGraphicsScene
 
 from editorWnd.config import EditorConfig
+from editorWnd.node_port import DETAIL_FULL
 
 if TYPE_CHECKING:
     from editorWnd.view import View
@@ -33,6 +33,11 @@ class Scene(QGraphicsScene):
         self._normal_line_pen.setWidthF(EditorConfig.EDITOR_SCENE_GRID_NORMAL_LINE_WIDTH)
         self._dark_line_pen = QPen(QColor(EditorConfig.EDITOR_SCENE_GRID_DARK_LINE_COLOR))
         self._dark_line_pen.setWidthF(EditorConfig.EDITOR_SCENE_GRID_DARK_LINE_WIDTH)
+        # 当前缩放比例下的网格图片
+        self._grid_tile: Union[QPixmap, None] = None
+        self._grid_tile_key: Union[Tuple[int, bool], None] = None
+        # 视图当前缩放比例对应的细节等级，新加入的节点和边从这里读取
+        self._detail_level: int = DETAIL_FULL
 
     def set_view(self, view: View):
         self._view = view
@@ -40,47 +45,49 @@ class Scene(QGraphicsScene):
     def get_view(self) -> View:
         return self._view
 
+    def set_detail_level(self, level: int):
+        self._detail_level = level
+
+    def get_detail_level(self) -> int:
+        return self._detail_level
+
     def drawBackground(self, painter: PySide6.QtGui.QPainter,
                        rect: Union[PySide6.QtCore.QRectF, PySide6.QtCore.QRect]) -> None:
-        super().drawBackground(painter, rect)
-        lines, dark_lines = self.calc_grid_lines(rect)
-        # 画普通的线
-        painter.setPen(self._normal_line_pen)
-        painter.drawLines(lines)
-        # 画框线
-        painter.setPen(self._dark_line_pen)
-        painter.drawLines(dark_lines)
+        # 网格每隔_chunk_size格重复一次，把一块画到图片里，再作为纹理平铺，不需要每次重绘都生成所有的线
+        scale = abs(painter.worldTransform().m11()) * painter.device().devicePixelRatioF()
+        tile, tile_size = self.__get_grid_tile(scale)
+        brush = QBrush(tile)
+        # 纹理按图片的像素平铺，缩放回场景坐标，与场景原点对齐
+        brush.setTransform(QTransform.fromScale(tile_size / tile.width(), tile_size / tile.height()))
+        painter.fillRect(rect, brush)
 
-    def calc_grid_lines(self, rect: Union[PySide6.QtCore.QRectF, PySide6.QtCore.QRect]):
+    def __get_grid_tile(self, scale: float) -> Tuple[QPixmap, int]:
         """
-        计算出所有要画的表格线
-        :param rect:
-        :return:
+        生成一块网格的图片，同一个缩放比例只生成一次
+        :param scale: 场景坐标到屏幕像素的缩放比例
+        :return: (图片, 图片对应的场景大小)
         """
-        left, right, top, bottom = math.floor(rect.left()), math.floor(rect.right()), math.floor(
-            rect.top()), math.floor(rect.bottom())
-        # 最左边的线
-        first_left = left - (left % self._grid_size)
-        # 最上边的线
-        first_top = top - (top % self._grid_size)
-
-        lines: list = []
-        dark_lines: list = []
-
-        # 画横线
-        for v in range(first_top, bottom, self._grid_size):
-            line = QLine(left, v, right, v)
-            if v % (self._grid_size * self._chunk_size) == 0:
-                dark_lines.append(line)
-            else:
-                lines.append(line)
-
-        # 画竖线
-        for h in range(first_left, right, self._grid_size):
-            line = QLine(h, top, h, bottom)
-            if h % (self._grid_size * self._chunk_size) == 0:
-                dark_lines.append(line)
-            else:
-                lines.append(line)
-
-        return lines, dark_lines
+        tile_size = self._grid_size * self._chunk_size
+        pixels = max(1, round(tile_size * scale))
+        # 缩小到细线之间不到几个像素时不画细线
+        fine = self._grid_size * scale >= EditorConfig.EDITOR_SCENE_GRID_MIN_PIXELS
+        key = (pixels, fine)
+        if self._grid_tile_key != key:
+            tile = QPixmap(pixels, pixels)
+            tile.fill(self.backgroundBrush().color())
+            painter = QPainter(tile)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.scale(pixels / tile_size, pixels / tile_size)
+            if fine:
+                steps = range(self._grid_size, tile_size, self._grid_size)
+                painter.setPen(self._normal_line_pen)
+                painter.drawLines([QLineF(v, 0, v, tile_size) for v in steps])
+                painter.drawLines([QLineF(0, v, tile_size, v) for v in steps])
+            # 框线在图片的边上，两边各画一半，平铺后拼成完整的线
+            painter.setPen(self._dark_line_pen)
+            painter.drawLines([QLineF(v, 0, v, tile_size) for v in (0, tile_size)])
+            painter.drawLines([QLineF(0, v, tile_size, v) for v in (0, tile_size)])
+            painter.end()
+            self._grid_tile = tile
+            self._grid_tile_key = key
+        return self._grid_tile, tile_size
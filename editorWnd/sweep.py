@@ -0,0 +1,295 @@
+"""
+参数扫描：把输入端口的默认值标记为扫描参数(端口控件右键菜单 -> 设为扫描参数)，
+对网格或者csv中的每一组参数运行一次节点图，结果汇总成一张表；
+标记为结果的输出端口(端口右键菜单 -> 设为结果)的值也会记录在表中，位于参数之后
+
+用法: python -m editorWnd.sweep graph.vgf --grid n=1,2,4 rate=0:1:0.25 [--workers N] [--disk-cache]
+      [-o results.csv|results.json]
+      python -m editorWnd.sweep graph.vgf --csv params.csv [--workers N] [--disk-cache] [-o results.csv]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Union
+
+from editorWnd.config import RuntimeConfig
+from editorWnd.dtypes import DTypes
+from editorWnd.env import ENV
+from editorWnd.runtime.graph import RuntimeGraph, GraphLoadError
+from editorWnd.runtime.output import OUTPUT, capture_output, setup_logging
+from editorWnd.runtime.plan import GraphCompileError
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+# 结果表中参数和结果端口之后的固定列
+RESULT_COLUMNS = ['status', 'duration', 'error', 'output']
+
+
+def parse_value(text: str, port_class: str) -> Any:
+    """
+    把网格或者csv中的文本转换为端口的类型，与端口控件的转换规则相同
+    :param text:
+    :param port_class: DTypes中的类型
+    :return:
+    """
+    if port_class == DTypes.Integer:
+        return int(text)
+    if port_class == DTypes.Float:
+        return float(text)
+    if port_class == DTypes.Boolean:
+        if text.strip().lower() in ('1', 'true', 'yes', 'y'):
+            return True
+        if text.strip().lower() in ('0', 'false', 'no', 'n', ''):
+            return False
+        raise ValueError(f'{text}不是有效的布尔值')
+    return text
+
+
+def _parse_range(text: str) -> Union[List[str], None]:
+    # start:stop[:step]，包含stop，不是数字时按普通文本处理
+    parts = text.split(':')
+    if len(parts) not in (2, 3):
+        return None
+    try:
+        start, stop = float(parts[0]), float(parts[1])
+        step = float(parts[2]) if len(parts) == 3 else 1.0
+    except ValueError:
+        return None
+    if step <= 0 or stop < start:
+        raise ValueError(f'{text}不是有效的范围，终点不能小于起点，步长必须大于0')
+    count = int((stop - start) / step + 1e-9) + 1
+    is_int = all('.' not in part and 'e' not in part.lower() for part in parts)
+    return [str(int(start + i * step)) if is_int else repr(start + i * step) for i in range(count)]
+
+
+def grid_param_sets(grid: Dict[str, str]) -> List[Dict[str, str]]:
+    """
+    :param grid: {参数名称: 取值}，取值为逗号分隔的列表(1,2,4)或者包含终点的范围(0:1:0.25)
+    :return: 所有取值组合，每一组为{参数名称: 文本}
+    """
+    names = list(grid)
+    values = [_parse_range(grid[name]) or grid[name].split(',') for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def parse_grid(items: List[str]) -> Dict[str, str]:
+    """
+    :param items: 每一项为 参数名称=取值 的文本，例如命令行的--grid参数
+    :return: grid_param_sets使用的{参数名称: 取值}
+    """
+    grid = {}
+    for item in items:
+        name, sep, values = item.partition('=')
+        if not sep or not name.strip():
+            raise ValueError(f'{item}应该为 参数名称=取值 的形式')
+        grid[name.strip()] = values.strip()
+    return grid
+
+
+def read_param_sets(filepath: str) -> List[Dict[str, str]]:
+    """
+    :param filepath: 第一行为参数名称的csv文件，每一行为一组参数
+    :return:
+    """
+    with open(filepath, 'r', newline='', encoding='utf-8') as f:
+        return [dict(row) for row in csv.DictReader(f)]
+
+
+def get_result_names(data: Dict[str, Any]) -> List[str]:
+    """
+    :param data: View.save_graph保存的数据
+    :return: 图中标记为结果的输出端口名称，即结果表中参数之后的列
+    """
+    graph = RuntimeGraph()
+    graph.load_data(data)
+    return list(graph.get_result_ports())
+
+
+def _result_value(value: Any) -> Any:
+    # 结果需要在进程间传递并写入csv或json，其他类型的值(例如数组)转换为文本
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class SweepRunner:
+    """
+    只加载和编译一次节点图，之后每组参数只修改扫描参数端口的默认值再运行
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self._graph = RuntimeGraph()
+        self._graph.load_data(data)
+        self._sweep_ports = self._graph.get_sweep_ports()
+        if not self._sweep_ports:
+            raise ValueError('图中没有扫描参数，在输入端口控件的右键菜单中设置')
+        self._result_names = list(self._graph.get_result_ports())
+        for name in self._result_names:
+            if name in self._sweep_ports or name in RESULT_COLUMNS:
+                raise ValueError(f'结果名称{name}与扫描参数或者结果表中的列重名')
+        # 提前生成执行计划，扫描参数不会被折叠为常量
+        self._graph.get_run_plan()
+
+    def get_param_names(self) -> List[str]:
+        return list(self._sweep_ports)
+
+    def get_result_names(self) -> List[str]:
+        return self._result_names
+
+    def convert(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """
+        :param params: {参数名称: 文本}
+        :return: {参数名称: 转换为端口类型的值}
+        """
+        values = {}
+        for name, text in params.items():
+            if name not in self._sweep_ports:
+                raise ValueError(f'图中没有名为{name}的扫描参数')
+            try:
+                values[name] = parse_value(text, self._sweep_ports[name][0].port_class)
+            except ValueError as e:
+                raise ValueError(f'扫描参数{name}的取值{text}无效，{e}') from e
+        return values
+
+    def run(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """
+        :param params: {参数名称: 文本}
+        :return: 结果表的一行，包含参数、结果端口的值和RESULT_COLUMNS
+        """
+        start = time.perf_counter()
+        try:
+            self._graph.set_sweep_values(self.convert(params))
+            self._graph.run()
+            status, error = STATUS_OK, ''
+        except Exception as e:
+            status, error = STATUS_FAILED, ''.join(traceback.format_exception_only(e)).strip()
+        finally:
+            OUTPUT.flush()
+        duration = time.perf_counter() - start
+        # 运行失败时结果端口保留出错前的值
+        results = {name: _result_value(value) for name, value in self._graph.get_result_values().items()}
+        return {**params, **results, 'status': status, 'duration': duration, 'error': error}
+
+
+# 工作进程中的全局状态，由_init_worker创建
+_runner: Union[SweepRunner, None] = None
+_lines: Deque[str] = deque()
+_stdout = None
+
+
+def _init_worker(data: Dict[str, Any], output_lines: int, disk_cache_size: int):
+    global _runner, _lines, _stdout
+    # spawn启动的进程不会继承主进程中修改后的设置
+    RuntimeConfig.DISK_CACHE_SIZE = disk_cache_size
+    ENV.init_node_env()
+    _lines = deque(maxlen=output_lines)
+    _stdout = capture_output(_lines)
+    _runner = SweepRunner(data)
+
+
+def _run_in_worker(params: Dict[str, str]) -> Dict[str, Any]:
+    _lines.clear()
+    row = _runner.run(params)
+    _stdout.finish()
+    row['output'] = '\n'.join(_lines)
+    return row
+
+
+def run_sweep(data: Dict[str, Any], param_sets: List[Dict[str, str]], workers: int,
+              output_lines: int = 100) -> Iterator[Dict[str, Any]]:
+    """
+    在多个进程中运行所有参数组合，每个进程只编译一次节点图
+    :param data: View.save_graph保存的数据
+    :param param_sets: grid_param_sets或者read_param_sets的结果
+    :param workers: 进程数
+    :param output_lines: 每次运行最多保留的输出行数
+    :return: 按param_sets的顺序逐个产生结果行
+    """
+    # 先在当前进程中检查参数名称和取值，避免在每个工作进程中重复报错
+    runner = SweepRunner(data)
+    for params in param_sets:
+        runner.convert(params)
+    workers = max(1, min(workers, len(param_sets)))
+    # 与parallel.create_pool相同，统一使用spawn
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, context, initializer=_init_worker,
+                             initargs=(data, output_lines, RuntimeConfig.DISK_CACHE_SIZE)) as pool:
+        # 每个任务只运行一次图，成批发送以减少进程间通信
+        chunksize = max(1, len(param_sets) // (workers * 4))
+        yield from pool.map(_run_in_worker, param_sets, chunksize=chunksize)
+
+
+def write_results(filepath: str, rows: List[Dict[str, Any]], param_names: List[str],
+                  result_names: Union[List[str], None] = None):
+    """
+    :param filepath: .json保存为列表，其他扩展名保存为csv表格
+    :param rows: run_sweep的结果
+    :param param_names: 参数列，位于结果列之前
+    :param result_names: 结果端口列，位于参数列之后，参考get_result_names
+    :return:
+    """
+    if os.path.splitext(filepath)[1].lower() == '.json':
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, param_names + (result_names or []) + RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description='对多组参数运行同一个节点图，结果汇总成表格')
+    parser.add_argument('file', help='.vgf文件路径')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--grid', nargs='+', metavar='NAME=VALUES',
+                       help='参数网格，取值为逗号分隔的列表(1,2,4)或者包含终点的范围(0:1:0.25)，运行所有组合')
+    group.add_argument('--csv', help='参数表，第一行为参数名称，每一行运行一次')
+    parser.add_argument('--workers', '-j', type=int, default=os.cpu_count() or 1, help='进程数，默认为CPU核心数')
+    parser.add_argument('--output-lines', type=int, default=100, help='每次运行最多保留的输出行数(保留最后的部分)')
+    parser.add_argument('--disk-cache', action='store_true',
+                        help='启用纯数据子图结果的磁盘缓存，大小上限为RuntimeConfig.DISK_CACHE_DEFAULT_SIZE')
+    parser.add_argument('-o', '--output', default='', help='结果保存为csv或者json文件，默认以csv格式输出到标准输出')
+    args = parser.parse_args(argv)
+    setup_logging()
+    if args.disk_cache:
+        RuntimeConfig.DISK_CACHE_SIZE = RuntimeConfig.DISK_CACHE_DEFAULT_SIZE
+    try:
+        with open(args.file, 'r') as f:
+            data = json.loads(f.read())
+        if args.grid:
+            param_sets = grid_param_sets(parse_grid(args.grid))
+        else:
+            param_sets = read_param_sets(args.csv)
+        param_names = list(param_sets[0]) if param_sets else []
+        result_names = get_result_names(data)
+        rows = []
+        for row in run_sweep(data, param_sets, args.workers, args.output_lines):
+            rows.append(row)
+            print(f'运行时: [{len(rows)}/{len(param_sets)}] {row["status"]} '
+                  f'{", ".join(f"{name}={row[name]}" for name in param_names)} {row["duration"]:.3f}s', file=sys.stderr)
+    except (OSError, ValueError, GraphLoadError, GraphCompileError) as e:
+        print(f'运行时: 参数扫描失败，{e}', file=sys.stderr)
+        return 1
+    if args.output:
+        write_results(args.output, rows, param_names, result_names)
+        print(f'运行时: 结果保存成功 -> {args.output}', file=sys.stderr)
+    else:
+        writer = csv.DictWriter(sys.stdout, param_names + result_names + RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return 0 if all(row['status'] == STATUS_OK for row in rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,19 +4,33 @@ QGraphicsView的子类，是scene的容器
 from __future__ import annotations
 
 import json
+import os
 from typing import TYPE_CHECKING, Union, List, Tuple, Dict, Any, Type
 
 import PySide6.QtWidgets
-from PySide6.QtCore import Qt, QEvent, QPoint, QPointF
+from PySide6.QtCore import Qt, QEvent, QPoint, QPointF, QTimer, Signal
 from PySide6.QtGui import QPainter, QMouseEvent
 from PySide6.QtWidgets import QGraphicsView, QApplication, QGraphicsProxyWidget, QGraphicsItem
 
 from editorWnd.edge import NodeEdge, DraggingEdge, CuttingLine
+from editorWnd.config import EditorConfig, RuntimeConfig
 from editorWnd.env import ENV
 from editorWnd.group import NodeGroup
 from editorWnd.node import GraphicNode, Node
-from editorWnd.node_port import NodePort
+from editorWnd.node_port import NodePort, OutputPort, ParamPort, get_detail_level
 from editorWnd.nodes.ActionNode import BeginNode
+from editorWnd.runner import GraphRunThread, GraphSweepThread
+from editorWnd.runtime.cache import LRUCache
+from editorWnd.runtime.codegen import CodegenError, generate_code
+from editorWnd.runtime.disk_cache import get_disk_cache
+from editorWnd.runtime.executor import GraphExecutor
+from editorWnd.runtime.graph import RuntimeGraph, GraphLoadError
+from editorWnd.runtime.optimize import optimize_plan
+from editorWnd.runtime.output import logger
+from editorWnd.runtime.plan import ExecutionPlan, GraphCompileError, compile_graph
+from editorWnd.runtime.profiler import NodeProfiler
+from editorWnd.runtime.trace import TraceRecorder
+from editorWnd.sweep import STATUS_OK, get_result_names, write_results
 from editorWnd.widgets import NodeListWidget
 
 if TYPE_CHECKING:
@@ -24,6 +38,13 @@ if TYPE_CHECKING:
 
 
 class View(QGraphicsView):
+    # 后台运行开始/结束
+    run_state_changed = Signal(bool)
+    # 性能分析结果更新，参数为NodeStats.to_dict()的列表
+    profile_updated = Signal(object)
+    # 参数扫描完成一组参数，参数为目前为止的结果行列表
+    sweep_updated = Signal(object)
+
     def __init__(self, scene: Scene, parent=None):
         super().__init__(parent)
         self._scene: Scene = scene
@@ -40,7 +61,7 @@ class View(QGraphicsView):
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         # 缩放
-        self._zoom_clamp: List[float] = [0.5, 5]
+        self._zoom_clamp: List[float] = [EditorConfig.EDITOR_VIEW_MIN_SCALE, EditorConfig.EDITOR_VIEW_MAX_SCALE]
         self._zoom_factor: float = 1.05
         self._last_scale: float = 1
         self._view_scale: float = 1.0
@@ -67,6 +88,37 @@ class View(QGraphicsView):
         self._begin_node: Union[BeginNode, None] = None
         # 当前graph保存的路径
         self._saved_path: str = ''
+        # 编译好的执行计划，图被编辑后失效
+        self._plan: Union[ExecutionPlan, None] = None
+        # 优化后用于运行的计划，图或者端口的默认值被修改后重新生成
+        self._run_plan: Union[ExecutionPlan, None] = None
+        # 正在运行的执行器
+        self._executor: Union[GraphExecutor, None] = None
+        # 纯数据节点的结果缓存，与执行计划一起失效
+        self._memo_cache: LRUCache = LRUCache(RuntimeConfig.MEMO_CACHE_SIZE)
+        # 实时计算：修改端口的值后只重新计算受影响的纯数据节点，并显示输出的值
+        self._live_evaluate: bool = False
+        self._live_executor: Union[GraphExecutor, None] = None
+        self._live_dirty_nodes: List[Node] = []
+        self._live_timer = QTimer(self)
+        self._live_timer.setSingleShot(True)
+        self._live_timer.setInterval(0)
+        self._live_timer.timeout.connect(self.__refresh_live_values)
+        # 后台运行使用的图副本，图被编辑后重新生成，没有编辑时复用其中编译好的计划和结果缓存
+        self._runtime_graph: Union[RuntimeGraph, None] = None
+        # 后台运行的线程(包括参数扫描)，以及是否正在显示运行结果
+        self._run_thread: Union[GraphRunThread, GraphSweepThread, None] = None
+        self._showing_run_values: bool = False
+        # 性能分析模式，以及最近一次分析的结果
+        self._profile: bool = False
+        self._profile_stats: List[Dict[str, Any]] = []
+        # 记录运行轨迹，以及最近一次运行的轨迹
+        self._trace: bool = False
+        self._last_trace: Union[TraceRecorder, None] = None
+        # 最近一次参数扫描的参数名称和结果行
+        self._sweep_param_names: List[str] = []
+        self._sweep_result_names: List[str] = []
+        self._sweep_rows: List[Dict[str, Any]] = []
 
     def get_nodes(self) -> List[Union[GraphicNode, Node]]:
         return self._nodes
@@ -113,7 +165,11 @@ class View(QGraphicsView):
     def __hide_node_list_widget(self):
         self.node_list_widget.setVisible(False)
 
-    def save_graph(self, filepath: str = 'graph.json'):
+    def to_graph_data(self) -> Dict[str, Any]:
+        """
+        把当前graph转换为可以保存的数据，后台运行时也使用这份数据
+        :return:
+        """
         data: Dict[str, Any] = {'graph_name': '', 'time': '', 'nodes': [], 'edges': [], 'groups': []}
         # node
         for node in self._nodes:
@@ -124,11 +180,31 @@ class View(QGraphicsView):
         # group
         for group in self._groups:
             data['groups'].append(group.to_string())
-        json_str = json.dumps(data)
+        return data
+
+    def save_graph(self, filepath: str = 'graph.json'):
+        json_str = json.dumps(self.to_graph_data())
         with open(filepath, 'w') as f:
             f.write(json_str)
         self.set_saved_path(filepath)
-        print('视图: 数据保存成功 ->', filepath)
+        logger.info('视图: 数据保存成功 -> %s', filepath)
+
+    def export_code(self, filepath: str):
+        """
+        把当前graph翻译成Python代码，生成的代码不依赖编辑器运行
+        :param filepath: .py文件路径
+        :return:
+        """
+        graph = RuntimeGraph()
+        try:
+            graph.load_data(self.to_graph_data())
+            code = generate_code(graph.get_execution_plan(), os.path.basename(self.get_saved_path()))
+        except (GraphCompileError, CodegenError) as e:
+            logger.warning('视图: 代码生成失败，%s', e)
+            return
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(code)
+        logger.info('视图: 代码导出成功 -> %s', filepath)
 
     def __clear_graph(self):
         self._session_id = 0
@@ -168,6 +244,10 @@ class View(QGraphicsView):
             for index, value in port_value.items():
                 port = node_obj.get_input_port(int(index))
                 port.set_widget_value(value)
+            for index, name in node.get('sweep_params', {}).items():
+                node_obj.get_input_port(int(index)).set_sweep_name(name)
+            for index, name in node.get('result_ports', {}).items():
+                node_obj.get_output_port(int(index)).set_result_name(name)
 
         edge_id_obj = {}
         for edge in edges:
@@ -189,7 +269,7 @@ class View(QGraphicsView):
 
         self.set_saved_path(filepath)
 
-        print('视图: 数据加载成功 ->', filepath)
+        logger.info('视图: 数据加载成功 -> %s', filepath)
 
     def __add_node_with_cls(self, cls: Type[Union[GraphicNode, Node]], pos: Tuple[float, float]) -> Union[
         GraphicNode, Node]:
@@ -197,20 +277,364 @@ class View(QGraphicsView):
         self.add_node(node, pos)
         return node
 
-    def run_graph(self):
+    def run_graph(self, profiler: Union[NodeProfiler, None] = None, tracer: Union[TraceRecorder, None] = None):
+        """
+        在当前线程中运行图
+        :param profiler: 设置后统计每个节点的耗时
+        :param tracer: 设置后记录运行的时间线
+        :return:
+        """
         # 找到开始运行节点，如果没有则提示
         if not self.__has_begin_node:
-            print('视图: 需要一个【开始运行】节点来运行')
+            logger.warning('视图: 需要一个【开始运行】节点来运行')
             return
-        self.new_session()
-        # 找到开始运行节点并开始运行
-        self._begin_node.run_node()
+        plan = self.get_run_plan()
+        if plan is None:
+            return
+        # 从开始运行节点开始运行
+        self._executor = GraphExecutor(plan, self._memo_cache, profiler=profiler, tracer=tracer)
+        if profiler is not None:
+            profiler.start()
+        try:
+            self._executor.run()
+        finally:
+            self._executor = None
+            if profiler is not None:
+                profiler.stop()
+                self.__profile_ready([stats.to_dict() for stats in profiler.get_stats()])
+
+    # ================================================  后台运行  ======================================================
+    def start_run(self) -> bool:
+        """
+        在后台线程中运行图的副本，运行期间可以继续编辑，编辑不影响本次运行
+        :return: 是否开始运行
+        """
+        if self._run_thread is not None:
+            logger.warning('视图: 图正在运行中')
+            return False
+        if not self.__has_begin_node:
+            logger.warning('视图: 需要一个【开始运行】节点来运行')
+            return False
+        try:
+            graph = self.get_runtime_graph()
+        except GraphLoadError as e:
+            logger.warning('视图: 运行失败，%s', e)
+            return False
+        self._run_thread = GraphRunThread(graph, self._profile, self._trace, self)
+        self._run_thread.run_succeeded.connect(self.__run_succeeded)
+        self._run_thread.profile_ready.connect(self.__profile_ready)
+        self._run_thread.trace_ready.connect(self.__trace_ready)
+        self._run_thread.run_failed.connect(self.__run_failed)
+        self._run_thread.finished.connect(self.__run_thread_finished)
+        self._run_thread.start()
+        self.run_state_changed.emit(True)
+        return True
 
-    def new_session(self):
-        self._session_id += 1
-        # 刷新所有节点的状态
+    def cancel_run(self, wait: bool = False):
+        """
+        停止后台运行
+        :param wait: 是否等待线程结束(关闭窗口时使用)
+        :return:
+        """
+        if self._run_thread is None:
+            return
+        self._run_thread.cancel()
+        if wait:
+            self._run_thread.wait()
+
+    def is_running(self) -> bool:
+        return self._run_thread is not None
+
+    def get_executed_count(self) -> int:
+        return self._run_thread.get_executed_count() if self._run_thread is not None else 0
+
+    def __run_succeeded(self, values: Dict[int, Dict[int, Any]]):
+        # 运行期间节点可能已经被删除，只显示仍然存在的节点
+        node_id_obj = {node.get_node_id(): node for node in self._nodes}
+        for node_id, outputs in values.items():
+            node = node_id_obj.get(node_id, None)
+            if node is None:
+                continue
+            for port_index, value in outputs.items():
+                port = node.get_output_port(port_index)
+                if isinstance(port, OutputPort):
+                    port.show_value(value)
+                    self._showing_run_values = True
+        logger.info('视图: 运行结束')
+
+    def __run_failed(self, message: str):
+        logger.warning('视图: 运行失败，%s', message)
+
+    def start_sweep(self, param_sets: List[Dict[str, str]]) -> bool:
+        """
+        在工作进程中对每组参数运行一次图的副本，结果逐行通过sweep_updated发出
+        :param param_sets: {扫描参数名称: 文本}的列表，参考sweep.read_param_sets
+        :return: 是否开始扫描
+        """
+        if self._run_thread is not None:
+            logger.warning('视图: 图正在运行中')
+            return False
+        if not self.__has_begin_node:
+            logger.warning('视图: 需要一个【开始运行】节点来运行')
+            return False
+        if not param_sets:
+            logger.warning('视图: 没有需要扫描的参数组')
+            return False
+        data = self.to_graph_data()
+        self._sweep_param_names = list(param_sets[0])
+        self._sweep_result_names = get_result_names(data)
+        self._sweep_rows = []
+        workers = RuntimeConfig.SWEEP_WORKERS or os.cpu_count() or 1
+        self._run_thread = GraphSweepThread(data, param_sets, workers, self)
+        self._run_thread.row_ready.connect(self.__sweep_row_ready)
+        self._run_thread.sweep_failed.connect(self.__sweep_failed)
+        self._run_thread.finished.connect(self.__run_thread_finished)
+        self._run_thread.start()
+        self.run_state_changed.emit(True)
+        self.sweep_updated.emit(self._sweep_rows)
+        return True
+
+    def is_sweeping(self) -> bool:
+        return isinstance(self._run_thread, GraphSweepThread)
+
+    def get_sweep_progress(self) -> Tuple[int, int]:
+        """
+        :return: (已完成的参数组数, 参数组总数)
+        """
+        if not self.is_sweeping():
+            return 0, 0
+        return self._run_thread.get_executed_count(), self._run_thread.get_total_count()
+
+    def get_sweep_param_names(self) -> List[str]:
+        return self._sweep_param_names
+
+    def get_sweep_result_names(self) -> List[str]:
+        return self._sweep_result_names
+
+    def get_sweep_port_names(self) -> List[str]:
+        """
+        :return: 图中标记的扫描参数名称，不重复
+        """
+        names: List[str] = []
+        for node in self._nodes:
+            for port in node.in_ports:
+                if isinstance(port, ParamPort) and port.get_sweep_name() and port.get_sweep_name() not in names:
+                    names.append(port.get_sweep_name())
+        return names
+
+    def get_sweep_rows(self) -> List[Dict[str, Any]]:
+        return self._sweep_rows
+
+    def export_sweep(self, filepath: str) -> bool:
+        """
+        把最近一次参数扫描的结果保存为csv或者json
+        :param filepath:
+        :return: 是否保存成功
+        """
+        if not self._sweep_rows:
+            logger.warning('视图: 还没有参数扫描的结果')
+            return False
+        write_results(filepath, self._sweep_rows, self._sweep_param_names, self._sweep_result_names)
+        logger.info('视图: 参数扫描结果保存成功 -> %s', filepath)
+        return True
+
+    def __sweep_row_ready(self, row: Dict[str, Any]):
+        self._sweep_rows.append(row)
+        self.sweep_updated.emit(self._sweep_rows)
+        if len(self._sweep_rows) == self._run_thread.get_total_count():
+            failed = sum(1 for item in self._sweep_rows if item['status'] != STATUS_OK)
+            logger.info('视图: 参数扫描结束，共%d组，失败%d组', len(self._sweep_rows), failed)
+
+    def __sweep_failed(self, message: str):
+        logger.warning('视图: 参数扫描失败，%s', message)
+
+    def __run_thread_finished(self):
+        self._run_thread.deleteLater()
+        self._run_thread = None
+        self.run_state_changed.emit(False)
+
+    def set_profile(self, enabled: bool):
+        self._profile = enabled
+        if not enabled:
+            for node in self._nodes:
+                node.set_heat(None)
+
+    def is_profile(self) -> bool:
+        return self._profile
+
+    def get_profile_stats(self) -> List[Dict[str, Any]]:
+        return self._profile_stats
+
+    def __profile_ready(self, stats: List[Dict[str, Any]]):
+        self._profile_stats = stats
+        # 按自身耗时给标题栏着色，最耗时的节点颜色最深
+        self_times = {item['node_id']: item['self_time'] for item in stats}
+        max_time = max(self_times.values(), default=0)
         for node in self._nodes:
-            node.new_session(self._session_id)
+            self_time = self_times.get(node.get_node_id(), None)
+            node.set_heat(None if self_time is None or max_time <= 0 else self_time / max_time)
+        self.profile_updated.emit(stats)
+
+    def set_trace(self, enabled: bool):
+        self._trace = enabled
+
+    def is_trace(self) -> bool:
+        return self._trace
+
+    def has_trace(self) -> bool:
+        return self._last_trace is not None
+
+    def __trace_ready(self, tracer: TraceRecorder):
+        self._last_trace = tracer
+
+    def export_trace(self, filepath: str) -> bool:
+        """
+        把最近一次运行的轨迹保存为Chrome trace-event格式的json
+        :param filepath:
+        :return: 是否保存成功
+        """
+        if self._last_trace is None:
+            logger.warning('视图: 还没有记录运行轨迹')
+            return False
+        self._last_trace.export(filepath)
+        logger.info('视图: 运行轨迹保存成功 -> %s', filepath)
+        return True
+
+    def center_on_node(self, node_id: int):
+        for node in self._nodes:
+            if node.get_node_id() == node_id:
+                self.unselected_selected_items()
+                node.setSelected(True)
+                self.centerOn(node)
+                return
+
+    def __hide_output_values(self):
+        for node in self._nodes:
+            for port in node.out_ports:
+                if isinstance(port, OutputPort):
+                    port.hide_value()
+        self._showing_run_values = False
+
+    # ==================================================================================================================
+
+    def get_execution_plan(self) -> Union[ExecutionPlan, None]:
+        """
+        获取执行计划，图没有被编辑过时直接复用上一次编译的结果
+        :return:
+        """
+        if self._plan is None:
+            try:
+                self._plan = compile_graph(self._nodes, self._begin_node)
+            except GraphCompileError as e:
+                logger.warning('视图: 编译失败，%s', e)
+                return None
+        return self._plan
+
+    def get_run_plan(self) -> Union[ExecutionPlan, None]:
+        if self._run_plan is None:
+            plan = self.get_execution_plan()
+            if plan is None:
+                return None
+            self._run_plan = optimize_plan(plan) if RuntimeConfig.OPTIMIZE_PLAN else plan
+        return self._run_plan
+
+    def get_memo_cache(self) -> LRUCache:
+        return self._memo_cache
+
+    def get_runtime_graph(self) -> RuntimeGraph:
+        """
+        获取后台运行使用的图副本，图没有被编辑过时直接复用，其中的执行计划、折叠的常量和结果缓存都保留
+        节点对象也会复用，节点在运行中修改的状态由Node.run_finished恢复
+        :return:
+        """
+        if self._runtime_graph is None:
+            graph = RuntimeGraph()
+            graph.load_data(self.to_graph_data())
+            self._runtime_graph = graph
+        return self._runtime_graph
+
+    def update_disk_cache(self):
+        """
+        RuntimeConfig中的磁盘缓存设置被修改后调用，之后的运行按新的设置使用磁盘缓存
+        :return:
+        """
+        if self._runtime_graph is None:
+            return
+        if self._run_thread is not None:
+            # 运行中的副本不能修改，下一次运行时重新生成
+            self._runtime_graph = None
+        else:
+            self._runtime_graph.set_disk_cache(get_disk_cache())
+
+    def invalidate_plan(self):
+        self._plan = None
+        self._run_plan = None
+        self._memo_cache.clear()
+        # 正在运行的线程仍然使用原来的副本，编辑不影响本次运行
+        self._runtime_graph = None
+        if self._live_evaluate:
+            self._live_executor = None
+            self._live_timer.start()
+        elif self._showing_run_values:
+            # 图已经被编辑，上一次运行的结果不再对应当前的图
+            self.__hide_output_values()
+
+    # ================================================  实时计算  ======================================================
+    def set_live_evaluate(self, enabled: bool):
+        self._live_evaluate = enabled
+        self._live_executor = None
+        self._live_dirty_nodes.clear()
+        if enabled:
+            self._live_timer.start()
+        else:
+            self.__hide_output_values()
+
+    def is_live_evaluate(self) -> bool:
+        return self._live_evaluate
+
+    def port_value_changed(self, node: Node):
+        # 折叠的常量可能依赖被修改的默认值
+        self._run_plan = None
+        if self._runtime_graph is not None:
+            if self._run_thread is not None:
+                # 运行中的副本不能修改，下一次运行时重新生成
+                self._runtime_graph = None
+            else:
+                self._runtime_graph.set_port_values(node.get_node_id(), {
+                    index: port.get_default_value() for index, port in enumerate(node.in_ports)})
+        if not self._live_evaluate:
+            return
+        # 合并同一时间内的多次修改，在下一次事件循环中统一计算
+        self._live_dirty_nodes.append(node)
+        self._live_timer.start()
+
+    def __refresh_live_values(self):
+        plan = self.get_execution_plan()
+        if plan is None:
+            return
+        if self._live_executor is None:
+            self._live_executor = GraphExecutor(plan, self._memo_cache)
+            self._live_executor.new_session()
+            indices = plan.topo_order
+        else:
+            indices = self._live_executor.invalidate(
+                [plan.node_index[id(node)] for node in self._live_dirty_nodes if id(node) in plan.node_index])
+        self._live_dirty_nodes.clear()
+        self._live_executor.evaluate(indices)
+        for index in indices:
+            for port_index, port in enumerate(plan.nodes[index].out_ports):
+                if isinstance(port, OutputPort):
+                    port.show_value(self._live_executor.get_output_value(index, port_index))
+    # ==================================================================================================================
+
+    def new_session(self):
+        """
+        开启新的session，只增加计数，端口和执行器在读取时才比较session是否过期，与图的大小无关
+        :return:
+        """
+        self._session_id = NodePort.start_new_session()
+        if self._executor is not None:
+            self._executor.new_session()
 
     def stringfy_items(self, items: List[QGraphicsItem]) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -259,6 +683,10 @@ class View(QGraphicsView):
             for index, value in port_value.items():
                 port = node_obj.get_input_port(int(index))
                 port.set_widget_value(value)
+            for index, name in node.get('sweep_params', {}).items():
+                node_obj.get_input_port(int(index)).set_sweep_name(name)
+            for index, name in node.get('result_ports', {}).items():
+                node_obj.get_output_port(int(index)).set_result_name(name)
 
         for edge in edges:
             source_node = node_id_obj.get(edge['source_node_id'], None)
@@ -399,6 +827,7 @@ class View(QGraphicsView):
                 edge = self._dragging_edge.create_node_edge()
                 if edge is not None:
                     self._edges.append(edge)
+                    self.invalidate_plan()
             # 删除当前连接线
             self._scene.removeItem(self._dragging_edge)
             self._dragging_edge = None
@@ -459,6 +888,28 @@ class View(QGraphicsView):
         self.resetTransform()
         self._view_scale = 1.0
 
+    def scale(self, sx: float, sy: float):
+        super().scale(sx, sy)
+        self.__update_detail_level()
+
+    def resetTransform(self):
+        super().resetTransform()
+        self.__update_detail_level()
+
+    def __update_detail_level(self):
+        """
+        缩放后计算细节等级，跨过等级时通知所有的节点和边，paint中只读取等级
+        :return:
+        """
+        level = get_detail_level(self.transform())
+        if level == self._scene.get_detail_level():
+            return
+        self._scene.set_detail_level(level)
+        for node in self._nodes:
+            node.set_detail_level(level)
+        for edge in self._edges:
+            edge.set_detail_level(level)
+
     def add_node(self, node: GraphicNode, pos: Tuple[float, float] = (0, 0)):
         """
         添加节点
@@ -466,7 +917,7 @@ class View(QGraphicsView):
         """
         if isinstance(node, BeginNode):
             if self.__has_begin_node:
-                print('视图: 添加节点失败，【开始运行】节点已经存在了')
+                logger.warning('视图: 添加节点失败，【开始运行】节点已经存在了')
                 return
             self.__has_begin_node = True
             self._begin_node = node
@@ -474,20 +925,24 @@ class View(QGraphicsView):
         node.set_scene(self._scene)
         self._scene.addItem(node)
         self._nodes.append(node)
+        self.invalidate_plan()
 
     def add_node_edge(self, src_port: NodePort = None, dest_port: NodePort = None) -> NodeEdge:
         edge = NodeEdge(self._scene, src_port, dest_port)
         self._edges.append(edge)
+        self.invalidate_plan()
         return edge
 
     def readd_edge(self, edge: NodeEdge):
         edge.add_to_scene()
         self._edges.append(edge)
+        self.invalidate_plan()
         self._scene.update()
 
     def remove_edge(self, edge: NodeEdge):
         if edge in self._edges:
             self._edges.remove(edge)
+            self.invalidate_plan()
 
     def remove_node(self, node: GraphicNode):
         if node in self._nodes:
@@ -495,6 +950,7 @@ class View(QGraphicsView):
                 self.__has_begin_node = False
                 self._begin_node = None
             self._nodes.remove(node)
+            self.invalidate_plan()
 
     # ==================================================  组操作  =======================================================
     def add_node_group(self, items: List[QGraphicsItem] = None, title: str = '节点组') -> NodeGroup:
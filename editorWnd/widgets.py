@@ -1,5 +1,14 @@
-from PySide6.QtWidgets import QTreeWidget, QTreeWidgetItem
-from PySide6.QtCore import Qt
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Union
+
+from PySide6.QtWidgets import QTreeWidget, QTreeWidgetItem, QTableWidget, QTableWidgetItem, QAbstractItemView, \
+    QPlainTextEdit
+from PySide6.QtCore import Qt, Signal, QTimer
+
+from editorWnd.config import EditorConfig
+from editorWnd.runtime.output import OUTPUT
 
 
 class NodeListWidget(QTreeWidget):
@@ -29,8 +38,151 @@ class NodeListWidget(QTreeWidget):
             for node_title in self.data[pkg_name].keys():
                 node_item = QTreeWidgetItem([node_title])
                 node_item.setData(0, Qt.ItemDataRole.UserRole, self.data[pkg_name][node_title])
-                node_item.setToolTip(0, self.data[pkg_name][node_title]().node_description)
+                # 描述是类属性，不需要创建节点(创建的节点和控件会留给垃圾回收，可能在后台线程中被销毁)
+                node_item.setToolTip(0, self.data[pkg_name][node_title].node_description)
                 item.addChild(node_item)
             items.append(item)
         self.insertTopLevelItems(0, items)
         self.sortItems(0, Qt.SortOrder.AscendingOrder)
+
+
+class ProfileWidget(QTableWidget):
+    # 双击一行时发出，参数为节点id
+    node_activated = Signal(object)
+
+    COLUMNS = ['节点', '调用次数', '缓存命中', '总耗时(ms)', '自身耗时(ms)', '内存(KB)']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setColumnCount(len(self.COLUMNS))
+        self.setHorizontalHeaderLabels(self.COLUMNS)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.verticalHeader().setVisible(False)
+        self.setSortingEnabled(True)
+        self.itemDoubleClicked.connect(self.__item_double_clicked)
+
+    def set_stats(self, stats: List[Dict[str, Any]]):
+        """
+        :param stats: NodeStats.to_dict()的列表
+        :return:
+        """
+        # 插入数据时关闭排序，否则每插入一格都会重新排序
+        self.setSortingEnabled(False)
+        self.setRowCount(len(stats))
+        for row, item in enumerate(stats):
+            values = [item['title'], item['calls'], item['cache_hits'], round(item['total_time'] * 1000, 3),
+                      round(item['self_time'] * 1000, 3), round(item['memory'] / 1024, 1)]
+            for column, value in enumerate(values):
+                cell = QTableWidgetItem()
+                # 数字按数值排序而不是按文本排序
+                cell.setData(Qt.ItemDataRole.DisplayRole, value)
+                # 节点id超过了Qt整数的范围，保存为字符串
+                cell.setData(Qt.ItemDataRole.UserRole, str(item['node_id']))
+                self.setItem(row, column, cell)
+        self.setSortingEnabled(True)
+        self.sortItems(4, Qt.SortOrder.DescendingOrder)
+        self.resizeColumnsToContents()
+
+    def __item_double_clicked(self, item: QTableWidgetItem):
+        self.node_activated.emit(int(item.data(Qt.ItemDataRole.UserRole)))
+
+
+class SweepWidget(QTableWidget):
+    """
+    参数扫描的结果表，每组参数一行
+    """
+    RESULT_COLUMNS = ['状态', '耗时(ms)', '错误', '输出']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self._columns: List[str] = []
+        self._rows: List[Dict[str, Any]] = []
+
+    def set_rows(self, param_names: List[str], rows: List[Dict[str, Any]],
+                 result_names: Union[List[str], None] = None):
+        """
+        :param param_names: 参数列
+        :param rows: View.get_sweep_rows()，同一次扫描的结果只添加新增的行
+        :param result_names: 结果端口列，位于参数列之后
+        :return:
+        """
+        columns = param_names + (result_names or [])
+        if rows is not self._rows or columns != self._columns:
+            self._columns, self._rows = columns, rows
+            self.setRowCount(0)
+            self.setColumnCount(len(columns) + len(self.RESULT_COLUMNS))
+            self.setHorizontalHeaderLabels(columns + self.RESULT_COLUMNS)
+        start = self.rowCount()
+        self.setRowCount(len(rows))
+        for row in range(start, len(rows)):
+            item = rows[row]
+            values = [item.get(name, None) for name in columns] + [item['status'], round(item['duration'] * 1000, 3),
+                                                                   item['error'], item.get('output', '')]
+            for column, value in enumerate(values):
+                cell = QTableWidgetItem()
+                cell.setData(Qt.ItemDataRole.DisplayRole, value)
+                self.setItem(row, column, cell)
+        if start == 0:
+            self.resizeColumnsToContents()
+
+
+class ConsoleWidget(QPlainTextEdit):
+    """
+    输出面板，打印节点的输出和诊断信息可以在任意线程中加入，界面线程定时把积累的行一次性显示
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        # 超出的行从开头丢弃，长时间运行时内存和刷新耗时都不会一直增长
+        self.setMaximumBlockCount(EditorConfig.CONSOLE_MAX_LINES)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        # 两次刷新之间超出显示上限的行反正会被丢弃，不需要保留
+        self._pending: Deque[str] = deque(maxlen=EditorConfig.CONSOLE_MAX_LINES)
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.setInterval(EditorConfig.CONSOLE_REFRESH_INTERVAL)
+        self._timer.timeout.connect(self.__refresh)
+        self._timer.start()
+        self._log_handler = _ConsoleLogHandler(self)
+
+    def append_lines(self, lines: List[str]):
+        """
+        可以在后台线程中调用
+        :param lines: 要显示的行
+        :return:
+        """
+        with self._lock:
+            self._pending.extend(lines)
+
+    def get_log_handler(self) -> logging.Handler:
+        """
+        :return: 把诊断信息显示在面板中的logging处理器
+        """
+        return self._log_handler
+
+    def __refresh(self):
+        with self._lock:
+            if not self._pending:
+                return
+            lines = list(self._pending)
+            self._pending.clear()
+        self.appendPlainText('\n'.join(lines))
+
+
+class _ConsoleLogHandler(logging.Handler):
+    def __init__(self, console: ConsoleWidget):
+        super().__init__()
+        self.setFormatter(logging.Formatter('%(message)s'))
+        self._console = console
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            # 先显示缓冲区中更早打印的内容，保持输出的顺序
+            OUTPUT.flush()
+            self._console.append_lines([self.format(record)])
+        except Exception:
+            self.handleError(record)
@@ -0,0 +1,89 @@
+"""
+可跳出的For循环在多次运行之间复用节点对象时的回归测试
+
+运行: python -m unittest discover tests
+"""
+import json
+import os
+import tempfile
+import unittest
+from typing import Any, Dict, List
+
+from benchmarks.generators import GraphBuilder
+from editorWnd.env import ENV
+from editorWnd.runtime.graph import RuntimeGraph
+from editorWnd.runtime.output import OUTPUT
+from editorWnd.sweep import run_sweep
+
+
+def break_graph() -> Dict[str, Any]:
+    """
+    开始运行 -> For循环(可跳出, 0..5) -> 打印索引 -> 分支(索引 > thr)，为真时连接到循环的跳出端口
+    :return: 与View.save_graph相同格式的数据，thr为扫描参数，默认值为1
+    """
+    builder = GraphBuilder()
+    begin = builder.add('BeginNode')
+    loop = builder.add('ForLoopWithBreakNode', None, 0, 5, 1)
+    print_node = builder.add('PrintNode')
+    greater = builder.add('GreaterNode', None, 1)
+    branch = builder.add('BranchNode')
+    builder.link(begin, 0, loop, 0)
+    builder.link(loop, 0, print_node, 0)
+    builder.link(loop, 1, print_node, 1)
+    builder.link(loop, 1, greater, 0)
+    builder.link(print_node, 0, branch, 0)
+    builder.link(greater, 0, branch, 1)
+    builder.link(branch, 0, loop, 4)
+    data = builder.to_data()
+    data['nodes'][greater - 1]['sweep_params'] = {'1': 'thr'}
+    return data
+
+
+class LoopBreakTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        ENV.init_node_env()
+
+    def run_twice(self, graph: RuntimeGraph):
+        lines: List[str] = []
+        OUTPUT.set_sink(lines.extend)
+        try:
+            for _ in range(2):
+                lines.clear()
+                graph.run()
+                OUTPUT.flush()
+                self.assertEqual(lines, ['0', '1', '2'])
+        finally:
+            OUTPUT.set_sink(None)
+
+    def test_run_twice(self):
+        graph = RuntimeGraph()
+        graph.load_data(break_graph())
+        self.run_twice(graph)
+
+    def test_editor_run_twice(self):
+        # 编辑器在图没有被编辑时复用同一个运行时副本
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PySide6.QtWidgets import QApplication
+        from editorWnd.editor import Editor
+        app = QApplication.instance() or QApplication([])
+        editor = Editor()
+        with tempfile.TemporaryDirectory() as tmp:
+            filepath = os.path.join(tmp, 'break.vgf')
+            with open(filepath, 'w') as f:
+                f.write(json.dumps(break_graph()))
+            editor.view.load_graph(filepath)
+        graph = editor.view.get_runtime_graph()
+        self.assertIs(editor.view.get_runtime_graph(), graph)
+        self.run_twice(graph)
+        editor.close()
+        app.processEvents()
+
+    def test_sweep(self):
+        rows = list(run_sweep(break_graph(), [{'thr': '1'}, {'thr': '2'}, {'thr': '3'}], workers=1))
+        self.assertEqual([row['status'] for row in rows], ['ok'] * 3)
+        self.assertEqual([row['output'] for row in rows], ['0\n1\n2', '0\n1\n2\n3', '0\n1\n2\n3\n4'])
+
+
+if __name__ == '__main__':
+    unittest.main()